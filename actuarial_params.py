@@ -11,3 +11,14 @@ GAMMA_GEN = 0.7  # Weighting parameter for general skills in F_US
 GAMMA_SPEC = 0.3  # Weighting parameter for firm-specific skills in F_US (must be < GAMMA_GEN)
 W_ECON = 0.5  # Calibration weight for Economic Climate Modifier in Systematic Risk
 W_INNO = 0.5  # Calibration weight for AI Innovation Index in Systematic Risk
+
+# Names of the constants above, in declaration order. Derived caches (e.g. the premium cube)
+# are keyed on the full parameter set so that changing any of them invalidates the cache.
+PARAMETER_NAMES = (
+    "BETA_SYSTEMIC", "BETA_INDIVIDUAL", "LAMBDA", "P_MIN", "TTV",
+    "W_CR", "W_US", "GAMMA_GEN", "GAMMA_SPEC", "W_ECON", "W_INNO",
+)
+
+def default_parameters() -> dict:
+    """Returns the module-level actuarial parameters as a {name: value} dict."""
+    return {name: globals()[name] for name in PARAMETER_NAMES}
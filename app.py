@@ -1,30 +1,31 @@
+import hashlib
+import os
+import uuid
 import streamlit as st
-import pandas as pd
 from calculations import (
-    calculate_fexp, calculate_fhc, calculate_fus, calculate_fcr,
-    calculate_v_idiosyncratic_raw, calculate_v_idiosyncratic_normalized,
     calculate_h_base_ttv, calculate_systematic_risk,
     calculate_p_systemic, calculate_p_individual_conditional, calculate_p_claim,
     calculate_l_payout, calculate_expected_loss, calculate_monthly_premium
 )
-from data_utils import (
-    get_occupation_hazard, get_role_multiplier, get_company_type_factor,
-    get_education_level_factor, get_education_field_factor, get_school_tier_factor,
-    get_economic_climate_modifier, get_ai_innovation_index,
-    get_learning_resources_by_skill_type, get_skills_for_occupation
-)
+from data_utils import get_learning_resources_by_skill_type, get_skills_for_occupation
 from visualizations import (
-    plot_risk_factor_contributions, plot_historical_trends,
-    plot_skill_proficiency, plot_skill_gap_radar
-)
-from actuarial_params import (
-    BETA_SYSTEMIC, BETA_INDIVIDUAL, LAMBDA, P_MIN, TTV,
-    W_CR, W_US, GAMMA_GEN, GAMMA_SPEC, W_ECON, W_INNO
+    plot_skill_proficiency, extend_line_figure, DEFAULT_MAX_POINTS,
+    plot_portfolio_breakdown, plot_rollup_histogram, plot_loss_ratio_fan
 )
+from model_registry import current_snapshot
 from data.occupation_data import OCCUPATION_HAZARDS, COMPANY_TYPE_FACTORS
 from data.education_data import EDUCATION_LEVEL_FACTORS, EDUCATION_FIELD_FACTORS, SCHOOL_TIER_FACTORS
 from data.environmental_data import ECONOMIC_CLIMATE_SCENARIOS, AI_INNOVATION_SCENARIOS
-from data.skill_data import LEARNING_RESOURCES, SKILL_CATEGORIES
+import instrumentation
+from history_store import ProgressHistoryStore
+from upskilling_planner import plan_upskilling
+from incremental_pricing import IncrementalPricer
+from rollups import build_rollup, DEFAULT_DIMENSIONS
+from stress_testing import stress_test, DEFAULT_CORRELATION
+from page_cache import (
+    cached_price_profile, cached_plot_risk_factor_contributions,
+    cached_plot_historical_trends, cached_plot_skill_gap_radar, cache_stats
+)
 
 st.set_page_config(page_title="AI Risk Score - V3", layout="wide")
 st.sidebar.image("https://www.quantuniversity.com/assets/img/logo5.jpg")
@@ -174,40 +175,137 @@ Where $\lambda$ is the Loading Factor and $P_{min}$ is the Minimum Premium.
 ---
 """)
 
+@st.cache_resource
+def get_history_store():
+    # One store per process; the SQLite file is shared across sessions, restarts and replicas
+    return ProgressHistoryStore()
+
+history_store = get_history_store()
+
+@st.cache_resource(max_entries=4)
+def get_book_rollup(source_key: str, params_items: tuple, model_version: str, _load_book, _tables):
+    # One rollup per book, parameter set and model version, shared by every session of this
+    # process; `_load_book` and `_tables` (excluded from the cache key) are only used to build it
+    return build_rollup(_load_book(), dict(params_items), tables=_tables)
+
+@st.cache_resource(max_entries=4)
+def get_stress_test(source_key: str, params_items: tuple, model_version: str, n_paths: int, n_months: int,
+                    correlation: float, _load_book, _tables):
+    # Regime-path stress test of a whole book, cached and shared like get_book_rollup
+    return stress_test(_load_book(), n_paths, n_months, params=dict(params_items), correlation=correlation,
+                       tables=_tables)
+
+def load_book_file(path: str):
+    # A saved policy_book directory (memory-mapped) or a CSV with the portfolio columns
+    if os.path.isdir(path):
+        from policy_book import load_policy_book
+        return load_policy_book(path).columns
+    import pandas as pd
+    return pd.read_csv(path)
+
+# Session keys set by an assessment, restored from the history store when a user resumes
+ASSESSMENT_KEYS = (
+    'last_calculated_v_idiosyncratic', 'last_calculated_h_systematic', 'last_calculated_p_monthly',
+    'last_fhc', 'last_fcr', 'last_fus', 'last_h_base', 'last_m_econ', 'last_i_ai', 'last_profile',
+    'pricer', 'quote_model_version',
+)
+
+def remember_assessment(profile, params, snapshot, model_version):
+    # Prices a profile and keeps what the result views and Log New Progress need in the session
+    quote = cached_price_profile(profile, params, snapshot)
+    st.session_state['last_calculated_v_idiosyncratic'] = quote['v_idiosyncratic']
+    st.session_state['last_calculated_h_systematic'] = quote['h_systematic']
+    st.session_state['last_calculated_p_monthly'] = quote['p_monthly']
+
+    st.session_state['last_fhc'] = quote['fhc']
+    st.session_state['last_fcr'] = quote['fcr']
+    st.session_state['last_fus'] = quote['fus']
+    st.session_state['last_h_base'] = snapshot.tables['occupation_hazard'].lookup(profile['occupation']) # Store the raw H_base for visualization
+    st.session_state['last_m_econ'] = quote['m_econ']
+    st.session_state['last_i_ai'] = quote['i_ai']
+    st.session_state['last_profile'] = profile # Used by the upskilling plan solver
+    st.session_state['pricer'] = IncrementalPricer({k: [v] for k, v in profile.items()}, params,
+                                                   tables=snapshot.tables)
+    st.session_state['quote_model_version'] = model_version
+    return quote
+
+# Sidebar defaults and factor tables: the active model_registry snapshot, re-checked on every
+# rerun so a newly published version is picked up without restarting the app
+model_snapshot = current_snapshot()
+base_parameters = model_snapshot.params
+
 # Initialize session state for persistent data
-if 'idiosyncratic_risk_history' not in st.session_state:
-    st.session_state['idiosyncratic_risk_history'] = pd.DataFrame(columns=['Month', 'Idiosyncratic Risk', 'Systematic Risk', 'Monthly Premium'])
-if 'skill_progress_history' not in st.session_state:
-    st.session_state['skill_progress_history'] = pd.DataFrame(columns=['Month', 'General Skill Progress', 'Firm-Specific Skill Progress'])
-if 'current_month' not in st.session_state:
-    st.session_state['current_month'] = 0
+if 'user_id' not in st.session_state:
+    st.session_state['user_id'] = uuid.uuid4().hex
+st.sidebar.text_input("User ID", key="user_id", help="Enter a previous User ID to resume its progress history.")
+user_id = st.session_state['user_id']
+if st.session_state.get('history_user_id') != user_id:
+    # Resume from the stored history when the user changes (or the app restarted): the month
+    # counter, and the last assessment re-priced at the last logged skill levels so that
+    # Log New Progress continues the history instead of asking for a new assessment
+    for key in ASSESSMENT_KEYS + ('user_skills_proficiency',):
+        st.session_state.pop(key, None)
+    last_entry = history_store.last_entry(user_id)
+    st.session_state['current_month'] = last_entry[0] if last_entry else 0
+    assessment = history_store.load_assessment(user_id) if last_entry else None
+    if assessment is not None:
+        profile, params, model_version = assessment
+        profile = dict(profile, general_skill_progress=last_entry[4] / 100.0,
+                       firm_specific_skill_progress=last_entry[5] / 100.0)
+        remember_assessment(profile, params, model_snapshot, model_version)
+        # The logged values stand, whichever factor tables are active now
+        st.session_state['last_calculated_v_idiosyncratic'] = last_entry[1]
+        st.session_state['last_calculated_h_systematic'] = last_entry[2]
+        st.session_state['last_calculated_p_monthly'] = last_entry[3]
+        st.session_state['user_skills_proficiency'] = {
+            "General Skills": last_entry[4], "Firm-Specific Skills": last_entry[5]
+        }
+    st.session_state['history_user_id'] = user_id
 if 'user_skills_proficiency' not in st.session_state:
     st.session_state['user_skills_proficiency'] = {} # To store proficiency for radar chart
 
+def parameter_default(name, low, high):
+    # Clamped into the widget's range, which a fitted value may fall outside of
+    return type(low)(min(max(base_parameters[name], low), high))
+
 # Sidebar for Navigation and Global Settings
 st.sidebar.header("Global Parameters")
+st.sidebar.caption(f"Model version {model_snapshot.version}")
 with st.sidebar.expander("Actuarial & Payout Settings"):
     annual_salary = st.number_input("Annual Salary ($)", min_value=10000, max_value=500000, value=75000, step=5000)
     coverage_percentage = st.slider("Coverage Percentage (%)", min_value=0.0, max_value=1.0, value=0.6, step=0.05, format="%.2f")
     coverage_duration = st.number_input("Coverage Duration (Months)", min_value=1, max_value=24, value=6, step=1)
-    beta_systemic = st.slider(r"Systemic Event Base Probability ($$ \beta_{systemic} $$)", min_value=0.01, max_value=0.5, value=BETA_SYSTEMIC, step=0.01)
-    beta_individual = st.slider(r"Individual Loss Base Probability ($$ \beta_{individual} $$)", min_value=0.01, max_value=1.0, value=BETA_INDIVIDUAL, step=0.01)
-    loading_factor = st.slider("Loading Factor (λ)", min_value=1.0, max_value=3.0, value=LAMBDA, step=0.1)
-    minimum_premium = st.number_input(r"Minimum Premium ($$ {P_\text{min}} $$) ($)", min_value=5.0, max_value=100.0, value=P_MIN, step=5.0)
+    beta_systemic = st.slider(r"Systemic Event Base Probability ($$ \beta_{systemic} $$)", min_value=0.01, max_value=0.5, value=parameter_default('BETA_SYSTEMIC', 0.01, 0.5), step=0.01)
+    beta_individual = st.slider(r"Individual Loss Base Probability ($$ \beta_{individual} $$)", min_value=0.01, max_value=1.0, value=parameter_default('BETA_INDIVIDUAL', 0.01, 1.0), step=0.01)
+    loading_factor = st.slider("Loading Factor (λ)", min_value=1.0, max_value=3.0, value=parameter_default('LAMBDA', 1.0, 3.0), step=0.1)
+    minimum_premium = st.number_input(r"Minimum Premium ($$ {P_\text{min}} $$) ($)", min_value=5.0, max_value=100.0, value=parameter_default('P_MIN', 5.0, 100.0), step=5.0)
 
 with st.sidebar.expander("Model Weights & Time-to-Value"):
-    gamma_gen = st.slider(r"General Skill Weight ($$ \gamma_{gen} $$)", min_value=0.1, max_value=0.9, value=GAMMA_GEN, step=0.05)
-    gamma_spec = st.slider(r"Firm-Specific Skill Weight ($$ \gamma_{_spec} $$)", min_value=0.1, max_value=0.9, value=GAMMA_SPEC, step=0.05)
+    gamma_gen = st.slider(r"General Skill Weight ($$ \gamma_{gen} $$)", min_value=0.1, max_value=0.9, value=parameter_default('GAMMA_GEN', 0.1, 0.9), step=0.05)
+    gamma_spec = st.slider(r"Firm-Specific Skill Weight ($$ \gamma_{_spec} $$)", min_value=0.1, max_value=0.9, value=parameter_default('GAMMA_SPEC', 0.1, 0.9), step=0.05)
     if gamma_gen <= gamma_spec:
         st.warning(r"Warning: General Skill Weight ($$ \gamma_{gen} $$) should ideally be greater than Firm-Specific Skill Weight ($$ \gamma_{_spec} $$).")
-    w_econ = st.slider(r"Economic Climate Weight ($$ w_{\text{econ}} $$)", min_value=0.0, max_value=1.0, value=W_ECON, step=0.05)
-    w_inno = st.slider(r"AI Innovation Weight ($$ w_{\text{inno}} $$)", min_value=0.0, max_value=1.0, value=W_INNO, step=0.05)
+    w_econ = st.slider(r"Economic Climate Weight ($$ w_{\text{econ}} $$)", min_value=0.0, max_value=1.0, value=parameter_default('W_ECON', 0.0, 1.0), step=0.05)
+    w_inno = st.slider(r"AI Innovation Weight ($$ w_{\text{inno}} $$)", min_value=0.0, max_value=1.0, value=parameter_default('W_INNO', 0.0, 1.0), step=0.05)
     if not (0.95 <= (w_econ + w_inno) <= 1.05):
         st.warning(r"Warning: Economic and AI Innovation weights ($$ w_{\text{econ}} $$ + $$ w_{\text{inno}} $$) should ideally sum close to 1.0.")
-    ttv_months = st.slider("Time-to-Value Period (TTV) (Months)", min_value=3, max_value=36, value=TTV, step=1)
+    ttv_months = st.slider("Time-to-Value Period (TTV) (Months)", min_value=3, max_value=36, value=parameter_default('TTV', 3, 36), step=1)
+
+# Full parameter set chosen in the sidebar, keyed like actuarial_params.PARAMETER_NAMES
+actuarial_settings = {
+    'BETA_SYSTEMIC': beta_systemic, 'BETA_INDIVIDUAL': beta_individual, 'LAMBDA': loading_factor,
+    'P_MIN': minimum_premium, 'TTV': ttv_months, 'W_CR': base_parameters['W_CR'], 'W_US': base_parameters['W_US'],
+    'GAMMA_GEN': gamma_gen, 'GAMMA_SPEC': gamma_spec, 'W_ECON': w_econ, 'W_INNO': w_inno,
+}
 
+def quote_version_label():
+    # The model version a quote was priced with, flagged when sidebar settings moved off it
+    if all(actuarial_settings[name] == value for name, value in model_snapshot.params.items()):
+        return model_snapshot.version
+    return f"{model_snapshot.version} (with sidebar overrides)"
 
-page = st.sidebar.selectbox(label="Navigation", options=["Risk Assessment", "Upskilling Path", "Progress Tracking"])
+
+page = st.sidebar.selectbox(label="Navigation", options=["Risk Assessment", "Upskilling Path", "Progress Tracking", "Portfolio Dashboard"])
 
 if page == "Risk Assessment":
     st.header("Risk Assessment")
@@ -243,71 +341,31 @@ if page == "Risk Assessment":
     """)
 
     if st.button("Calculate AI-Q Score"):
-        # Retrieve factors
-        f_exp = calculate_fexp(years_experience)
-        f_role = get_role_multiplier(current_occupation)
-        f_level = get_education_level_factor(highest_education_level)
-        f_field = get_education_field_factor(education_field)
-        f_school = get_school_tier_factor(school_tier)
-        fcr_value = get_company_type_factor(company_type) # FCR is directly looked up
-
-        # Calculate FHC
-        fhc = calculate_fhc(f_role, f_level, f_field, f_school, f_exp)
-
-        # Calculate FUS
-        fus = calculate_fus(general_skill_progress, firm_specific_skill_progress, gamma_gen, gamma_spec)
-
-        # Calculate V_raw and V_i(t) (Idiosyncratic Risk)
-        v_raw = calculate_v_idiosyncratic_raw(fhc, fcr_value, fus, W_CR, W_US)
-        v_idiosyncratic_normalized = calculate_v_idiosyncratic_normalized(v_raw)
-
-        # Calculate H_base (no TTV in initial calculation, k=0)
-        h_base_current = get_occupation_hazard(current_occupation)
-        h_base = calculate_h_base_ttv(h_base_current, h_base_current, 0, ttv_months) # k=0 for initial calculation
-
-        # Retrieve environmental modifiers
-        m_econ = get_economic_climate_modifier(economic_climate)
-        i_ai = get_ai_innovation_index(ai_innovation_pace)
-
-        # Calculate H_i (Systematic Risk)
-        h_systematic = calculate_systematic_risk(h_base, m_econ, i_ai, w_econ, w_inno)
-
-        # Calculate Probabilities and Loss
-        p_systemic = calculate_p_systemic(h_systematic, beta_systemic)
-        p_individual_conditional = calculate_p_individual_conditional(v_idiosyncratic_normalized, beta_individual)
-        p_claim = calculate_p_claim(p_systemic, p_individual_conditional)
-        l_payout = calculate_l_payout(annual_salary, coverage_duration, coverage_percentage)
-        e_loss = calculate_expected_loss(p_claim, l_payout)
-        p_monthly = calculate_monthly_premium(e_loss, loading_factor, minimum_premium)
-
-        st.session_state['last_calculated_v_idiosyncratic'] = v_idiosyncratic_normalized
-        st.session_state['last_calculated_h_systematic'] = h_systematic
-        st.session_state['last_calculated_p_monthly'] = p_monthly
-
-        st.session_state['last_fhc'] = fhc
-        st.session_state['last_fcr'] = fcr_value
-        st.session_state['last_fus'] = fus
-        st.session_state['last_h_base'] = h_base_current # Store the raw H_base for visualization
-        st.session_state['last_m_econ'] = m_econ
-        st.session_state['last_i_ai'] = i_ai
+        # Price the profile through the shared pipeline; repeated inputs are served from the cache
+        profile = {
+            'occupation': current_occupation, 'education_level': highest_education_level,
+            'education_field': education_field, 'school_tier': school_tier, 'company_type': company_type,
+            'years_experience': years_experience,
+            'general_skill_progress': general_skill_progress,
+            'firm_specific_skill_progress': firm_specific_skill_progress,
+            'annual_salary': annual_salary, 'coverage_duration': coverage_duration,
+            'coverage_percentage': coverage_percentage,
+            'economic_climate': economic_climate, 'ai_innovation_pace': ai_innovation_pace,
+        }
+        quote = remember_assessment(profile, actuarial_settings, model_snapshot, quote_version_label())
+        v_idiosyncratic_normalized = quote['v_idiosyncratic']
+        h_systematic = quote['h_systematic']
+        p_monthly = quote['p_monthly']
+        history_store.save_assessment(user_id, profile, actuarial_settings, st.session_state['quote_model_version'])
 
         st.session_state['current_month'] = 0 # Reset month for progress tracking
 
         # Add initial state to history
-        new_row_history = pd.DataFrame([{
-            'Month': st.session_state['current_month'],
-            'Idiosyncratic Risk': v_idiosyncratic_normalized,
-            'Systematic Risk': h_systematic,
-            'Monthly Premium': p_monthly
-        }])
-        st.session_state['idiosyncratic_risk_history'] = pd.concat([st.session_state['idiosyncratic_risk_history'], new_row_history], ignore_index=True)
-
-        new_row_skill_history = pd.DataFrame([{
-            'Month': st.session_state['current_month'],
-            'General Skill Progress': general_skill_progress * 100,
-            'Firm-Specific Skill Progress': firm_specific_skill_progress * 100
-        }])
-        st.session_state['skill_progress_history'] = pd.concat([st.session_state['skill_progress_history'], new_row_skill_history], ignore_index=True)
+        history_store.append(
+            user_id, st.session_state['current_month'],
+            v_idiosyncratic_normalized, h_systematic, p_monthly,
+            general_skill_progress * 100, firm_specific_skill_progress * 100
+        )
 
         st.session_state['user_skills_proficiency'] = {
             "General Skills": general_skill_progress * 100,
@@ -325,10 +383,11 @@ if page == "Risk Assessment":
             st.metric("Systematic Risk ($H_i$)", f"{st.session_state['last_calculated_h_systematic']:.2f}")
         with col_res3:
             st.metric("Estimated Monthly Premium ($P_{monthly}$)", f"${st.session_state['last_calculated_p_monthly']:.2f}")
+        st.caption(f"Quoted with model version {st.session_state.get('quote_model_version')}")
 
         st.markdown("---")
         st.subheader("Risk Factor Contributions")
-        fig_idiosyncratic, fig_systematic = plot_risk_factor_contributions(
+        fig_idiosyncratic, fig_systematic = cached_plot_risk_factor_contributions(
             st.session_state['last_fhc'], st.session_state['last_fcr'], st.session_state['last_fus'],
             st.session_state['last_h_base'], st.session_state['last_m_econ'], st.session_state['last_i_ai']
         )
@@ -412,6 +471,31 @@ elif page == "Upskilling Path":
         for skill in recommended_skills.get("firm-specific", []):
             st.markdown(f"- **{skill}**")
 
+    st.subheader("Optimal Upskilling Plan")
+    st.markdown("""
+    Given a study budget, find the courses recommended for your assessed profile that lower your monthly premium the most.
+    Once the premium reaches its floor ($P_{min}$), further courses are not recommended.
+    """)
+    learning_budget = st.number_input("Learning budget (hours)", min_value=0, max_value=500, value=40, step=5)
+    if 'last_profile' in st.session_state:
+        plan = plan_upskilling(st.session_state['last_profile'], learning_budget, actuarial_settings,
+                               tables=model_snapshot.tables)
+        col_plan1, col_plan2, col_plan3 = st.columns(3)
+        with col_plan1:
+            st.metric("Premium After Plan", f"${plan['p_monthly_after']:.2f}", f"-${plan['reduction']:.2f}", delta_color="inverse")
+        with col_plan2:
+            st.metric("Study Hours Needed", f"{plan['hours']}")
+        with col_plan3:
+            st.metric("Skill Progress After (Gen / Spec)", f"{plan['p_gen_after'] * 100:.0f}% / {plan['p_spec_after'] * 100:.0f}%")
+        if plan['courses']:
+            st.dataframe(plan['courses'], use_container_width=True, hide_index=True)
+        elif plan['at_p_min']:
+            st.info("Your premium is already at the minimum; additional courses would not lower it further.")
+        else:
+            st.info("No recommended course fits this budget or lowers your premium.")
+    else:
+        st.info("Please calculate your AI-Q Score in the 'Risk Assessment' section first to get an upskilling plan.")
+
     # Skill Gap Analysis (Conceptual Radar Chart)
     st.subheader("Skill Gap Analysis (Conceptual)")
     st.markdown("""
@@ -428,7 +512,7 @@ elif page == "Upskilling Path":
             "Firm-Specific Skills": rec_prof_spec,
             "Adaptability": Adaptability
         }
-        fig_radar = plot_skill_gap_radar(st.session_state['user_skills_proficiency'], recommended_for_radar)
+        fig_radar = cached_plot_skill_gap_radar(st.session_state['user_skills_proficiency'], recommended_for_radar)
         st.plotly_chart(fig_radar, use_container_width=True)
     else:
         st.info("Please calculate your AI-Q Score in the 'Risk Assessment' section first to see skill insights.")
@@ -437,9 +521,7 @@ elif page == "Upskilling Path":
     st.subheader("Personalized Learning Resources")
     skill_type_filter = st.radio("Filter resources by skill type:", options=["All", "general", "firm-specific"], horizontal=True)
 
-    filtered_resources = LEARNING_RESOURCES
-    if skill_type_filter != "All":
-        filtered_resources = get_learning_resources_by_skill_type(skill_type_filter)
+    filtered_resources = get_learning_resources_by_skill_type(None if skill_type_filter == "All" else skill_type_filter)
 
     st.dataframe(filtered_resources, use_container_width=True, hide_index=True)
 
@@ -456,8 +538,9 @@ elif page == "Upskilling Path":
 
     if st.button("Simulate Transition Impact"):
         if 'last_calculated_h_systematic' in st.session_state:
-            h_current_base = get_occupation_hazard(current_occupation_for_skills)
-            h_target_base = get_occupation_hazard(target_occupation)
+            hazard_table = model_snapshot.tables['occupation_hazard']
+            h_current_base = hazard_table.lookup(current_occupation_for_skills)
+            h_target_base = hazard_table.lookup(target_occupation)
             
             h_base_after_transition = calculate_h_base_ttv(h_current_base, h_target_base, months_into_transition, ttv_months)
             
@@ -497,12 +580,13 @@ elif page == "Progress Tracking":
     """)
 
     st.subheader("Update Your Progress")
+    last_entry = history_store.last_entry(user_id)
     col_update1, col_update2 = st.columns(2)
     with col_update1:
-        last_gen_skill = int(st.session_state['skill_progress_history']['General Skill Progress'].iloc[-1]) if not st.session_state['skill_progress_history'].empty else 50
+        last_gen_skill = int(last_entry[4]) if last_entry else 50
         new_general_skill_progress = st.slider("Update General Skill Progress (0-100%)", min_value=0, max_value=100, value=last_gen_skill, step=5) / 100.0
     with col_update2:
-        last_firm_skill = int(st.session_state['skill_progress_history']['Firm-Specific Skill Progress'].iloc[-1]) if not st.session_state['skill_progress_history'].empty else 50
+        last_firm_skill = int(last_entry[5]) if last_entry else 50
         new_firm_specific_skill_progress = st.slider("Update Firm-Specific Skill Progress (0-100%)", min_value=0, max_value=100, value=last_firm_skill, step=5) / 100.0
     
     # Placeholder for updating other factors if needed for historical tracking
@@ -513,39 +597,27 @@ elif page == "Progress Tracking":
         if 'last_calculated_v_idiosyncratic' in st.session_state:
             st.session_state['current_month'] += 1
 
-            # Recalculate FUS with new skill progress
-            updated_fus = calculate_fus(new_general_skill_progress, new_firm_specific_skill_progress, gamma_gen, gamma_spec)
-
-            # Recalculate V_raw and V_i(t)
-            updated_v_raw = calculate_v_idiosyncratic_raw(st.session_state['last_fhc'], st.session_state['last_fcr'], updated_fus, W_CR, W_US)
-            updated_v_idiosyncratic = calculate_v_idiosyncratic_normalized(updated_v_raw)
-
-            # Systematic risk is assumed constant unless base occupation changes or environmental factors are updated
-            updated_h_systematic = st.session_state['last_calculated_h_systematic']
-
-            # Recalculate probabilities and premium
-            updated_p_systemic = calculate_p_systemic(updated_h_systematic, beta_systemic)
-            updated_p_individual_conditional = calculate_p_individual_conditional(updated_v_idiosyncratic, beta_individual)
-            updated_p_claim = calculate_p_claim(updated_p_systemic, updated_p_individual_conditional)
-            updated_l_payout = calculate_l_payout(annual_salary, coverage_duration, coverage_percentage)
-            updated_e_loss = calculate_expected_loss(updated_p_claim, updated_l_payout)
-            updated_p_monthly = calculate_monthly_premium(updated_e_loss, loading_factor, minimum_premium)
+            # Re-price incrementally: only the nodes downstream of the changed inputs are recomputed.
+            # Systematic risk is assumed constant unless the Risk Assessment is run again, so the
+            # H_i weights, TTV and the factor tables stay at the values the pricer was built with
+            pricer = st.session_state['pricer']
+            progress_settings = dict(actuarial_settings, **{name: pricer.params[name] for name in ('W_ECON', 'W_INNO', 'TTV')})
+            pricer.update([0], {
+                'general_skill_progress': new_general_skill_progress,
+                'firm_specific_skill_progress': new_firm_specific_skill_progress,
+                'annual_salary': annual_salary, 'coverage_duration': coverage_duration,
+                'coverage_percentage': coverage_percentage,
+            }, params=progress_settings)
+            updated_v_idiosyncratic = pricer.nodes['v_idiosyncratic'][0]
+            updated_h_systematic = pricer.nodes['h_systematic'][0]
+            updated_p_monthly = pricer.nodes['p_monthly'][0]
 
             # Append to history
-            new_row_history = pd.DataFrame([{
-                'Month': st.session_state['current_month'],
-                'Idiosyncratic Risk': updated_v_idiosyncratic,
-                'Systematic Risk': updated_h_systematic,
-                'Monthly Premium': updated_p_monthly
-            }])
-            st.session_state['idiosyncratic_risk_history'] = pd.concat([st.session_state['idiosyncratic_risk_history'], new_row_history], ignore_index=True)
-
-            new_row_skill_history = pd.DataFrame([{
-                'Month': st.session_state['current_month'],
-                'General Skill Progress': new_general_skill_progress * 100,
-                'Firm-Specific Skill Progress': new_firm_specific_skill_progress * 100
-            }])
-            st.session_state['skill_progress_history'] = pd.concat([st.session_state['skill_progress_history'], new_row_skill_history], ignore_index=True)
+            history_store.append(
+                user_id, st.session_state['current_month'],
+                updated_v_idiosyncratic, updated_h_systematic, updated_p_monthly,
+                new_general_skill_progress * 100, new_firm_specific_skill_progress * 100
+            )
 
             st.session_state['user_skills_proficiency'] = {
                 "General Skills": new_general_skill_progress * 100,
@@ -557,23 +629,38 @@ elif page == "Progress Tracking":
             st.warning("Please calculate your initial AI-Q Score in the 'Risk Assessment' section first.")
 
     st.subheader("Historical Performance")
-    if not st.session_state['idiosyncratic_risk_history'].empty:
+    risk_history, skill_history = history_store.history_frames(user_id)
+    if not risk_history.empty:
+        # The session keeps its rendered trend figures and appends newly logged months to them;
+        # they are rebuilt (and downsampled again) for another user or once they grow too large
+        rendered = st.session_state.get('history_figures')
+        fig_trend = fig_skill_trend = None
+        if rendered and rendered['user_id'] == user_id and rendered['rows'] <= len(risk_history):
+            fig_trend, fig_skill_trend = rendered['trend'], rendered['skill']
+            if rendered['rows'] < len(risk_history):
+                new_rows = slice(rendered['rows'], None)
+                fig_trend = extend_line_figure(fig_trend, risk_history.iloc[new_rows], DEFAULT_MAX_POINTS)
+                fig_skill_trend = extend_line_figure(fig_skill_trend, skill_history.iloc[new_rows], DEFAULT_MAX_POINTS)
+        if fig_trend is None or fig_skill_trend is None:
+            fig_trend = cached_plot_historical_trends(risk_history, max_points=DEFAULT_MAX_POINTS)
+            fig_skill_trend = plot_skill_proficiency(skill_history, max_points=DEFAULT_MAX_POINTS)
+        st.session_state['history_figures'] = {'user_id': user_id, 'rows': len(risk_history),
+                                               'trend': fig_trend, 'skill': fig_skill_trend}
+
         st.markdown("##### AI Risk Score and Premium Trend")
-        fig_trend = plot_historical_trends(st.session_state['idiosyncratic_risk_history'])
         st.plotly_chart(fig_trend, use_container_width=True)
 
         st.markdown("##### Skill Proficiency Trend")
-        fig_skill_trend = plot_skill_proficiency(st.session_state['skill_progress_history'])
         st.plotly_chart(fig_skill_trend, use_container_width=True)
 
         st.subheader("Impact Summary")
         if st.session_state['current_month'] > 0:
-            initial_v = st.session_state['idiosyncratic_risk_history']['Idiosyncratic Risk'].iloc[0]
-            current_v = st.session_state['idiosyncratic_risk_history']['Idiosyncratic Risk'].iloc[-1]
+            initial_v = risk_history['Idiosyncratic Risk'].iloc[0]
+            current_v = risk_history['Idiosyncratic Risk'].iloc[-1]
             v_change = initial_v - current_v
 
-            initial_premium = st.session_state['idiosyncratic_risk_history']['Monthly Premium'].iloc[0]
-            current_premium = st.session_state['idiosyncratic_risk_history']['Monthly Premium'].iloc[-1]
+            initial_premium = risk_history['Monthly Premium'].iloc[0]
+            current_premium = risk_history['Monthly Premium'].iloc[-1]
             premium_change = initial_premium - current_premium
 
             st.markdown(f"""
@@ -591,6 +678,127 @@ elif page == "Progress Tracking":
         st.info("No historical data available. Please calculate your initial AI-Q Score in the 'Risk Assessment' section.")
 
 
+elif page == "Portfolio Dashboard":
+    st.header("Portfolio Dashboard")
+    st.markdown("""
+    Premium, expected loss and risk distributions for a whole book of policies, priced with the parameters in the sidebar.
+    The book is aggregated once into pre-computed rollups, so every filter and grouping below is answered from the rollups.
+    """)
+    uploaded_book = st.file_uploader("Policy book (CSV with the portfolio columns)", type="csv")
+    book_path = os.environ.get("AIRISK_POLICY_BOOK")
+    if uploaded_book is not None:
+        book_bytes = uploaded_book.getvalue()
+        source_key = "upload:" + hashlib.sha1(book_bytes).hexdigest()
+
+        def load_book():
+            import io
+            import pandas as pd
+            return pd.read_csv(io.BytesIO(book_bytes))
+    elif book_path and os.path.exists(book_path):
+        source_key = f"path:{os.path.abspath(book_path)}:{os.path.getmtime(book_path)}"
+
+        def load_book():
+            return load_book_file(book_path)
+    else:
+        source_key = None
+
+    if source_key is None:
+        st.info("Upload a policy book, or set AIRISK_POLICY_BOOK to a CSV file or a saved policy_book directory.")
+    else:
+        try:
+            rollup = get_book_rollup(source_key, tuple(sorted(actuarial_settings.items())), model_snapshot.version,
+                                     load_book, dict(model_snapshot.tables))
+        except (KeyError, ValueError) as error:
+            st.error(f"Could not aggregate the policy book: {error}")
+            st.stop()
+
+        def dimension_label(dim):
+            return dim.replace('_', ' ').title()
+
+        with st.expander("Filters", expanded=True):
+            filter_columns = st.columns(3)
+            filters = {}
+            for i, dim in enumerate(DEFAULT_DIMENSIONS):
+                selected = filter_columns[i % 3].multiselect(dimension_label(dim), options=rollup.group_labels(dim))
+                if selected:
+                    filters[dim] = selected
+        group_by = st.selectbox("Group by", options=DEFAULT_DIMENSIONS, format_func=dimension_label)
+
+        totals = rollup.query(filters)
+        policies = int(totals['count'][0])
+        col_policies, col_premium, col_loss, col_ratio = st.columns(4)
+        col_policies.metric("Policies", f"{policies:,}")
+        col_premium.metric("Monthly Premium Income", f"${totals['sum_p_monthly'][0]:,.0f}")
+        col_loss.metric("Annual Expected Loss", f"${totals['sum_e_loss'][0]:,.0f}")
+        col_ratio.metric("Loss Ratio", f"{totals['loss_ratio'][0]:.2f}" if policies else "n/a")
+
+        if policies:
+            import pandas as pd
+            breakdown = rollup.query(filters, by=[group_by])
+            st.plotly_chart(plot_portfolio_breakdown(breakdown['groups'], breakdown['sum_p_monthly'],
+                                                     dimension_label(group_by), 'Monthly Premium Income ($)'),
+                            use_container_width=True)
+            st.dataframe(pd.DataFrame({
+                dimension_label(group_by): [group[0] for group in breakdown['groups']],
+                'Policies': breakdown['count'].astype(int),
+                'Monthly Premium ($)': breakdown['sum_p_monthly'],
+                'Mean Monthly Premium ($)': breakdown['mean_p_monthly'],
+                'Annual Expected Loss ($)': breakdown['sum_e_loss'],
+                'Loss Ratio': breakdown['loss_ratio'],
+                'Mean Idiosyncratic Risk': breakdown['mean_v_idiosyncratic'],
+                'Mean Systematic Risk': breakdown['mean_h_systematic'],
+                'Mean P(Claim)': breakdown['mean_p_claim'],
+            }), hide_index=True, use_container_width=True)
+
+            st.subheader("Risk Distributions")
+            distributions = {
+                'p_monthly': ('Monthly Premium', 'Monthly Premium ($)', ',.0f'),
+                'v_idiosyncratic': ('Idiosyncratic Risk', 'Idiosyncratic Risk (V)', '.0f'),
+                'h_systematic': ('Systematic Risk', 'Systematic Risk (H)', '.0f'),
+            }
+            distribution = st.radio("Distribution", options=list(distributions), horizontal=True,
+                                    format_func=lambda name: distributions[name][0])
+            title, value_label, value_format = distributions[distribution]
+            st.plotly_chart(plot_rollup_histogram(totals['edges'][distribution], totals['histograms'][distribution][0],
+                                                  f'{title} Distribution', value_label, value_format),
+                            use_container_width=True)
+        else:
+            st.warning("No policies match the selected filters.")
+
+        st.subheader("Macro Stress Test")
+        st.markdown("""
+        Loss ratio of the whole book (filters do not apply) along simulated Markov regime-switching paths of the
+        economic climate and the AI innovation pace. The premium is the one the book charges under its own scenarios;
+        each month's expected loss is taken under that month's regime, so the bands show macro regime risk only,
+        not the randomness of individual claims.
+        """)
+        stress_columns = st.columns(3)
+        n_paths = stress_columns[0].number_input("Paths", min_value=100, max_value=10_000, value=1_000, step=100)
+        n_months = stress_columns[1].number_input("Months", min_value=12, max_value=120, value=60, step=12)
+        correlation = stress_columns[2].slider("Regime Correlation", min_value=0.0, max_value=1.0,
+                                               value=DEFAULT_CORRELATION, step=0.05)
+        if st.button("Run Stress Test"):
+            st.session_state['stress_test_settings'] = (source_key, int(n_paths), int(n_months), correlation)
+        stress_settings = st.session_state.get('stress_test_settings')
+        if stress_settings and stress_settings[0] == source_key:
+            stress = get_stress_test(source_key, tuple(sorted(actuarial_settings.items())), model_snapshot.version,
+                                     *stress_settings[1:], load_book, dict(model_snapshot.tables))
+            fan = stress['cumulative_loss_ratio_fan']
+            st.plotly_chart(plot_loss_ratio_fan(fan, 'Cumulative Loss Ratio Fan Chart'), use_container_width=True)
+            st.caption(f"Cumulative loss ratio after {stress_settings[2]} months: median {fan[0.5][-1]:.3f}, "
+                       f"95th percentile {fan[0.95][-1]:.3f} over {stress_settings[1]:,} paths.")
+
+
+with st.sidebar.expander("Cache Statistics"):
+    for cache_name, stats in cache_stats().items():
+        st.caption(f"{cache_name}: {stats['hits']} hits / {stats['misses']} misses ({stats['size']}/{stats['maxsize']} entries)")
+
+if instrumentation.is_enabled():
+    with st.sidebar.expander("Instrumentation"):
+        for stage, stats in sorted(instrumentation.snapshot()["spans"].items(), key=lambda item: -item[1]["total_seconds"]):
+            st.caption(f"{stage}: {stats['count']} calls, {stats['total_seconds'] * 1e3:.2f} ms total")
+        st.download_button("Download Prometheus metrics", instrumentation.prometheus_text(), file_name="metrics.prom")
+
 st.divider()
 st.write("© 2025 QuantUniversity. All Rights Reserved.")
 st.caption("The purpose of this demonstration is solely for educational use and illustration. "
@@ -0,0 +1,154 @@
+import numpy as np
+from instrumentation import instrumented, increment, span
+from actuarial_params import BETA_SYSTEMIC, BETA_INDIVIDUAL, LAMBDA, P_MIN, TTV, W_CR, W_US, GAMMA_GEN, GAMMA_SPEC, W_ECON, W_INNO
+from factor_tables import FACTOR_TABLES, VOCABULARIES, UNKNOWN_CODE, encode_column
+
+# Input columns expected by price_portfolio. Skill progress is a fraction in [0, 1] and
+# coverage_percentage a fraction in [0, 1], exactly as passed to the scalar functions in app.py.
+PORTFOLIO_COLUMNS = [
+    "occupation", "education_level", "education_field", "school_tier", "company_type",
+    "years_experience", "general_skill_progress", "firm_specific_skill_progress",
+    "annual_salary", "coverage_duration", "coverage_percentage",
+]
+
+# Optional per-row scenario columns; when absent the keyword arguments of price_portfolio apply.
+SCENARIO_COLUMNS = ["economic_climate", "ai_innovation_pace"]
+
+PORTFOLIO_OUTPUTS = [
+    "f_exp", "fhc", "fcr", "fus", "v_raw", "v_idiosyncratic", "h_base", "m_econ", "i_ai",
+    "h_systematic", "p_systemic", "p_individual_conditional", "p_claim", "l_payout",
+    "e_loss", "p_monthly",
+]
+
+
+def calculate_fexp_vec(years_experience: np.ndarray) -> np.ndarray:
+    r"""
+    Vectorized Experience Factor (f_exp).
+    $f_{exp} = 1 - (0.015 \cdot \min(years\_experience, 20))$
+    """
+    return 1 - (0.015 * np.minimum(years_experience, 20))
+
+
+def calculate_v_idiosyncratic_normalized_vec(v_raw: np.ndarray) -> np.ndarray:
+    r"""
+    Vectorized normalization of V_raw to V_i(t) on a 0-100 scale.
+    $V_{i}(t) = \min(100.0, \max(5.0, V_{raw} \cdot 50.0))$
+    """
+    return np.minimum(100.0, np.maximum(5.0, v_raw * 50.0))
+
+
+def calculate_h_base_ttv_vec(h_current: np.ndarray, h_target: np.ndarray, k: np.ndarray, ttv: int = TTV) -> np.ndarray:
+    r"""
+    Vectorized Base Occupational Hazard adjusted for career transitions.
+    $H_{base}(k) = \left(1 - \frac{k}{TTV}\right) \cdot H_{current} + \left(\frac{k}{TTV}\right) \cdot H_{target}$
+    Months beyond TTV resolve to H_target, as in the scalar function.
+    """
+    frac = k / ttv
+    return np.where(k > ttv, h_target, (1 - frac) * h_current + frac * h_target)
+
+
+def calculate_monthly_premium_vec(e_loss: np.ndarray, lambd: float = LAMBDA, p_min: float = P_MIN) -> np.ndarray:
+    r"""
+    Vectorized Monthly Premium (P_monthly).
+    $P_{monthly} = \max\left(\frac{E[Loss] \cdot \lambda}{12}, P_{min}\right)$
+    """
+    return np.maximum((e_loss * lambd) / 12.0, p_min)
+
+
+def _scenario_codes(df, column: str, label: str, n: int, report: dict) -> np.ndarray:
+    """Encodes a per-row scenario column, or broadcasts the batch-wide scenario label."""
+    if column in df:
+        return encode_column(column, df[column], report)
+    code = VOCABULARIES[column].index.get(label, UNKNOWN_CODE)
+    if code == UNKNOWN_CODE and n:
+        increment("unknown_categories_total", n, field=column)
+        column_report = report.setdefault(column, {})
+        column_report[label] = column_report.get(label, 0) + n
+    return np.full(n, code, dtype=np.int16)
+
+
+@instrumented()
+def price_portfolio(df, economic_climate: str = "Neutral", ai_innovation_pace: str = "Neutral",
+                    gamma_gen: float = GAMMA_GEN, gamma_spec: float = GAMMA_SPEC,
+                    w_cr: float = W_CR, w_us: float = W_US,
+                    w_econ: float = W_ECON, w_inno: float = W_INNO, ttv: int = TTV,
+                    beta_systemic: float = BETA_SYSTEMIC, beta_individual: float = BETA_INDIVIDUAL,
+                    lambd: float = LAMBDA, p_min: float = P_MIN,
+                    unknown_report: dict = None, strict: bool = False, tables: dict = None) -> dict:
+    """
+    Prices a whole book of profiles in one vectorized pass.
+    `df` is any column mapping (a pandas DataFrame or a dict of arrays) holding PORTFOLIO_COLUMNS,
+    optionally with per-row SCENARIO_COLUMNS. Follows the "Calculate AI-Q Score" chain in app.py
+    (k=0, so H_base equals the current occupation's hazard) and returns a dict of float64 arrays
+    keyed by PORTFOLIO_OUTPUTS, matching the scalar calculations.py results element for element.
+    Category columns may hold labels or factor_tables codes. Unknown labels price at the data_utils
+    defaults and are tallied into `unknown_report` as {column: {label: count}}; with strict=True
+    they raise a ValueError instead. `tables` replaces factor_tables.FACTOR_TABLES (e.g. with a
+    model_registry snapshot's tables).
+    """
+    missing = [col for col in PORTFOLIO_COLUMNS if col not in df]
+    if missing:
+        raise KeyError(f"Portfolio is missing required columns: {missing}")
+
+    occupation = df["occupation"]
+    n = len(occupation)
+    years_experience = np.asarray(df["years_experience"], dtype=np.float64)
+    p_gen = np.asarray(df["general_skill_progress"], dtype=np.float64)
+    p_spec = np.asarray(df["firm_specific_skill_progress"], dtype=np.float64)
+    annual_salary = np.asarray(df["annual_salary"], dtype=np.float64)
+    coverage_duration = np.asarray(df["coverage_duration"], dtype=np.float64)
+    coverage_percentage = np.asarray(df["coverage_percentage"], dtype=np.float64)
+
+    report = {} if unknown_report is None else unknown_report
+    tables = FACTOR_TABLES if tables is None else tables
+    with span("batch_pricing.price_portfolio.encode"):
+        occupation_codes = encode_column("occupation", occupation, report)
+        econ_codes = _scenario_codes(df, "economic_climate", economic_climate, n, report)
+        inno_codes = _scenario_codes(df, "ai_innovation_pace", ai_innovation_pace, n, report)
+        f_role = tables["role_multiplier"].gather(occupation_codes)
+        f_level = tables["education_level_factor"].gather(encode_column("education_level", df["education_level"], report))
+        f_field = tables["education_field_factor"].gather(encode_column("education_field", df["education_field"], report))
+        f_school = tables["school_tier_factor"].gather(encode_column("school_tier", df["school_tier"], report))
+        fcr = tables["company_type_factor"].gather(encode_column("company_type", df["company_type"], report))
+        h_base = tables["occupation_hazard"].gather(occupation_codes)
+        m_econ = tables["economic_climate_modifier"].gather(econ_codes)
+        i_ai = tables["ai_innovation_index"].gather(inno_codes)
+    if strict and report:
+        raise ValueError(f"Unknown categories in portfolio: {report}")
+
+    # Operation order mirrors calculations.py so float64 results are bit-identical.
+    with span("batch_pricing.price_portfolio.idiosyncratic"):
+        f_exp = calculate_fexp_vec(years_experience)
+        fhc = f_role * f_level * f_field * f_school * f_exp
+        fus = 1 - (gamma_gen * p_gen + gamma_spec * p_spec)
+        v_raw = fhc * (w_cr * fcr + w_us * fus)
+        v_idiosyncratic = calculate_v_idiosyncratic_normalized_vec(v_raw)
+    with span("batch_pricing.price_portfolio.systematic"):
+        h_base = calculate_h_base_ttv_vec(h_base, h_base, np.zeros(n), ttv)
+        h_systematic = h_base * (w_econ * m_econ + w_inno * i_ai)
+    with span("batch_pricing.price_portfolio.premium"):
+        p_systemic = (h_systematic / 100.0) * beta_systemic
+        p_individual_conditional = (v_idiosyncratic / 100.0) * beta_individual
+        p_claim = p_systemic * p_individual_conditional
+        l_payout = (annual_salary / 12.0 * coverage_duration) * coverage_percentage
+        e_loss = p_claim * l_payout
+        p_monthly = calculate_monthly_premium_vec(e_loss, lambd, p_min)
+    increment("policies_priced_total", n)
+
+    return {
+        "f_exp": f_exp, "fhc": fhc, "fcr": fcr, "fus": fus, "v_raw": v_raw,
+        "v_idiosyncratic": v_idiosyncratic, "h_base": h_base, "m_econ": m_econ, "i_ai": i_ai,
+        "h_systematic": h_systematic, "p_systemic": p_systemic,
+        "p_individual_conditional": p_individual_conditional, "p_claim": p_claim,
+        "l_payout": l_payout, "e_loss": e_loss, "p_monthly": p_monthly,
+    }
+
+
+def portfolio_kwargs(params: dict) -> dict:
+    """Maps an actuarial_params-style {NAME: value} parameter set onto price_portfolio keywords."""
+    return {
+        "gamma_gen": params["GAMMA_GEN"], "gamma_spec": params["GAMMA_SPEC"],
+        "w_cr": params["W_CR"], "w_us": params["W_US"], "w_econ": params["W_ECON"], "w_inno": params["W_INNO"],
+        "ttv": params["TTV"], "beta_systemic": params["BETA_SYSTEMIC"], "beta_individual": params["BETA_INDIVIDUAL"],
+        "lambd": params["LAMBDA"], "p_min": params["P_MIN"],
+    }
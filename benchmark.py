@@ -0,0 +1,273 @@
+"""
+Benchmark harness for the pricing pipeline and the page render path.
+
+    python benchmark.py --output bench.json                 # full run (batch sizes 1k/100k/10M)
+    python benchmark.py --quick --output bench.json         # smaller batches, fewer repeats
+    python benchmark.py --compare baseline.json --threshold 0.25
+    python benchmark.py --check-imports                     # cold-import time and weight of the core
+
+Results are written as JSON ({"meta": ..., "results": {name: stats}}). With --compare, each
+benchmark's median time per operation is checked against the baseline and the run exits with
+status 1 if any is slower by more than --threshold (a fraction, default 0.25).
+With --check-imports, each CORE_MODULES entry is imported in a fresh interpreter; the run exits
+with status 1 if one pulls in a HEAVY_MODULES package or takes longer than --import-budget.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+from faker import Faker
+from data.occupation_data import OCCUPATION_HAZARDS, COMPANY_TYPE_FACTORS
+from data.education_data import EDUCATION_LEVEL_FACTORS, EDUCATION_FIELD_FACTORS, SCHOOL_TIER_FACTORS
+from data.environmental_data import ECONOMIC_CLIMATE_SCENARIOS, AI_INNOVATION_SCENARIOS
+from factor_tables import VOCABULARIES
+
+BATCH_SIZES = (1_000, 100_000, 10_000_000)
+QUICK_BATCH_SIZES = (1_000, 100_000)
+PROFILE_POOL_SIZE = 2_000
+
+# The import-light core: stdlib and NumPy only. pandas/plotly/streamlit load where frames or
+# figures are actually built (visualizations functions, history_frames, the app itself).
+CORE_MODULES = (
+    "actuarial_params", "calculations", "data_utils", "factor_tables", "batch_pricing", "pricing",
+    "premium_cube", "simulation", "parallel_simulation", "transition_projection", "sensitivity",
+    "parameter_sweep", "history_store", "quote_service", "visualizations", "page_cache", "skill_catalog",
+    "upskilling_planner", "incremental_pricing", "stress_testing", "instrumentation", "policy_book",
+    "downsampling", "rollups", "parameter_sets", "calibration", "model_registry", "model_store", "storage",
+)
+HEAVY_MODULES = ("pandas", "plotly", "streamlit")
+DEFAULT_IMPORT_BUDGET = 0.5
+_IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "seconds = time.perf_counter() - start\n"
+    "heavy = sorted(m for m in {heavy!r} if m in sys.modules)\n"
+    "print(json.dumps({{'seconds': seconds, 'heavy': heavy}}))\n"
+)
+
+
+def make_profiles(n: int, seed: int = 0) -> list:
+    """Synthetic but realistic profiles drawn with Faker over the data/ vocabularies."""
+    fake = Faker()
+    Faker.seed(seed)
+    profiles = []
+    for _ in range(n):
+        profiles.append({
+            "user_id": fake.uuid4(),
+            "name": fake.name(),
+            "occupation": fake.random_element(list(OCCUPATION_HAZARDS)),
+            "education_level": fake.random_element(list(EDUCATION_LEVEL_FACTORS)),
+            "education_field": fake.random_element(list(EDUCATION_FIELD_FACTORS)),
+            "school_tier": fake.random_element(list(SCHOOL_TIER_FACTORS)),
+            "company_type": fake.random_element(list(COMPANY_TYPE_FACTORS)),
+            "economic_climate": fake.random_element(list(ECONOMIC_CLIMATE_SCENARIOS)),
+            "ai_innovation_pace": fake.random_element(list(AI_INNOVATION_SCENARIOS)),
+            "years_experience": fake.random_int(0, 40),
+            "general_skill_progress": fake.random_int(0, 20) * 5 / 100.0,
+            "firm_specific_skill_progress": fake.random_int(0, 20) * 5 / 100.0,
+            "annual_salary": fake.random_int(10_000, 500_000, step=5_000),
+            "coverage_duration": fake.random_int(1, 24),
+            "coverage_percentage": fake.random_int(0, 20) * 0.05,
+        })
+    return profiles
+
+
+def make_book(profiles: list, n: int, seed: int = 0) -> dict:
+    """
+    Resamples a profile pool into an n-row columnar book. Category columns are stored as
+    factor_tables codes so a 10M-row book fits comfortably in memory.
+    """
+    rows = np.random.default_rng(seed).integers(0, len(profiles), n)
+    book = {}
+    for column in profiles[0]:
+        if column in ("user_id", "name"):
+            continue
+        pool = [p[column] for p in profiles]
+        if column in VOCABULARIES:
+            pool = VOCABULARIES[column].encode(pool)
+        book[column] = np.asarray(pool)[rows]
+    return book
+
+
+def time_it(func, number: int, repeat: int) -> dict:
+    """Times `number` calls of `func`, `repeat` times; reports seconds per call."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - start) / number)
+    return {"seconds_per_op": statistics.median(runs), "min_seconds_per_op": min(runs),
+            "number": number, "repeat": repeat}
+
+
+def run_benchmarks(quick: bool = False, only: str = None) -> dict:
+    import pandas as pd
+    import data_utils
+    from batch_pricing import price_portfolio
+    from pricing import price_profile
+    from visualizations import (
+        plot_risk_factor_contributions, plot_historical_trends, plot_skill_proficiency, plot_skill_gap_radar
+    )
+
+    repeat = 3 if quick else 5
+    profiles = make_profiles(PROFILE_POOL_SIZE)
+    pricing_fields = [f for f in profiles[0] if f not in ("user_id", "name")]
+    quotes = [{f: p[f] for f in pricing_fields} for p in profiles]
+    history = pd.DataFrame({
+        "Month": range(60),
+        "Idiosyncratic Risk": np.linspace(40, 20, 60),
+        "Systematic Risk": np.full(60, 35.0),
+        "Monthly Premium": np.linspace(60, 20, 60),
+    })
+    skills = pd.DataFrame({
+        "Month": range(60),
+        "General Skill Progress": np.linspace(10, 90, 60),
+        "Firm-Specific Skill Progress": np.linspace(20, 60, 60),
+    })
+
+    cases = {}
+
+    def quote_chain():
+        for q in quotes:
+            price_profile(q)
+    cases["scalar_quote_chain"] = (lambda: time_it(quote_chain, 1, repeat), len(quotes))
+
+    def batch(size):
+        book = make_book(profiles, size)
+        return time_it(lambda: price_portfolio(book), 1, 1 if size >= 1_000_000 else repeat)
+    for size in (QUICK_BATCH_SIZES if quick else BATCH_SIZES):
+        cases[f"batch_price_portfolio_{size}"] = (lambda size=size: batch(size), size)
+
+    def lookups():
+        for q in quotes:
+            data_utils.get_occupation_hazard(q["occupation"])
+            data_utils.get_role_multiplier(q["occupation"])
+            data_utils.get_company_type_factor(q["company_type"])
+            data_utils.get_education_level_factor(q["education_level"])
+            data_utils.get_education_field_factor(q["education_field"])
+            data_utils.get_school_tier_factor(q["school_tier"])
+            data_utils.get_economic_climate_modifier(q["economic_climate"])
+            data_utils.get_ai_innovation_index(q["ai_innovation_pace"])
+    cases["data_utils_lookups"] = (lambda: time_it(lookups, 1, repeat), len(quotes) * 8)
+    cases["learning_resources_by_skill_type"] = (
+        lambda: time_it(lambda: data_utils.get_learning_resources_by_skill_type("general"), 200, repeat), 1)
+    cases["skills_for_occupation"] = (
+        lambda: time_it(lambda: [data_utils.get_skills_for_occupation(o) for o in OCCUPATION_HAZARDS], 200, repeat),
+        len(OCCUPATION_HAZARDS))
+
+    cases["figure_risk_factor_contributions"] = (
+        lambda: time_it(lambda: plot_risk_factor_contributions(0.45, 0.95, 0.5, 40.0, 1.0, 1.0), 5, repeat), 1)
+    cases["figure_historical_trends"] = (lambda: time_it(lambda: plot_historical_trends(history), 5, repeat), 1)
+    cases["figure_skill_proficiency"] = (lambda: time_it(lambda: plot_skill_proficiency(skills), 5, repeat), 1)
+    cases["figure_skill_gap_radar"] = (
+        lambda: time_it(lambda: plot_skill_gap_radar(
+            {"General Skills": 50, "Firm-Specific Skills": 40},
+            {"General Skills": 80, "Firm-Specific Skills": 70, "Adaptability": 40}), 5, repeat), 1)
+
+    results = {}
+    for name, (run, items) in cases.items():
+        if only and only not in name:
+            continue
+        stats = run()
+        stats["items_per_op"] = items
+        stats["seconds_per_item"] = stats["seconds_per_op"] / items
+        results[name] = stats
+        print(f"{name:<40} {stats['seconds_per_op'] * 1e3:12.3f} ms/op {stats['seconds_per_item'] * 1e6:12.3f} us/item",
+              file=sys.stderr)
+    return results
+
+
+def probe_import(module: str, repeat: int = 3) -> dict:
+    """
+    Cold-imports `module` in a fresh interpreter `repeat` times. Returns {"seconds": fastest run,
+    "heavy": HEAVY_MODULES it left in sys.modules}.
+    """
+    probe = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    runs = [json.loads(subprocess.run([sys.executable, "-c", probe], check=True, capture_output=True, text=True,
+                                      cwd=os.path.dirname(os.path.abspath(__file__))).stdout)
+            for _ in range(repeat)]
+    return {"seconds": min(r["seconds"] for r in runs), "heavy": runs[0]["heavy"]}
+
+
+def check_imports(budget: float = DEFAULT_IMPORT_BUDGET, repeat: int = 3) -> tuple:
+    """
+    Cold-imports every CORE_MODULES entry in a fresh interpreter `repeat` times. Returns
+    ({module: {"seconds", "heavy"}}, [violation messages]); "seconds" is the fastest run.
+    """
+    timings, violations = {}, []
+    for module in CORE_MODULES:
+        timings[module] = probe_import(module, repeat)
+        if timings[module]["heavy"]:
+            violations.append(f"{module} imports {', '.join(timings[module]['heavy'])}")
+        if timings[module]["seconds"] > budget:
+            violations.append(f"{module} takes {timings[module]['seconds'] * 1e3:.1f} ms to import "
+                              f"(budget {budget * 1e3:.0f} ms)")
+        print(f"import {module:<34} {timings[module]['seconds'] * 1e3:10.1f} ms", file=sys.stderr)
+    return timings, violations
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns (name, baseline, current, ratio) for benchmarks slower than baseline * (1 + threshold)."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None or base["seconds_per_op"] <= 0:
+            continue
+        ratio = stats["seconds_per_op"] / base["seconds_per_op"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["seconds_per_op"], stats["seconds_per_op"], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pricing pipeline and figure builders.")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--quick", action="store_true", help="Skip the 10M-row batch and repeat less")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this string")
+    parser.add_argument("--compare", metavar="BASELINE", help="Baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown fraction (default 0.25)")
+    parser.add_argument("--check-imports", action="store_true",
+                        help="Only check that core modules import fast and without pandas/plotly/streamlit")
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET,
+                        help=f"Seconds allowed per core module import (default {DEFAULT_IMPORT_BUDGET})")
+    args = parser.parse_args(argv)
+
+    if args.check_imports:
+        timings, violations = check_imports(args.import_budget)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"imports": timings}, f, indent=2)
+        for message in violations:
+            print(f"IMPORT VIOLATION {message}", file=sys.stderr)
+        return 1 if violations else 0
+
+    report = {
+        "meta": {"timestamp": time.time(), "python": platform.python_version(),
+                 "numpy": np.__version__, "platform": platform.platform(), "quick": args.quick},
+        "results": run_benchmarks(args.quick, args.only),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(report["results"], baseline, args.threshold)
+        for name, base, current, ratio in regressions:
+            print(f"REGRESSION {name}: {base * 1e3:.3f} ms -> {current * 1e3:.3f} ms ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 
 import numpy as np
+from instrumentation import instrumented
 from actuarial_params import BETA_SYSTEMIC, BETA_INDIVIDUAL, LAMBDA, P_MIN, TTV, W_CR, W_US, GAMMA_GEN, GAMMA_SPEC, W_ECON, W_INNO
 
+@instrumented()
 def calculate_fexp(years_experience: float) -> float:
     """
     Calculates the Experience Factor (f_exp).
@@ -9,6 +11,7 @@ def calculate_fexp(years_experience: float) -> float:
     """
     return 1 - (0.015 * min(years_experience, 20))
 
+@instrumented()
 def calculate_fhc(f_role: float, f_level: float, f_field: float, f_school: float, f_exp: float) -> float:
     """
     Calculates the Human Capital Factor (FHC).
@@ -16,6 +19,7 @@ def calculate_fhc(f_role: float, f_level: float, f_field: float, f_school: float
     """
     return f_role * f_level * f_field * f_school * f_exp
 
+@instrumented()
 def calculate_fus(p_gen: float, p_spec: float, gamma_gen: float = GAMMA_GEN, gamma_spec: float = GAMMA_SPEC) -> float:
     """
     Calculates the Upskilling Factor (F_US).
@@ -23,6 +27,7 @@ def calculate_fus(p_gen: float, p_spec: float, gamma_gen: float = GAMMA_GEN, gam
     """
     return 1 - (gamma_gen * p_gen + gamma_spec * p_spec)
 
+@instrumented()
 def calculate_fcr(s_senti: float, s_fin: float, s_growth: float, w1: float = 0.33, w2: float = 0.34, w3: float = 0.33) -> float:
     """
     Calculates the Company Risk Factor (FCR).
@@ -35,6 +40,7 @@ def calculate_fcr(s_senti: float, s_fin: float, s_growth: float, w1: float = 0.3
     # would need to be provided as inputs.
     return s_senti # Renamed s_senti to simply fcr_value as it directly represents the FCR from lookup
 
+@instrumented()
 def calculate_v_idiosyncratic_raw(fhc: float, fcr: float, fus: float, w_cr: float = W_CR, w_us: float = W_US) -> float:
     """
     Calculates the raw Idiosyncratic Risk (V_raw).
@@ -42,6 +48,7 @@ def calculate_v_idiosyncratic_raw(fhc: float, fcr: float, fus: float, w_cr: floa
     """
     return fhc * (w_cr * fcr + w_us * fus)
 
+@instrumented()
 def calculate_v_idiosyncratic_normalized(v_raw: float) -> float:
     """
     Normalizes the Idiosyncratic Risk score (V_i(t)) to a scale of 0-100.
@@ -49,6 +56,7 @@ def calculate_v_idiosyncratic_normalized(v_raw: float) -> float:
     """
     return min(100.0, max(5.0, v_raw * 50.0))
 
+@instrumented()
 def calculate_h_base_ttv(h_current: float, h_target: float, k: int, ttv: int = TTV) -> float:
     """
     Calculates the Base Occupational Hazard (H_base(k)) adjusted for career transitions using TTV.
@@ -58,6 +66,7 @@ def calculate_h_base_ttv(h_current: float, h_target: float, k: int, ttv: int = T
         return h_target
     return (1 - k/ttv) * h_current + (k/ttv) * h_target
 
+@instrumented()
 def calculate_systematic_risk(h_base: float, m_econ: float, i_ai: float, w_econ: float = W_ECON, w_inno: float = W_INNO) -> float:
     """
     Calculates the Systematic Risk score (H_i).
@@ -65,6 +74,7 @@ def calculate_systematic_risk(h_base: float, m_econ: float, i_ai: float, w_econ:
     """
     return h_base * (w_econ * m_econ + w_inno * i_ai)
 
+@instrumented()
 def calculate_p_systemic(h_i: float, beta_systemic: float = BETA_SYSTEMIC) -> float:
     """
     Calculates the Probability of a systemic displacement event (P_systemic).
@@ -72,6 +82,7 @@ def calculate_p_systemic(h_i: float, beta_systemic: float = BETA_SYSTEMIC) -> fl
     """
     return (h_i / 100.0) * beta_systemic
 
+@instrumented()
 def calculate_p_individual_conditional(v_i_t: float, beta_individual: float = BETA_INDIVIDUAL) -> float:
     """
     Calculates the Conditional probability of job loss for the individual (P_individual|systemic).
@@ -79,6 +90,7 @@ def calculate_p_individual_conditional(v_i_t: float, beta_individual: float = BE
     """
     return (v_i_t / 100.0) * beta_individual
 
+@instrumented()
 def calculate_p_claim(p_systemic: float, p_individual_conditional: float) -> float:
     """
     Calculates the Annual Claim Probability (P_claim).
@@ -86,6 +98,7 @@ def calculate_p_claim(p_systemic: float, p_individual_conditional: float) -> flo
     """
     return p_systemic * p_individual_conditional
 
+@instrumented()
 def calculate_l_payout(annual_salary: float, coverage_duration_months: int, coverage_percentage: float) -> float:
     """
     Calculates the Total payout amount if a claim is triggered (L_payout).
@@ -93,6 +106,7 @@ def calculate_l_payout(annual_salary: float, coverage_duration_months: int, cove
     """
     return (annual_salary / 12.0 * coverage_duration_months) * coverage_percentage
 
+@instrumented()
 def calculate_expected_loss(p_claim: float, l_payout: float) -> float:
     """
     Calculates the Annual Expected Loss (E[Loss]).
@@ -100,6 +114,7 @@ def calculate_expected_loss(p_claim: float, l_payout: float) -> float:
     """
     return p_claim * l_payout
 
+@instrumented()
 def calculate_monthly_premium(e_loss: float, lambd: float = LAMBDA, p_min: float = P_MIN) -> float:
     """
     Calculates the Monthly Premium (P_monthly).
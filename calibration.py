@@ -0,0 +1,388 @@
+import argparse
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from actuarial_params import default_parameters
+from batch_pricing import SCENARIO_COLUMNS, calculate_fexp_vec, calculate_v_idiosyncratic_normalized_vec
+from factor_tables import (
+    FACTOR_TABLES, OCCUPATION_HAZARD_TABLE, ROLE_MULTIPLIER_TABLE, EDUCATION_LEVEL_TABLE, EDUCATION_FIELD_TABLE,
+    SCHOOL_TIER_TABLE, COMPANY_TYPE_TABLE, ECONOMIC_CLIMATE_TABLE, AI_INNOVATION_TABLE, encode_column
+)
+from model_registry import validate_model
+from parameter_sets import save_parameter_set
+from simulation import chunk_rng
+
+# Exposure data: the rating columns of a policy plus exposure (policy-years, default 1) and the
+# number of claims observed over it. Rows may be single policy-years or aggregated cells.
+RATING_COLUMNS = [
+    "occupation", "education_level", "education_field", "school_tier", "company_type",
+    "years_experience", "general_skill_progress", "firm_specific_skill_progress",
+]
+EXPOSURE_COLUMN = "exposure_years"
+CLAIMS_COLUMN = "claims"
+# Per-row quantities the likelihood needs; none depends on the fitted parameters.
+FEATURES = ("fhc", "fcr", "p_gen", "p_spec", "h_base", "m_econ", "i_ai", "exposure", "claims")
+
+# Only the product BETA_SYSTEMIC * BETA_INDIVIDUAL, the ratio W_ECON / W_INNO and the V_raw
+# weights up to scale are identified by claims, so the weight pairs are tied to sum to one
+# (W_US = 1 - W_CR, W_INNO = 1 - W_ECON, as app.py recommends) and only one beta is fitted.
+FITTABLE_PARAMETERS = ("BETA_SYSTEMIC", "BETA_INDIVIDUAL", "W_CR", "GAMMA_GEN", "GAMMA_SPEC", "W_ECON")
+DEFAULT_FREE_PARAMETERS = ("BETA_INDIVIDUAL", "W_CR", "GAMMA_GEN", "GAMMA_SPEC", "W_ECON")
+TIED_PARAMETERS = {"W_US": "W_CR", "W_INNO": "W_ECON"}
+
+DEFAULT_BATCH_ROWS = 65_536
+# Rows per unit of work; batches and full passes are reduced block by block in a fixed order,
+# so results do not depend on the number of workers.
+DEFAULT_BLOCK_ROWS = 16_384
+PROBABILITY_FLOOR = 1e-15
+# Longest BHHH step on the logit scale: a full Newton step from a flat region of the likelihood
+# can otherwise throw a parameter to a bound of (0, 1), where its gradient vanishes.
+MAX_LOGIT_STEP = 2.0
+# A fitted parameter this far out on the logit scale (within ~2e-9 of 0 or 1) has saturated;
+# the fit is then reported as not converged.
+SATURATED_LOGIT = 20.0
+
+
+def prepare_exposures(df, unknown_report: dict = None, shuffle_seed: int = 0) -> dict:
+    """
+    FEATURES arrays of an exposure dataset (any column mapping holding RATING_COLUMNS and
+    CLAIMS_COLUMN; scenario columns default to "Neutral"). Rows are shuffled once with
+    `shuffle_seed` so that contiguous minibatches are random samples (None keeps the order).
+    """
+    missing = [column for column in RATING_COLUMNS + [CLAIMS_COLUMN] if column not in df]
+    if missing:
+        raise KeyError(f"Exposure data is missing required columns: {missing}")
+    n = len(df["occupation"])
+    report = {} if unknown_report is None else unknown_report
+    occupation = encode_column("occupation", df["occupation"], report)
+    scenario = {column: encode_column(column, df[column] if column in df else np.full(n, "Neutral"), report)
+                for column in SCENARIO_COLUMNS}
+    f_exp = calculate_fexp_vec(np.asarray(df["years_experience"], dtype=np.float64))
+    features = {
+        "fhc": (ROLE_MULTIPLIER_TABLE.gather(occupation)
+                * EDUCATION_LEVEL_TABLE.gather(encode_column("education_level", df["education_level"], report))
+                * EDUCATION_FIELD_TABLE.gather(encode_column("education_field", df["education_field"], report))
+                * SCHOOL_TIER_TABLE.gather(encode_column("school_tier", df["school_tier"], report)) * f_exp),
+        "fcr": COMPANY_TYPE_TABLE.gather(encode_column("company_type", df["company_type"], report)),
+        "p_gen": np.asarray(df["general_skill_progress"], dtype=np.float64),
+        "p_spec": np.asarray(df["firm_specific_skill_progress"], dtype=np.float64),
+        # k = 0 as in price_portfolio, so H_base is the occupation's hazard
+        "h_base": OCCUPATION_HAZARD_TABLE.gather(occupation),
+        "m_econ": ECONOMIC_CLIMATE_TABLE.gather(scenario["economic_climate"]),
+        "i_ai": AI_INNOVATION_TABLE.gather(scenario["ai_innovation_pace"]),
+        "exposure": (np.asarray(df[EXPOSURE_COLUMN], dtype=np.float64) if EXPOSURE_COLUMN in df else np.ones(n)),
+        "claims": np.asarray(df[CLAIMS_COLUMN], dtype=np.float64),
+    }
+    if np.any(features["exposure"] <= 0) or np.any(features["claims"] < 0) or np.any(features["claims"] > features["exposure"]):
+        raise ValueError("Exposure must be positive and claims must lie between 0 and the exposure")
+    if shuffle_seed is not None:
+        order = np.random.default_rng(shuffle_seed).permutation(n)
+        features = {name: values[order] for name, values in features.items()}
+    return features
+
+
+def save_exposures(features: dict, path: str) -> None:
+    """Writes prepared FEATURES as one .npy file per array (loaded memory-mapped by load_exposures)."""
+    os.makedirs(path, exist_ok=True)
+    for name in FEATURES:
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(features[name], dtype=np.float64))
+
+
+def load_exposures(path: str) -> dict:
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in FEATURES}
+
+
+def claim_probability(features: dict, params: dict, rows=slice(None)) -> np.ndarray:
+    r"""
+    $P_{claim} = P_{systemic} \cdot P_{individual|systemic}$ for the exposure rows, with the
+    operation order of batch_pricing.price_portfolio (results are bit-identical to its p_claim).
+    """
+    fus = 1 - (params["GAMMA_GEN"] * features["p_gen"][rows] + params["GAMMA_SPEC"] * features["p_spec"][rows])
+    v_raw = features["fhc"][rows] * (params["W_CR"] * features["fcr"][rows] + params["W_US"] * fus)
+    v_idiosyncratic = calculate_v_idiosyncratic_normalized_vec(v_raw)
+    h_systematic = features["h_base"][rows] * (params["W_ECON"] * features["m_econ"][rows]
+                                               + params["W_INNO"] * features["i_ai"][rows])
+    return ((h_systematic / 100.0) * params["BETA_SYSTEMIC"]) * ((v_idiosyncratic / 100.0) * params["BETA_INDIVIDUAL"])
+
+
+def tie_parameters(params: dict) -> dict:
+    """Copy of `params` with the TIED_PARAMETERS set from the weights they are tied to."""
+    params = dict(params)
+    for tied, source in TIED_PARAMETERS.items():
+        params[tied] = 1.0 - params[source]
+    return params
+
+
+def _scores(features: dict, params: dict, free: tuple, rows) -> tuple:
+    r"""
+    Binomial log-likelihood of the rows, $\sum_i k_i \log p_i + (n_i - k_i) \log(1 - p_i)$
+    (n = exposure, k = claims), its gradient over the `free` parameters and the sum of
+    per-row score outer products (BHHH information), all from analytic derivatives.
+    """
+    f = {name: np.asarray(features[name][rows]) for name in FEATURES}
+    fus = 1 - (params["GAMMA_GEN"] * f["p_gen"] + params["GAMMA_SPEC"] * f["p_spec"])
+    v_raw = f["fhc"] * (params["W_CR"] * f["fcr"] + params["W_US"] * fus)
+    v = calculate_v_idiosyncratic_normalized_vec(v_raw)
+    modifier = params["W_ECON"] * f["m_econ"] + params["W_INNO"] * f["i_ai"]
+    p = ((f["h_base"] * modifier / 100.0) * params["BETA_SYSTEMIC"]) * ((v / 100.0) * params["BETA_INDIVIDUAL"])
+    p = np.clip(p, PROBABILITY_FLOOR, 1 - PROBABILITY_FLOOR)
+    k, n = f["claims"], f["exposure"]
+    log_likelihood = float(np.sum(k * np.log(p) + (n - k) * np.log1p(-p)))
+
+    # d log L / dp, then dp / d parameter; V has zero slope where it is clipped to [5, 100]
+    dl_dp = k / p - (n - k) / (1 - p)
+    dv_dvraw = np.where((v_raw * 50.0 > 5.0) & (v_raw * 50.0 < 100.0), 50.0, 0.0)
+    dp_dv = p / v * dv_dvraw * f["fhc"]
+    derivatives = {
+        "BETA_SYSTEMIC": lambda: p / params["BETA_SYSTEMIC"],
+        "BETA_INDIVIDUAL": lambda: p / params["BETA_INDIVIDUAL"],
+        "W_ECON": lambda: p * (f["m_econ"] - f["i_ai"]) / modifier,
+        "W_CR": lambda: dp_dv * (f["fcr"] - fus),
+        "GAMMA_GEN": lambda: -dp_dv * params["W_US"] * f["p_gen"],
+        "GAMMA_SPEC": lambda: -dp_dv * params["W_US"] * f["p_spec"],
+    }
+    scores = np.column_stack([dl_dp * derivatives[name]() for name in free])
+    return log_likelihood, scores.sum(axis=0), scores.T @ scores
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(path: str) -> None:
+    _WORKER_STATE["features"] = load_exposures(path)
+
+
+def _block_scores(task) -> tuple:
+    start, stop, params, free = task
+    return _scores(_WORKER_STATE["features"], params, free, slice(start, stop))
+
+
+class _Evaluator:
+    """
+    Sums _scores over row ranges, block by block, on a process pool or in process. In-process
+    evaluators keep their own features, so concurrent fits in one process do not share state.
+    """
+
+    def __init__(self, features: dict, workers: int, block_rows: int, path: str = None):
+        self.n = len(features["claims"])
+        self.block_rows = block_rows
+        self.features = features
+        self.pool = self.staging = None
+        if workers > 1:
+            if path is None:
+                # Workers memory-map one copy of the features instead of receiving pickled arrays
+                self.staging = path = tempfile.mkdtemp(prefix="calibration-")
+                save_exposures(features, path)
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,))
+
+    def __call__(self, params: dict, free: tuple, start: int = 0, stop: int = None) -> tuple:
+        stop = self.n if stop is None else stop
+        tasks = [(s, min(s + self.block_rows, stop), params, free) for s in range(start, stop, self.block_rows)]
+        if self.pool is not None:
+            results = self.pool.map(_block_scores, tasks)
+        else:
+            results = (_scores(self.features, params, free, slice(start, stop)) for start, stop, _, _ in tasks)
+        log_likelihood, gradient, information = 0.0, np.zeros(len(free)), np.zeros((len(free), len(free)))
+        for block_ll, block_gradient, block_information in results:
+            log_likelihood += block_ll
+            gradient += block_gradient
+            information += block_information
+        return log_likelihood, gradient, information
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.staging is not None:
+            shutil.rmtree(self.staging, ignore_errors=True)
+
+
+def _logit(x):
+    return np.log(x) - np.log1p(-x)
+
+
+def _expit(u):
+    # exp of a non-positive argument only, so large |u| cannot overflow
+    e = np.exp(-np.abs(u))
+    return np.where(u >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+
+def _to_parameters(u: np.ndarray, free: tuple, params: dict) -> tuple:
+    """
+    Values of the `free` parameters at the unconstrained coordinates `u` and their Jacobian
+    d value / d u. Each value is expit(u), except that GAMMA_SPEC is a fraction of GAMMA_GEN
+    (and a lone GAMMA_GEN lies above the fixed GAMMA_SPEC), so every fit keeps the
+    0 <= GAMMA_SPEC < GAMMA_GEN <= 1 rule of model_registry.validate_model.
+    """
+    x = _expit(u)
+    dx = x * (1 - x)
+    values, jacobian = x.copy(), np.diag(dx)
+    index = {name: i for i, name in enumerate(free)}
+    gen, spec = index.get("GAMMA_GEN"), index.get("GAMMA_SPEC")
+    if gen is not None and spec is not None:
+        values[spec] = x[gen] * x[spec]
+        jacobian[spec, gen], jacobian[spec, spec] = x[spec] * dx[gen], x[gen] * dx[spec]
+    elif spec is not None:
+        values[spec] = params["GAMMA_GEN"] * x[spec]
+        jacobian[spec, spec] = params["GAMMA_GEN"] * dx[spec]
+    elif gen is not None:
+        values[gen] = params["GAMMA_SPEC"] + (1 - params["GAMMA_SPEC"]) * x[gen]
+        jacobian[gen, gen] = (1 - params["GAMMA_SPEC"]) * dx[gen]
+    return values, jacobian
+
+
+def _to_coordinates(params: dict, free: tuple) -> np.ndarray:
+    """Inverse of _to_parameters; raises ValueError for starting values it cannot represent."""
+    x = np.array([params[name] for name in free], dtype=np.float64)
+    if "GAMMA_SPEC" in free:
+        x[free.index("GAMMA_SPEC")] = params["GAMMA_SPEC"] / params["GAMMA_GEN"] if params["GAMMA_GEN"] > 0 else np.nan
+    elif "GAMMA_GEN" in free:
+        x[free.index("GAMMA_GEN")] = (params["GAMMA_GEN"] - params["GAMMA_SPEC"]) / (1 - params["GAMMA_SPEC"])
+    if not np.all((x > 0.0) & (x < 1.0)):
+        raise ValueError("Starting values of the fitted parameters must lie in (0, 1) with GAMMA_SPEC < GAMMA_GEN")
+    return _logit(x)
+
+
+def fit_parameters(data, params: dict = None, free=DEFAULT_FREE_PARAMETERS, epochs: int = 3,
+                   batch_rows: int = DEFAULT_BATCH_ROWS, learning_rate: float = 0.05, max_newton_steps: int = 50,
+                   tol: float = 1e-10, seed: int = 0, workers: int = 1, block_rows: int = DEFAULT_BLOCK_ROWS,
+                   unknown_report: dict = None) -> dict:
+    """
+    Maximum-likelihood calibration of the `free` parameters against observed claims.
+    `data` is an exposure dataset (see prepare_exposures), prepared FEATURES, or a directory
+    written by save_exposures. Every fitted parameter lies in (0, 1) and is optimised on the
+    logit scale, GAMMA_SPEC as a fraction of GAMMA_GEN (see _to_parameters): `epochs` of minibatch Adam over `batch_rows` rows give a starting point, then
+    full-batch BHHH (Newton with the score outer-product information) steps run until the
+    relative log-likelihood gain falls below `tol`. Newton steps are capped at MAX_LOGIT_STEP on
+    the logit scale; "converged" is False when `max_newton_steps` run out, step halving finds no
+    improving step or a fitted parameter saturates at 0 or 1. Full passes and batches are split into
+    blocks evaluated by `workers` processes.
+    Returns {"parameters" (all PARAMETER_NAMES), "free", "log_likelihood", "standard_errors",
+    "converged", "newton_steps", "history" (mean minibatch log-likelihood per epoch), "rows",
+    "exposure", "claims"}.
+    """
+    free = tuple(free)
+    unknown = [name for name in free if name not in FITTABLE_PARAMETERS]
+    if unknown:
+        raise KeyError(f"Cannot calibrate {unknown}; fittable parameters are {FITTABLE_PARAMETERS}")
+    if {"BETA_SYSTEMIC", "BETA_INDIVIDUAL"} <= set(free):
+        raise ValueError("Only the product BETA_SYSTEMIC * BETA_INDIVIDUAL is identifiable; fit one of them")
+    path = data if isinstance(data, str) else None
+    if path is not None:
+        features = load_exposures(path)
+    elif all(name in data for name in FEATURES):
+        features = data
+    else:
+        features = prepare_exposures(data, unknown_report, seed)
+    params = tie_parameters(default_parameters() if params is None else params)
+
+    def with_values(u: np.ndarray) -> dict:
+        return tie_parameters({**params, **dict(zip(free, _to_parameters(u, free, params)[0].tolist()))})
+
+    u = _to_coordinates(params, free)
+    evaluate = _Evaluator(features, max(1, workers), block_rows, path)
+    try:
+        n = evaluate.n
+        # Minibatch Adam on the mean log-likelihood per row, in the logit space
+        m, s, step, history = np.zeros_like(u), np.zeros_like(u), 0, []
+        starts = np.arange(0, n, batch_rows)
+        for epoch in range(epochs):
+            total = 0.0
+            for start in chunk_rng(seed, epoch).permutation(starts):
+                stop = min(start + batch_rows, n)
+                current = with_values(u)
+                log_likelihood, gradient, _ = evaluate(current, free, int(start), stop)
+                gradient = _to_parameters(u, free, params)[1].T @ gradient / (stop - start)
+                step += 1
+                m = 0.9 * m + 0.1 * gradient
+                s = 0.999 * s + 0.001 * gradient ** 2
+                u = u + learning_rate * (m / (1 - 0.9 ** step)) / (np.sqrt(s / (1 - 0.999 ** step)) + 1e-8)
+                total += log_likelihood
+            history.append(total / n)
+
+        # Full-batch BHHH steps with step halving
+        log_likelihood, gradient, information = evaluate(with_values(u), free)
+        converged, newton_steps = False, 0
+        while newton_steps < max_newton_steps and not converged:
+            jacobian = _to_parameters(u, free, params)[1]
+            grad_u = jacobian.T @ gradient
+            info_u = jacobian.T @ information @ jacobian
+            direction = np.linalg.solve(info_u + 1e-12 * np.trace(info_u) * np.eye(len(u)), grad_u)
+            length = np.linalg.norm(direction)
+            if length > MAX_LOGIT_STEP:
+                direction = direction * (MAX_LOGIT_STEP / length)
+            newton_steps += 1
+            for _ in range(30):
+                candidate = evaluate(with_values(u + direction), free)
+                if candidate[0] >= log_likelihood:
+                    break
+                direction = direction / 2
+            else:
+                # No step size improves the fit: stop and report it as not converged
+                break
+            gain = candidate[0] - log_likelihood
+            u = u + direction
+            log_likelihood, gradient, information = candidate
+            converged = gain <= tol * abs(log_likelihood)
+        if np.any(np.abs(u) > SATURATED_LOGIT):
+            # A parameter pinned at 0 or 1 stops the fit by flattening the gradient, not at an optimum
+            converged = False
+
+        fitted = with_values(u)
+        covariance = np.linalg.pinv(information)
+        features_claims = float(np.sum(features["claims"]))
+        return {
+            "parameters": fitted, "free": free, "log_likelihood": log_likelihood,
+            "standard_errors": dict(zip(free, np.sqrt(np.maximum(np.diag(covariance), 0.0)).tolist())),
+            "converged": converged, "newton_steps": newton_steps, "history": history,
+            "rows": n, "exposure": float(np.sum(features["exposure"])), "claims": features_claims,
+        }
+    finally:
+        evaluate.close()
+
+
+def save_calibration(result: dict, path: str) -> str:
+    """
+    Saves the fitted parameter set with the fit statistics as metadata and the factor tables it
+    was fitted with, so the file's version is the one model_registry gives the loaded model.
+    Returns the version; raises ValueError, without writing, when the fit fails validate_model.
+    """
+    metadata = {
+        "source": "calibration", "free": list(result["free"]), "log_likelihood": result["log_likelihood"],
+        "standard_errors": result["standard_errors"], "converged": result["converged"],
+        "rows": result["rows"], "exposure": result["exposure"], "claims": result["claims"],
+    }
+    factors = {name: table.factors() for name, table in FACTOR_TABLES.items()}
+    validate_model(result["parameters"], factors)
+    return save_parameter_set(result["parameters"], path, metadata, factors)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fit actuarial parameters to observed claims by maximum likelihood.")
+    parser.add_argument("exposures", help="CSV with the rating columns, 'claims' and optionally 'exposure_years'")
+    parser.add_argument("--out", required=True, help="Path of the parameter set JSON to write")
+    parser.add_argument("--free", nargs="+", default=list(DEFAULT_FREE_PARAMETERS), choices=FITTABLE_PARAMETERS)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    unknown_report = {}
+    result = fit_parameters(pd.read_csv(args.exposures), free=args.free, epochs=args.epochs,
+                            batch_rows=args.batch_rows, seed=args.seed, workers=args.workers,
+                            unknown_report=unknown_report)
+    version = save_calibration(result, args.out)
+    for name in result["free"]:
+        print(f"{name:<16} {result['parameters'][name]:.6f}  (s.e. {result['standard_errors'][name]:.6f})")
+    print(f"log-likelihood {result['log_likelihood']:.4f} over {result['rows']} rows, "
+          f"{'converged' if result['converged'] else 'not converged'}; wrote {args.out} (version {version})")
+    if unknown_report:
+        print(f"Unknown categories priced at defaults: {unknown_report}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
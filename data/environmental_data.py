@@ -10,3 +10,23 @@ AI_INNOVATION_SCENARIOS = {
     "Rapid Breakthroughs (High Velocity)": 1.2,
     "Slowdown (Low Velocity)": 0.8,
 }
+
+# Monthly regime transition probabilities (row: current state, column: next state) for stress testing.
+ECONOMIC_CLIMATE_TRANSITIONS = {
+    "Neutral": {"Neutral": 0.95, "Recession (Low Investment)": 0.03, "Boom (High Investment)": 0.02},
+    "Recession (Low Investment)": {"Neutral": 0.09, "Recession (Low Investment)": 0.90, "Boom (High Investment)": 0.01},
+    "Boom (High Investment)": {"Neutral": 0.07, "Recession (Low Investment)": 0.01, "Boom (High Investment)": 0.92},
+}
+
+AI_INNOVATION_TRANSITIONS = {
+    "Neutral": {"Neutral": 0.96, "Rapid Breakthroughs (High Velocity)": 0.02, "Slowdown (Low Velocity)": 0.02},
+    "Rapid Breakthroughs (High Velocity)": {"Neutral": 0.06, "Rapid Breakthroughs (High Velocity)": 0.93, "Slowdown (Low Velocity)": 0.01},
+    "Slowdown (Low Velocity)": {"Neutral": 0.06, "Rapid Breakthroughs (High Velocity)": 0.01, "Slowdown (Low Velocity)": 0.93},
+}
+
+# The AI innovation regime each economic regime pulls towards when the two are correlated.
+PAIRED_AI_INNOVATION = {
+    "Neutral": "Neutral",
+    "Recession (Low Investment)": "Slowdown (Low Velocity)",
+    "Boom (High Investment)": "Rapid Breakthroughs (High Velocity)",
+}
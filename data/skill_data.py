@@ -1,6 +1,4 @@
 
-import pandas as pd
-
 SKILL_CATEGORIES = {
     "Python": "general",
     "Data Analysis": "general",
@@ -20,18 +18,56 @@ SKILL_CATEGORIES = {
     "Advanced Excel": "general", # Added for more general skills
 }
 
-LEARNING_RESOURCES = pd.DataFrame([
-    {"Skill": "Python", "Type": "general", "Course Name": "Python for Data Science", "Platform": "Coursera", "Link": "https://www.coursera.org/courses?query=python%20for%20data%20science"},
-    {"Skill": "Data Analysis", "Type": "general", "Course Name": "Data Analysis with Python", "Platform": "edX", "Link": "https://www.edx.org/learn/data-analysis/data-analysis-with-python"},
-    {"Skill": "Machine Learning", "Type": "general", "Course Name": "Machine Learning Specialization", "Platform": "DeepLearning.AI", "Link": "https://www.deeplearning.ai/courses/machine-learning-specialization/"},
-    {"Skill": "Cloud Computing", "Type": "general", "Course Name": "AWS Certified Cloud Practitioner", "Platform": "Udemy", "Link": "https://www.udemy.com/courses/aws-certified-cloud-practitioner-clf-c01/"},
-    {"Skill": "Project Management", "Type": "general", "Course Name": "Google Project Management", "Platform": "Coursera", "Link": "https://www.coursera.org/professional-certificates/google-project-management"},
-    {"Skill": "Proprietary CRM Software", "Type": "firm-specific", "Course Name": "Internal CRM Training Module 1", "Platform": "Internal LMS", "Link": "#"},
-    {"Skill": "Internal Compliance Procedures", "Type": "firm-specific", "Course Name": "Compliance 101 for New Hires", "Platform": "Internal LMS", "Link": "#"},
-    {"Skill": "Company-specific Financial Models", "Type": "firm-specific", "Course Name": "Advanced Financial Modeling with Acme Corp Data", "Platform": "Internal Training", "Link": "#"},
-    {"Skill": "Legacy System Maintenance", "Type": "firm-specific", "Course Name": "Understanding XyZ Legacy System", "Platform": "Internal Wiki", "Link": "#"},
-    {"Skill": "Agile Scrum Master", "Type": "general", "Course Name": "Professional Scrum Master I (PSM I)", "Platform": "Scrum.org", "Link": "https://www.scrum.org/courses/professional-scrum-master-i-psm-i"},
-    {"Skill": "SQL", "Type": "general", "Course Name": "SQL for Data Science", "Platform": "Coursera", "Link": "https://www.coursera.org/learn/sql-for-data-science"},
-    {"Skill": "Negotiation", "Type": "general", "Course Name": "Successful Negotiation: Essential Strategies and Skills", "Platform": "Coursera", "Link": "https://www.coursera.org/learn/negotiation-skills"},
-    {"Skill": "Advanced Excel", "Type": "general", "Course Name": "Microsoft Excel - Excel from Beginner to Advanced", "Platform": "Udemy", "Link": "https://www.udemy.com/course/microsoft-excel-excel-from-beginner-to-advanced-p/"},
-])
+# Occupation -> recommended skills, matched by keyword in the occupation name (first rule wins).
+OCCUPATION_SKILL_RULES = [
+    (("Engineer", "Analyst"), {
+        "general": ["Python", "Data Analysis", "Machine Learning", "Cloud Computing", "SQL", "Project Management"],
+        "firm-specific": ["Proprietary CRM Software", "Company-specific Financial Models"]
+    }),
+    (("Paralegal", "HR"), {
+        "general": ["Communication", "Problem Solving", "Critical Thinking", "Project Management", "Negotiation"],
+        "firm-specific": ["Internal Compliance Procedures", "Legacy System Maintenance"]
+    }),
+    (("Financial Advisor",), {
+        "general": ["Data Analysis", "Critical Thinking", "Communication", "Advanced Excel"],
+        "firm-specific": ["Company-specific Financial Models", "Internal Compliance Procedures"]
+    }),
+    (("Customer Service",), {
+        "general": ["Communication", "Problem Solving", "Critical Thinking"],
+        "firm-specific": ["Proprietary CRM Software", "Internal Compliance Procedures"]
+    }),
+]
+
+DEFAULT_OCCUPATION_SKILLS = {
+    "general": ["Python", "Data Analysis", "Project Management", "Communication"],
+    "firm-specific": ["Internal Compliance Procedures", "Proprietary CRM Software"]
+}
+
+# Plain records so importing this module stays cheap; the DataFrame view is built on first use.
+# Effort Hours is the expected study time; Progress Gain is the skill progress (0-1) a course adds
+# to P_gen for general courses or P_spec for firm-specific ones.
+LEARNING_RESOURCE_RECORDS = [
+    {"Skill": "Python", "Type": "general", "Course Name": "Python for Data Science", "Platform": "Coursera", "Link": "https://www.coursera.org/courses?query=python%20for%20data%20science", "Effort Hours": 40, "Progress Gain": 0.15},
+    {"Skill": "Data Analysis", "Type": "general", "Course Name": "Data Analysis with Python", "Platform": "edX", "Link": "https://www.edx.org/learn/data-analysis/data-analysis-with-python", "Effort Hours": 30, "Progress Gain": 0.10},
+    {"Skill": "Machine Learning", "Type": "general", "Course Name": "Machine Learning Specialization", "Platform": "DeepLearning.AI", "Link": "https://www.deeplearning.ai/courses/machine-learning-specialization/", "Effort Hours": 90, "Progress Gain": 0.25},
+    {"Skill": "Cloud Computing", "Type": "general", "Course Name": "AWS Certified Cloud Practitioner", "Platform": "Udemy", "Link": "https://www.udemy.com/courses/aws-certified-cloud-practitioner-clf-c01/", "Effort Hours": 15, "Progress Gain": 0.05},
+    {"Skill": "Project Management", "Type": "general", "Course Name": "Google Project Management", "Platform": "Coursera", "Link": "https://www.coursera.org/professional-certificates/google-project-management", "Effort Hours": 120, "Progress Gain": 0.20},
+    {"Skill": "Proprietary CRM Software", "Type": "firm-specific", "Course Name": "Internal CRM Training Module 1", "Platform": "Internal LMS", "Link": "#", "Effort Hours": 8, "Progress Gain": 0.10},
+    {"Skill": "Internal Compliance Procedures", "Type": "firm-specific", "Course Name": "Compliance 101 for New Hires", "Platform": "Internal LMS", "Link": "#", "Effort Hours": 4, "Progress Gain": 0.05},
+    {"Skill": "Company-specific Financial Models", "Type": "firm-specific", "Course Name": "Advanced Financial Modeling with Acme Corp Data", "Platform": "Internal Training", "Link": "#", "Effort Hours": 24, "Progress Gain": 0.20},
+    {"Skill": "Legacy System Maintenance", "Type": "firm-specific", "Course Name": "Understanding XyZ Legacy System", "Platform": "Internal Wiki", "Link": "#", "Effort Hours": 16, "Progress Gain": 0.15},
+    {"Skill": "Agile Scrum Master", "Type": "general", "Course Name": "Professional Scrum Master I (PSM I)", "Platform": "Scrum.org", "Link": "https://www.scrum.org/courses/professional-scrum-master-i-psm-i", "Effort Hours": 16, "Progress Gain": 0.05},
+    {"Skill": "SQL", "Type": "general", "Course Name": "SQL for Data Science", "Platform": "Coursera", "Link": "https://www.coursera.org/learn/sql-for-data-science", "Effort Hours": 20, "Progress Gain": 0.10},
+    {"Skill": "Negotiation", "Type": "general", "Course Name": "Successful Negotiation: Essential Strategies and Skills", "Platform": "Coursera", "Link": "https://www.coursera.org/learn/negotiation-skills", "Effort Hours": 12, "Progress Gain": 0.05},
+    {"Skill": "Advanced Excel", "Type": "general", "Course Name": "Microsoft Excel - Excel from Beginner to Advanced", "Platform": "Udemy", "Link": "https://www.udemy.com/course/microsoft-excel-excel-from-beginner-to-advanced-p/", "Effort Hours": 20, "Progress Gain": 0.05},
+]
+
+
+def __getattr__(name):
+    # LEARNING_RESOURCES is materialized lazily (PEP 562) so pandas is only imported when needed
+    if name == "LEARNING_RESOURCES":
+        import pandas as pd
+        frame = pd.DataFrame(LEARNING_RESOURCE_RECORDS)
+        globals()["LEARNING_RESOURCES"] = frame
+        return frame
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,61 @@
+import numpy as np
+
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the visual shape of the
+    series. The first and last points are kept; each interior bucket keeps the point forming
+    the largest triangle with the previously kept point and the mean of the next bucket.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("LTTB needs at least 3 output points")
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax_indices(y, n_out: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of each of (n_out - 2) // 2 equal buckets plus the first
+    and last points, so every peak and trough of the series survives downsampling.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:
+        raise ValueError("Min/max downsampling needs at least 4 output points")
+    n_buckets = max((n_out - 2) // 2, 1)
+    bucket = np.arange(n) * n_buckets // n
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    stops = np.append(starts[1:], n)
+    return np.unique(np.concatenate(([0, n - 1], order[starts], order[stops - 1])))
+
+
+def downsample_indices(x, y, max_points: int, method: str = "lttb") -> np.ndarray:
+    """Indices of at most `max_points` points of the series (every index when it is already short enough)."""
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method} (expected one of {DOWNSAMPLING_METHODS})")
+    if len(y) <= max_points:
+        return np.arange(len(y))
+    if method == "lttb":
+        return lttb_indices(x, y, max_points)
+    return minmax_indices(y, max_points)
@@ -0,0 +1,139 @@
+import numpy as np
+from instrumentation import increment
+from data.occupation_data import OCCUPATION_HAZARDS, ROLE_MULTIPLIERS, COMPANY_TYPE_FACTORS
+from data.education_data import EDUCATION_LEVEL_FACTORS, EDUCATION_FIELD_FACTORS, SCHOOL_TIER_FACTORS
+from data.environmental_data import ECONOMIC_CLIMATE_SCENARIOS, AI_INNOVATION_SCENARIOS
+
+# Code assigned to labels that are not in a vocabulary. Every factor array carries the
+# data_utils default in its last slot, so gathering with UNKNOWN_CODE yields that default.
+UNKNOWN_CODE = -1
+# unknown_report key of UNKNOWN_CODE codes passed to encode_column, whose labels are not known.
+ENCODED_UNKNOWN_LABEL = "<unknown code>"
+
+
+class CategoryVocabulary:
+    """
+    An integer coding of one categorical input (e.g. occupation).
+    Codes follow the insertion order of the source dict in data/, which is also the
+    option order of the corresponding selectbox in app.py.
+    """
+
+    def __init__(self, name: str, labels):
+        self.name = name
+        self.labels = tuple(labels)
+        self.index = {label: code for code, label in enumerate(self.labels)}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def encode(self, values, unknown_counts: dict = None) -> np.ndarray:
+        """
+        Maps a column of labels to int16 codes, resolving each distinct label once.
+        Labels outside the vocabulary get UNKNOWN_CODE; when `unknown_counts` is given,
+        their occurrences are added to it as {label: count}.
+        """
+        labels, inverse, counts = np.unique(np.asarray(values, dtype=object).astype(str),
+                                            return_inverse=True, return_counts=True)
+        label_codes = np.array([self.index.get(label, UNKNOWN_CODE) for label in labels], dtype=np.int16)
+        if unknown_counts is not None:
+            for label, code, count in zip(labels, label_codes, counts):
+                if code == UNKNOWN_CODE:
+                    unknown_counts[str(label)] = unknown_counts.get(str(label), 0) + int(count)
+        return label_codes[inverse.reshape(-1)]
+
+
+class FactorTable:
+    """
+    Contiguous float64 factors for one vocabulary, with the lookup default appended last.
+    """
+
+    def __init__(self, vocabulary: CategoryVocabulary, factors: dict, default: float):
+        self.vocabulary = vocabulary
+        self.default = float(default)
+        self.values = np.ascontiguousarray(
+            [float(factors[label]) for label in vocabulary.labels] + [self.default], dtype=np.float64
+        )
+
+    @classmethod
+    def from_values(cls, vocabulary: CategoryVocabulary, values: np.ndarray) -> "FactorTable":
+        """Wraps an existing factor array (default last), e.g. a memory-mapped one, without copying it."""
+        if values.shape != (len(vocabulary) + 1,):
+            raise ValueError(f"Expected {len(vocabulary) + 1} factors for {vocabulary.name}, got {values.shape}")
+        table = cls.__new__(cls)
+        table.vocabulary = vocabulary
+        table.default = float(values[-1])
+        table.values = values
+        return table
+
+    def gather(self, codes: np.ndarray) -> np.ndarray:
+        """Resolves a column of codes to factors with a single fancy-index gather."""
+        return self.values[codes]
+
+    def lookup(self, label: str) -> float:
+        """Factor of one label, or the default for labels outside the vocabulary (like data_utils)."""
+        return float(self.values[self.vocabulary.index.get(label, UNKNOWN_CODE)])
+
+    def factors(self) -> dict:
+        """{label: factor} in vocabulary order, without the default."""
+        return {label: float(value) for label, value in zip(self.vocabulary.labels, self.values[:-1])}
+
+
+OCCUPATIONS = CategoryVocabulary("occupation", OCCUPATION_HAZARDS.keys())
+EDUCATION_LEVELS = CategoryVocabulary("education_level", EDUCATION_LEVEL_FACTORS.keys())
+EDUCATION_FIELDS = CategoryVocabulary("education_field", EDUCATION_FIELD_FACTORS.keys())
+SCHOOL_TIERS = CategoryVocabulary("school_tier", SCHOOL_TIER_FACTORS.keys())
+COMPANY_TYPES = CategoryVocabulary("company_type", COMPANY_TYPE_FACTORS.keys())
+ECONOMIC_CLIMATES = CategoryVocabulary("economic_climate", ECONOMIC_CLIMATE_SCENARIOS.keys())
+AI_INNOVATION_PACES = CategoryVocabulary("ai_innovation_pace", AI_INNOVATION_SCENARIOS.keys())
+
+# Vocabularies keyed by the portfolio column they encode.
+VOCABULARIES = {
+    vocab.name: vocab
+    for vocab in (OCCUPATIONS, EDUCATION_LEVELS, EDUCATION_FIELDS, SCHOOL_TIERS,
+                  COMPANY_TYPES, ECONOMIC_CLIMATES, AI_INNOVATION_PACES)
+}
+
+# Defaults mirror the dict.get fallbacks in data_utils so coded and scalar pricing agree.
+OCCUPATION_HAZARD_TABLE = FactorTable(OCCUPATIONS, OCCUPATION_HAZARDS, 50.0)
+ROLE_MULTIPLIER_TABLE = FactorTable(OCCUPATIONS, ROLE_MULTIPLIERS, 1.0)
+EDUCATION_LEVEL_TABLE = FactorTable(EDUCATION_LEVELS, EDUCATION_LEVEL_FACTORS, 1.0)
+EDUCATION_FIELD_TABLE = FactorTable(EDUCATION_FIELDS, EDUCATION_FIELD_FACTORS, 1.0)
+SCHOOL_TIER_TABLE = FactorTable(SCHOOL_TIERS, SCHOOL_TIER_FACTORS, 1.0)
+COMPANY_TYPE_TABLE = FactorTable(COMPANY_TYPES, COMPANY_TYPE_FACTORS, 1.0)
+ECONOMIC_CLIMATE_TABLE = FactorTable(ECONOMIC_CLIMATES, ECONOMIC_CLIMATE_SCENARIOS, 1.0)
+AI_INNOVATION_TABLE = FactorTable(AI_INNOVATION_PACES, AI_INNOVATION_SCENARIOS, 1.0)
+
+# The built-in tables, named after the data_utils getters. Pricing functions take a dict with
+# these keys as `tables` (e.g. a model_registry snapshot's) and fall back to this one.
+FACTOR_TABLES = {
+    "occupation_hazard": OCCUPATION_HAZARD_TABLE, "role_multiplier": ROLE_MULTIPLIER_TABLE,
+    "education_level_factor": EDUCATION_LEVEL_TABLE, "education_field_factor": EDUCATION_FIELD_TABLE,
+    "school_tier_factor": SCHOOL_TIER_TABLE, "company_type_factor": COMPANY_TYPE_TABLE,
+    "economic_climate_modifier": ECONOMIC_CLIMATE_TABLE, "ai_innovation_index": AI_INNOVATION_TABLE,
+}
+
+
+def encode_column(column: str, values, unknown_report: dict = None) -> np.ndarray:
+    """
+    Encodes one categorical portfolio column. Integer input is taken as already-encoded codes and
+    must lie in [UNKNOWN_CODE, len(vocabulary)); raises ValueError otherwise. Unknown labels (and
+    UNKNOWN_CODE codes, under ENCODED_UNKNOWN_LABEL) are tallied into unknown_report[column] when
+    a report dict is given.
+    """
+    arr = np.asarray(values)
+    vocabulary = VOCABULARIES[column]
+    if np.issubdtype(arr.dtype, np.integer):
+        if arr.size and (arr.min() < UNKNOWN_CODE or arr.max() >= len(vocabulary)):
+            raise ValueError(f"Codes of {column} must lie in [{UNKNOWN_CODE}, {len(vocabulary)})")
+        codes = arr.astype(np.int16, copy=False)
+        n_unknown = int(np.count_nonzero(codes == UNKNOWN_CODE)) if unknown_report is not None else 0
+        counts = {ENCODED_UNKNOWN_LABEL: n_unknown} if n_unknown else None
+    else:
+        counts = {} if unknown_report is not None else None
+        codes = vocabulary.encode(arr, counts)
+    if counts:
+        increment("unknown_categories_total", sum(counts.values()), field=column)
+        column_report = unknown_report.setdefault(column, {})
+        for label, count in counts.items():
+            column_report[label] = column_report.get(label, 0) + count
+    return codes
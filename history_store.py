@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from instrumentation import instrumented
+
+# Column names expected by plot_historical_trends and plot_skill_proficiency.
+RISK_HISTORY_COLUMNS = ['Month', 'Idiosyncratic Risk', 'Systematic Risk', 'Monthly Premium']
+SKILL_HISTORY_COLUMNS = ['Month', 'General Skill Progress', 'Firm-Specific Skill Progress']
+
+DEFAULT_HISTORY_PATH = os.environ.get("AIRISK_HISTORY_DB", "progress_history.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress_history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    month INTEGER NOT NULL,
+    idiosyncratic_risk REAL NOT NULL,
+    systematic_risk REAL NOT NULL,
+    monthly_premium REAL NOT NULL,
+    general_skill_progress REAL NOT NULL,
+    firm_specific_skill_progress REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS progress_history_user_seq ON progress_history (user_id, seq);
+CREATE TABLE IF NOT EXISTS assessments (
+    user_id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    params TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+"""
+
+
+def _json_scalar(value):
+    # numpy scalars (e.g. fitted parameters) as plain Python numbers; numpy is imported only
+    # here so the store stays import-light
+    import numpy as np
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ProgressHistoryStore:
+    """
+    Append-only monthly progress log per user, plus each user's latest assessed profile, backed
+    by a SQLite file.
+    The database runs in WAL mode so several app replicas can append to and read from the same
+    file concurrently; each thread gets its own connection. Rows are returned in append order,
+    which is how the Progress Tracking page records them.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @instrumented()
+    def append(self, user_id: str, month: int, idiosyncratic_risk: float, systematic_risk: float,
+               monthly_premium: float, general_skill_progress: float, firm_specific_skill_progress: float) -> None:
+        """Records one month of progress. Skill progress is in percent, as displayed in the app."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO progress_history (user_id, month, idiosyncratic_risk, systematic_risk, monthly_premium,"
+                " general_skill_progress, firm_specific_skill_progress, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_id, int(month), float(idiosyncratic_risk), float(systematic_risk), float(monthly_premium),
+                 float(general_skill_progress), float(firm_specific_skill_progress), time.time()),
+            )
+
+    def read(self, user_id: str, start_month: int = None, end_month: int = None) -> list:
+        """
+        Returns (month, idiosyncratic_risk, systematic_risk, monthly_premium, general_skill_progress,
+        firm_specific_skill_progress) tuples for a user in append order, optionally restricted to
+        start_month <= month <= end_month.
+        """
+        query = ("SELECT month, idiosyncratic_risk, systematic_risk, monthly_premium, general_skill_progress,"
+                 " firm_specific_skill_progress FROM progress_history WHERE user_id = ?")
+        args = [user_id]
+        if start_month is not None:
+            query += " AND month >= ?"
+            args.append(int(start_month))
+        if end_month is not None:
+            query += " AND month <= ?"
+            args.append(int(end_month))
+        return self._connection().execute(query + " ORDER BY seq", args).fetchall()
+
+    def save_assessment(self, user_id: str, profile: dict, params: dict, model_version: str) -> None:
+        """Stores the profile, parameter set and model version of a user's latest assessment, replacing the previous one."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO assessments (user_id, profile, params, model_version, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (user_id, json.dumps(profile, default=_json_scalar), json.dumps(params, default=_json_scalar),
+                 str(model_version), time.time()),
+            )
+
+    def load_assessment(self, user_id: str):
+        """(profile, params, model_version) of a user's latest assessment, or None."""
+        row = self._connection().execute(
+            "SELECT profile, params, model_version FROM assessments WHERE user_id = ?", (user_id,)).fetchone()
+        return (json.loads(row[0]), json.loads(row[1]), row[2]) if row else None
+
+    def last_entry(self, user_id: str):
+        """Most recent row for a user (same layout as read()), or None."""
+        return self._connection().execute(
+            "SELECT month, idiosyncratic_risk, systematic_risk, monthly_premium, general_skill_progress,"
+            " firm_specific_skill_progress FROM progress_history WHERE user_id = ? ORDER BY seq DESC LIMIT 1",
+            (user_id,),
+        ).fetchone()
+
+    @instrumented()
+    def history_frames(self, user_id: str, start_month: int = None, end_month: int = None):
+        """
+        Returns (risk_history_df, skill_history_df) with the column layout of the
+        'idiosyncratic_risk_history' and 'skill_progress_history' frames used in app.py.
+        """
+        import pandas as pd
+        rows = self.read(user_id, start_month, end_month)
+        risk = pd.DataFrame([row[:4] for row in rows], columns=RISK_HISTORY_COLUMNS)
+        skill = pd.DataFrame([(row[0], row[4], row[5]) for row in rows], columns=SKILL_HISTORY_COLUMNS)
+        return risk, skill
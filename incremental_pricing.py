@@ -0,0 +1,173 @@
+import numpy as np
+from actuarial_params import PARAMETER_NAMES, default_parameters
+from batch_pricing import (
+    PORTFOLIO_COLUMNS, SCENARIO_COLUMNS, calculate_fexp_vec, calculate_v_idiosyncratic_normalized_vec,
+    calculate_h_base_ttv_vec, calculate_monthly_premium_vec
+)
+from factor_tables import FACTOR_TABLES, VOCABULARIES, encode_column
+
+def _gather(codes, table):
+    return table.gather(codes)
+
+
+# The "Calculate AI-Q Score" chain as a dependency graph, in topological order: node -> (inputs,
+# formula). Inputs are portfolio columns (categoricals as factor_tables codes), actuarial
+# parameter names, factor table names (factor_tables.FACTOR_TABLES keys) or earlier nodes.
+# Operation order mirrors batch_pricing.price_portfolio, so incrementally maintained values are
+# bit-identical to a full re-price.
+PRICING_GRAPH = {
+    "f_role": (("occupation", "role_multiplier"), _gather),
+    "f_level": (("education_level", "education_level_factor"), _gather),
+    "f_field": (("education_field", "education_field_factor"), _gather),
+    "f_school": (("school_tier", "school_tier_factor"), _gather),
+    "fcr": (("company_type", "company_type_factor"), _gather),
+    "h_base_current": (("occupation", "occupation_hazard"), _gather),
+    "m_econ": (("economic_climate", "economic_climate_modifier"), _gather),
+    "i_ai": (("ai_innovation_pace", "ai_innovation_index"), _gather),
+    "f_exp": (("years_experience",), calculate_fexp_vec),
+    "fhc": (("f_role", "f_level", "f_field", "f_school", "f_exp"),
+            lambda f_role, f_level, f_field, f_school, f_exp: f_role * f_level * f_field * f_school * f_exp),
+    "fus": (("general_skill_progress", "firm_specific_skill_progress", "GAMMA_GEN", "GAMMA_SPEC"),
+            lambda p_gen, p_spec, gamma_gen, gamma_spec: 1 - (gamma_gen * p_gen + gamma_spec * p_spec)),
+    "v_raw": (("fhc", "fcr", "fus", "W_CR", "W_US"),
+              lambda fhc, fcr, fus, w_cr, w_us: fhc * (w_cr * fcr + w_us * fus)),
+    "v_idiosyncratic": (("v_raw",), calculate_v_idiosyncratic_normalized_vec),
+    "h_base": (("h_base_current", "TTV"),
+               lambda h, ttv: calculate_h_base_ttv_vec(h, h, np.zeros(len(h)), ttv)),
+    "h_systematic": (("h_base", "m_econ", "i_ai", "W_ECON", "W_INNO"),
+                     lambda h_base, m_econ, i_ai, w_econ, w_inno: h_base * (w_econ * m_econ + w_inno * i_ai)),
+    "p_systemic": (("h_systematic", "BETA_SYSTEMIC"), lambda h, beta: (h / 100.0) * beta),
+    "p_individual_conditional": (("v_idiosyncratic", "BETA_INDIVIDUAL"), lambda v, beta: (v / 100.0) * beta),
+    "p_claim": (("p_systemic", "p_individual_conditional"), lambda p_sys, p_ind: p_sys * p_ind),
+    "l_payout": (("annual_salary", "coverage_duration", "coverage_percentage"),
+                 lambda salary, duration, percentage: (salary / 12.0 * duration) * percentage),
+    "e_loss": (("p_claim", "l_payout"), lambda p_claim, l_payout: p_claim * l_payout),
+    "p_monthly": (("e_loss", "LAMBDA", "P_MIN"), calculate_monthly_premium_vec),
+}
+INPUT_COLUMNS = PORTFOLIO_COLUMNS + list(SCENARIO_COLUMNS)
+
+
+def downstream(changed) -> list:
+    """Graph nodes affected by a change to any of `changed` (inputs, parameters or nodes), in evaluation order."""
+    dirty = set(changed)
+    affected = []
+    for node, (inputs, _) in PRICING_GRAPH.items():
+        if dirty.intersection(inputs):
+            dirty.add(node)
+            affected.append(node)
+    return affected
+
+
+class IncrementalPricer:
+    """
+    Keeps every per-policy intermediate of the pricing chain for a book and re-prices it in
+    place: update() recomputes only the graph nodes downstream of what changed, and only for
+    the policies whose inputs changed (all policies when an actuarial parameter or a factor
+    table changed).
+    """
+
+    def __init__(self, df, params: dict = None, policy_ids=None, unknown_report: dict = None, tables: dict = None):
+        missing = [col for col in PORTFOLIO_COLUMNS if col not in df]
+        if missing:
+            raise KeyError(f"Portfolio is missing required columns: {missing}")
+        self.n = len(df["occupation"])
+        self.params = dict(default_parameters() if params is None else params)
+        self.tables = dict(FACTOR_TABLES if tables is None else tables)
+        self.inputs = {}
+        for column in INPUT_COLUMNS:
+            values = df[column] if column in df else np.full(self.n, "Neutral")
+            self.inputs[column] = self._encode(column, values, unknown_report)
+        self.policy_ids = None if policy_ids is None else np.asarray(policy_ids)
+        if self.policy_ids is not None:
+            self._id_order = np.argsort(self.policy_ids, kind="stable")
+        self.nodes = {}
+        self._evaluate(list(PRICING_GRAPH), slice(None))
+
+    @staticmethod
+    def _encode(column: str, values, unknown_report: dict = None) -> np.ndarray:
+        if column in VOCABULARIES:
+            # Copied: already-encoded input is passed through by encode_column, and rows are updated in place
+            return np.array(encode_column(column, values, unknown_report))
+        return np.array(values, dtype=np.float64)
+
+    def _value(self, name: str, rows):
+        if name in self.params:
+            return self.params[name]
+        if name in self.tables:
+            return self.tables[name]
+        source = self.nodes if name in self.nodes else self.inputs
+        return source[name][rows]
+
+    def _evaluate(self, nodes: list, rows) -> None:
+        for node in nodes:
+            inputs, formula = PRICING_GRAPH[node]
+            result = formula(*(self._value(name, rows) for name in inputs))
+            if node in self.nodes:
+                self.nodes[node][rows] = result
+            else:
+                self.nodes[node] = np.array(result, dtype=np.float64)
+
+    def rows_for(self, policy_ids) -> np.ndarray:
+        """Row positions of `policy_ids`; raises KeyError for ids not in the book."""
+        if self.policy_ids is None:
+            raise KeyError("This pricer was built without policy_ids")
+        ids = np.asarray(policy_ids)
+        pos = np.searchsorted(self.policy_ids, ids, sorter=self._id_order)
+        pos = np.minimum(pos, self.n - 1)
+        rows = self._id_order[pos]
+        unknown = self.policy_ids[rows] != ids
+        if np.any(unknown):
+            raise KeyError(f"Unknown policy ids: {ids[unknown].tolist()}")
+        return rows
+
+    def update(self, rows=None, inputs: dict = None, params: dict = None, unknown_report: dict = None,
+               tables: dict = None) -> dict:
+        """
+        Applies new input values for `rows` (positions; all rows when None) and/or new actuarial
+        parameters or factor tables ({FACTOR_TABLES name: FactorTable}), then re-prices incrementally. Rows whose new inputs equal the stored ones are
+        not recomputed. Returns a diff of the premiums that moved:
+        {"rows", "policy_ids" (when known), "old", "new", "recomputed": {node: policies}}.
+        """
+        rows = np.arange(self.n) if rows is None else np.asarray(rows, dtype=np.int64).reshape(-1)
+        inputs, params, tables = inputs or {}, params or {}, tables or {}
+        unknown = [name for name in inputs if name not in self.inputs]
+        unknown += [name for name in params if name not in PARAMETER_NAMES]
+        unknown += [name for name in tables if name not in FACTOR_TABLES]
+        if unknown:
+            raise KeyError(f"Unknown pricing inputs: {unknown}")
+
+        changed_inputs, touched = [], np.zeros(len(rows), dtype=bool)
+        for column, values in inputs.items():
+            new = np.broadcast_to(self._encode(column, values, unknown_report), rows.shape)
+            moved = new != self.inputs[column][rows]
+            if np.any(moved):
+                changed_inputs.append(column)
+                touched |= moved
+                self.inputs[column][rows[moved]] = new[moved]
+        changed_params = [name for name, value in params.items() if value != self.params[name]]
+        changed_params += [name for name, table in tables.items()
+                           if not np.array_equal(table.values, self.tables[name].values)]
+        self.params.update(params)
+        self.tables.update(tables)
+
+        # Only rows where an input actually moved need their downstream nodes again; a parameter
+        # or factor table change reaches every policy
+        touched_rows = rows[touched]
+        checked = np.arange(self.n) if changed_params else touched_rows
+        old = self.nodes["p_monthly"][checked]
+        recomputed = {}
+        if changed_inputs:
+            nodes = downstream(changed_inputs)
+            self._evaluate(nodes, touched_rows)
+            recomputed.update({node: len(touched_rows) for node in nodes})
+        if changed_params:
+            nodes = downstream(changed_params)
+            self._evaluate(nodes, slice(None))
+            recomputed.update({node: self.n for node in nodes})
+
+        new = self.nodes["p_monthly"][checked]
+        moved = new != old
+        diff = {"rows": checked[moved], "old": old[moved], "new": new[moved], "recomputed": recomputed}
+        if self.policy_ids is not None:
+            diff["policy_ids"] = self.policy_ids[diff["rows"]]
+        return diff
@@ -0,0 +1,182 @@
+"""
+Opt-in timing spans and counters for the pricing chain, lookups, history store and figures.
+
+    AIRISK_INSTRUMENTATION=1 streamlit run app.py          # enable at import
+    AIRISK_METRICS_DUMP=metrics.json python score_cli.py ...  # also write a JSON dump at exit
+
+Spans and counters are recorded only while enabled, whether through AIRISK_INSTRUMENTATION at
+import or enable() at runtime; while disabled span() returns a shared no-op context, increment()
+returns at once and @instrumented functions (the calculations.py formulas, data_utils lookups,
+figure builders and price_portfolio with its stage spans) cost one flag check per call.
+Recorded data is exported with prometheus_text() (text exposition format, also served by
+quote_service at GET /metrics) or snapshot() / dump_json().
+"""
+import atexit
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+METRIC_PREFIX = "airisk"
+# Upper bounds (seconds) of the span duration histogram buckets.
+SPAN_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+_enabled = os.environ.get("AIRISK_INSTRUMENTATION", "").lower() in ("1", "true", "yes", "on")
+_lock = threading.Lock()
+_spans = {}      # name -> [count, total_seconds, max_seconds, bucket counts]
+_counters = {}   # (name, sorted label items) -> value
+_collectors = []
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Drops every recorded span and counter (registered collectors are kept)."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def record_span(name: str, seconds: float) -> None:
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = [0, 0.0, 0.0, [0] * len(SPAN_BUCKETS)]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        bucket = bisect.bisect_left(SPAN_BUCKETS, seconds)
+        if bucket < len(SPAN_BUCKETS):
+            stats[3][bucket] += 1
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name: str):
+    """Context manager timing its body under `name`; a shared no-op while disabled."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def instrumented(name: str = None):
+    """
+    Decorator timing every call of the function as a span (default name: module.function)
+    while instrumentation is enabled.
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_span(span_name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """Adds `value` to counter `name` with the given labels (no-op while disabled)."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def register_collector(collect) -> None:
+    """
+    Registers a callable returning [(name, labels dict, value, "counter" | "gauge")], read at
+    export time. Used for state kept elsewhere (e.g. page_cache hit counters), so it costs
+    nothing on the hot path.
+    """
+    _collectors.append(collect)
+
+
+def snapshot() -> dict:
+    """Spans, counters and collector metrics as a JSON-serialisable dict."""
+    with _lock:
+        spans = {name: {"count": s[0], "total_seconds": s[1], "max_seconds": s[2],
+                        "mean_seconds": s[1] / s[0] if s[0] else 0.0,
+                        "buckets": dict(zip(map(str, SPAN_BUCKETS), s[3]))}
+                 for name, s in sorted(_spans.items())}
+        counters = [{"name": name, "labels": dict(labels), "value": value, "type": "counter"}
+                    for (name, labels), value in sorted(_counters.items())]
+    for collect in _collectors:
+        counters.extend({"name": name, "labels": labels, "value": value, "type": kind}
+                        for name, labels, value, kind in collect())
+    return {"enabled": _enabled, "timestamp": time.time(), "spans": spans, "counters": counters}
+
+
+def dump_json(path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    data = snapshot()
+    metric = f"{METRIC_PREFIX}_stage_seconds"
+    lines = [f"# HELP {metric} Time spent in instrumented stages.", f"# TYPE {metric} histogram"]
+    for name, s in data["spans"].items():
+        cumulative = 0
+        for bound, count in s["buckets"].items():
+            cumulative += count
+            lines.append(f"{metric}_bucket{_labels({'stage': name, 'le': bound})} {cumulative}")
+        lines.append(f"{metric}_bucket{_labels({'stage': name, 'le': '+Inf'})} {s['count']}")
+        lines.append(f"{metric}_sum{_labels({'stage': name})} {s['total_seconds']!r}")
+        lines.append(f"{metric}_count{_labels({'stage': name})} {s['count']}")
+    typed = set()
+    for c in sorted(data["counters"], key=lambda c: c["name"]):
+        full = f"{METRIC_PREFIX}_{c['name']}"
+        if full not in typed:
+            typed.add(full)
+            lines.append(f"# TYPE {full} {c['type']}")
+        lines.append(f"{full}{_labels(c['labels'])} {c['value']!r}")
+    return "\n".join(lines) + "\n"
+
+
+if os.environ.get("AIRISK_METRICS_DUMP"):
+    atexit.register(dump_json, os.environ["AIRISK_METRICS_DUMP"])
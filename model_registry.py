@@ -0,0 +1,402 @@
+"""
+Versioned model registry: validated, immutable snapshots of the actuarial parameters and the
+factor tables, published as files and hot-swapped by running processes.
+
+    python model_registry.py publish calibrated.json --registry /srv/airisk/models
+    python model_registry.py activate 3f2a9c1b7e40 --registry /srv/airisk/models
+    python model_registry.py list --registry /srv/airisk/models
+
+A registry directory holds one parameter_sets file per version (versions/<version>.json, never
+rewritten), a model_store per version (stores/<version>/: factor arrays, built once at publish
+time and memory-mapped by every process) and a CURRENT file naming the active
+version, replaced with a rename. Processes call current_snapshot() per quote or per run; it
+re-reads CURRENT at most every `poll_seconds` and swaps the snapshot reference, so a new version
+reaches running servers and workers without a restart and a quote never mixes two versions.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+from actuarial_params import PARAMETER_NAMES, default_parameters
+from batch_pricing import portfolio_kwargs
+from factor_tables import FACTOR_TABLES, FactorTable
+from instrumentation import increment, register_collector
+from model_store import load_model_store, save_model_store
+from parameter_sets import load_parameter_set, parameter_set_version, save_parameter_set
+from pricing import resolve_parameters
+
+REGISTRY_ENV = "AIRISK_MODEL_REGISTRY"
+PARAMETER_SET_ENV = "AIRISK_PARAMETER_SET"
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+STORES_DIR = "stores"
+DEFAULT_POLL_SECONDS = 2.0
+# Band within which W_ECON + W_INNO (and W_CR + W_US) must sum to 1; app.py warns outside it.
+WEIGHT_SUM_TOLERANCE = 0.05
+
+
+def validate_model(params: dict, factors: dict = None) -> None:
+    """
+    Checks a parameter set and optional factor tables ({FACTOR_TABLES name: {label: factor}})
+    before they can be published. Factor tables must cover exactly the labels of their
+    vocabulary, since stored books and rollups hold codes of those labels.
+    Raises ValueError listing every problem found.
+    """
+    problems = [f"missing parameter {name}" for name in PARAMETER_NAMES if name not in params]
+    values = {name: params[name] for name in PARAMETER_NAMES if name in params}
+    problems += [f"{name} is not a finite number" for name, value in values.items()
+                 if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)]
+    if problems:
+        raise ValueError(f"Invalid model: {problems}")
+
+    for name in ("BETA_SYSTEMIC", "BETA_INDIVIDUAL"):
+        if not 0.0 < values[name] <= 1.0:
+            problems.append(f"{name} must be a probability in (0, 1]")
+    if values["LAMBDA"] < 1.0:
+        problems.append("LAMBDA below 1 prices under the expected loss")
+    if values["P_MIN"] < 0.0:
+        problems.append("P_MIN must not be negative")
+    if values["TTV"] < 1 or values["TTV"] != int(values["TTV"]):
+        problems.append("TTV must be a whole number of months >= 1")
+    for name in ("W_CR", "W_US", "W_ECON", "W_INNO"):
+        if values[name] < 0.0:
+            problems.append(f"{name} must not be negative")
+    if not 0.0 <= values["GAMMA_SPEC"] < values["GAMMA_GEN"] <= 1.0:
+        problems.append("expected 0 <= GAMMA_SPEC < GAMMA_GEN <= 1")
+    for a, b in (("W_ECON", "W_INNO"), ("W_CR", "W_US")):
+        if abs(values[a] + values[b] - 1.0) > WEIGHT_SUM_TOLERANCE:
+            problems.append(f"{a} + {b} must be within {WEIGHT_SUM_TOLERANCE} of 1")
+
+    for name, table in (factors or {}).items():
+        if name not in FACTOR_TABLES:
+            problems.append(f"unknown factor table {name}")
+            continue
+        labels = FACTOR_TABLES[name].vocabulary.labels
+        if set(table) != set(labels):
+            problems.append(f"{name} labels differ from the vocabulary: "
+                            f"missing {sorted(set(labels) - set(table))}, extra {sorted(set(table) - set(labels))}")
+        bad = [label for label, value in table.items()
+               if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0]
+        if bad:
+            problems.append(f"{name} factors must be positive numbers: {bad}")
+    if problems:
+        raise ValueError(f"Invalid model: {problems}")
+
+
+class ModelSnapshot:
+    """
+    One model version: read-only parameters, factor tables (read-only arrays) and metadata.
+    Snapshots are never modified, so a reference taken at the start of a quote or a batch run
+    keeps pricing with that version whatever is published meanwhile. `tables` takes already
+    built (e.g. memory-mapped) factor tables in place of `factors`.
+    """
+
+    __slots__ = ("version", "params", "tables", "created_at", "metadata")
+
+    def __init__(self, params: dict, factors: dict = None, metadata: dict = None, created_at: float = None,
+                 tables: dict = None):
+        if tables is not None:
+            factors = {name: table.factors() for name, table in tables.items()}
+        validate_model(params, factors)
+        factors = factors or {}
+        if tables is None:
+            tables = {}
+            for name, builtin in FACTOR_TABLES.items():
+                table = FactorTable(builtin.vocabulary, factors[name], builtin.default) if name in factors else builtin
+                if table is not builtin:
+                    table.values.flags.writeable = False
+                tables[name] = table
+        params = {name: int(params[name]) if name == "TTV" else float(params[name]) for name in PARAMETER_NAMES}
+        object.__setattr__(self, "params", MappingProxyType(params))
+        object.__setattr__(self, "tables", MappingProxyType(tables))
+        object.__setattr__(self, "version", parameter_set_version(params, self.factors()))
+        object.__setattr__(self, "created_at", created_at)
+        object.__setattr__(self, "metadata", MappingProxyType(dict(metadata or {})))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelSnapshot is immutable")
+
+    def __repr__(self) -> str:
+        return f"ModelSnapshot(version={self.version!r})"
+
+    def factors(self) -> dict:
+        """{table: {label: factor}} of every factor table."""
+        return {name: table.factors() for name, table in self.tables.items()}
+
+    def resolve(self, overrides: dict = None) -> dict:
+        """
+        The snapshot's parameters with `overrides` applied (see pricing.resolve_parameters).
+        The merged set must pass validate_model; raises KeyError, TypeError or ValueError.
+        """
+        params = resolve_parameters(overrides, base=self.params)
+        if overrides:
+            validate_model(params)
+        return params
+
+    def parameter_version(self, params: dict) -> str:
+        """The version of `params` (e.g. from resolve()) priced with this snapshot's factor tables."""
+        return self.version if params == dict(self.params) else parameter_set_version(params, self.factors())
+
+    def pricing_kwargs(self, overrides: dict = None) -> dict:
+        """Keyword arguments of batch_pricing.price_portfolio for this snapshot."""
+        return dict(portfolio_kwargs(self.resolve(overrides)), tables=dict(self.tables))
+
+
+def builtin_snapshot() -> ModelSnapshot:
+    """The model compiled into actuarial_params and data/*.py."""
+    return ModelSnapshot(default_parameters(), {name: table.factors() for name, table in FACTOR_TABLES.items()},
+                         {"source": "builtin"})
+
+
+def load_snapshot(path: str) -> ModelSnapshot:
+    """
+    Reads a parameter_sets file (e.g. written by calibration.py) as a snapshot; tables it does
+    not carry are the built-in ones. Raises ValueError for invalid files.
+    """
+    document = load_parameter_set(path)
+    return ModelSnapshot(document["parameters"], document.get("factors"), document.get("metadata"),
+                         document.get("created_at"))
+
+
+class ModelRegistry:
+    """
+    A directory of published model versions with one active version. current() is cheap to
+    call per request: it stats CURRENT at most every `poll_seconds` and loads a new snapshot
+    only when the active version changed. A version that fails to load is reported in
+    `last_error` and the previous snapshot keeps serving.
+    """
+
+    def __init__(self, root: str, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.root = root
+        self.poll_seconds = poll_seconds
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamp = None
+        self._checked_at = -math.inf
+        self._subscribers = []
+        os.makedirs(os.path.join(root, VERSIONS_DIR), exist_ok=True)
+
+    def _version_path(self, version: str) -> str:
+        return os.path.join(self.root, VERSIONS_DIR, f"{version}.json")
+
+    def _store_path(self, version: str) -> str:
+        return os.path.join(self.root, STORES_DIR, version)
+
+    def _ensure_store(self, snapshot: ModelSnapshot) -> None:
+        # Built by the publishing process only; workers just map it
+        if load_model_store(self._store_path(snapshot.version)) is None:
+            save_model_store(snapshot, self._store_path(snapshot.version))
+
+    def publish(self, params: dict, factors: dict = None, metadata: dict = None, activate: bool = True) -> str:
+        """
+        Validates and stores a model version (factor tables default to the built-in ones), writes
+        its model_store and, with activate=True, makes it the active version. Returns the version.
+        """
+        snapshot = ModelSnapshot(params, factors, metadata)
+        path = self._version_path(snapshot.version)
+        if not os.path.exists(path):
+            save_parameter_set(dict(snapshot.params), path, dict(snapshot.metadata), snapshot.factors())
+        self._ensure_store(snapshot)
+        if activate:
+            self.activate(snapshot.version)
+        return snapshot.version
+
+    def publish_file(self, path: str, activate: bool = True) -> str:
+        """Publishes a parameter_sets file, e.g. the output of calibration.py."""
+        document = load_parameter_set(path)
+        return self.publish(document["parameters"], document.get("factors"), document.get("metadata"), activate)
+
+    def activate(self, version: str) -> None:
+        """
+        Points CURRENT at a published version (checked to load) with an atomic rename, writing
+        its model_store first if it has none (e.g. published before stores existed).
+        """
+        self._ensure_store(load_snapshot(self._version_path(version)))
+        fd, staging = tempfile.mkstemp(prefix=".current-", dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            f.write(version + "\n")
+        os.replace(staging, os.path.join(self.root, CURRENT_FILE))
+        self.refresh()
+
+    def active_version(self):
+        """The version named by CURRENT, or None before the first activation."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self) -> list:
+        """Published versions, oldest first: [{"version", "created_at", "metadata", "active"}]."""
+        active = self.active_version()
+        listing = []
+        for name in os.listdir(os.path.join(self.root, VERSIONS_DIR)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.root, VERSIONS_DIR, name)) as f:
+                    document = json.load(f)
+                listing.append({"version": document.get("version"), "created_at": document.get("created_at"),
+                                "metadata": document.get("metadata", {}), "active": document.get("version") == active})
+        return sorted(listing, key=lambda item: item["created_at"] or 0.0)
+
+    def get(self, version: str) -> ModelSnapshot:
+        """
+        Loads a published version, active or not, with the factor tables of its model_store
+        memory-mapped (read from the version file when it has no store).
+        Raises ValueError when the stored data does not match the version.
+        """
+        document = load_parameter_set(self._version_path(version))
+        store = load_model_store(self._store_path(version))
+        if store is None:
+            snapshot = ModelSnapshot(document["parameters"], document.get("factors"), document.get("metadata"),
+                                     document.get("created_at"))
+        else:
+            snapshot = ModelSnapshot(document["parameters"], metadata=document.get("metadata"),
+                                     created_at=document.get("created_at"), tables=store["tables"])
+        if snapshot.version != version:
+            raise ValueError(f"Model data of version {version} hashes to {snapshot.version}")
+        return snapshot
+
+    def subscribe(self, callback) -> None:
+        """Calls `callback(snapshot)` after each swap to a new snapshot, e.g. to drop derived caches."""
+        self._subscribers.append(callback)
+
+    def refresh(self) -> bool:
+        """Re-reads CURRENT now; returns True if a new snapshot was swapped in."""
+        self._checked_at = time.monotonic()
+        try:
+            stat = os.stat(os.path.join(self.root, CURRENT_FILE))
+        except FileNotFoundError:
+            return False
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return False
+        version = self.active_version()
+        with self._lock:
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+            if self._snapshot is not None and version == self._snapshot.version:
+                return False
+            try:
+                snapshot = self.get(version)
+            except (OSError, ValueError) as e:
+                self.last_error = f"{version}: {e}"
+                increment("model_reload_errors_total")
+                return False
+            self._snapshot, self.last_error = snapshot, None
+        increment("model_reloads_total")
+        for callback in self._subscribers:
+            callback(snapshot)
+        return True
+
+    def current(self) -> ModelSnapshot:
+        """The active snapshot (the built-in model before any version was activated)."""
+        if time.monotonic() - self._checked_at >= self.poll_seconds:
+            self.refresh()
+        return self._snapshot if self._snapshot is not None else _builtin()
+
+
+_BUILTIN = None
+_FIXED = None
+_REGISTRY = None
+_SUBSCRIBERS = []
+_setup_lock = threading.Lock()
+
+
+def _builtin() -> ModelSnapshot:
+    global _BUILTIN
+    if _BUILTIN is None:
+        _BUILTIN = builtin_snapshot()
+    return _BUILTIN
+
+
+def _notify(snapshot: ModelSnapshot) -> None:
+    for callback in _SUBSCRIBERS:
+        callback(snapshot)
+
+
+def get_registry():
+    """The process-wide registry at $AIRISK_MODEL_REGISTRY, or None when it is not set."""
+    global _REGISTRY
+    root = os.environ.get(REGISTRY_ENV)
+    if not root:
+        return None
+    with _setup_lock:
+        if _REGISTRY is None or _REGISTRY.root != root:
+            _REGISTRY = ModelRegistry(root)
+            _REGISTRY.subscribe(_notify)
+    return _REGISTRY
+
+
+def subscribe(callback) -> None:
+    """Calls `callback(snapshot)` whenever the process-wide registry swaps to a new snapshot."""
+    _SUBSCRIBERS.append(callback)
+
+
+def current_snapshot() -> ModelSnapshot:
+    """
+    The model to price with in this process: the active version of $AIRISK_MODEL_REGISTRY,
+    else the parameter set file at $AIRISK_PARAMETER_SET (read once), else the built-in model.
+    """
+    global _FIXED
+    registry = get_registry()
+    if registry is not None:
+        return registry.current()
+    path = os.environ.get(PARAMETER_SET_ENV)
+    if path:
+        with _setup_lock:
+            if _FIXED is None or _FIXED[0] != path:
+                _FIXED = (path, load_snapshot(path))
+        return _FIXED[1]
+    return _builtin()
+
+
+def _model_metrics() -> list:
+    registry = _REGISTRY
+    if registry is None or registry._snapshot is None:
+        return []
+    return [("model_version_info", {"version": registry._snapshot.version}, 1, "gauge")]
+
+
+register_collector(_model_metrics)
+
+
+def main(argv=None) -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--registry", default=os.environ.get(REGISTRY_ENV),
+                        help=f"Registry directory (default ${REGISTRY_ENV})")
+    parser = argparse.ArgumentParser(description="Publish and activate versions of the AI risk premium model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", parents=[common], help="Validate and publish a parameter set file")
+    publish.add_argument("path", help="Parameter set JSON (e.g. written by calibration.py)")
+    publish.add_argument("--no-activate", action="store_true", help="Store the version without activating it")
+    activate = commands.add_parser("activate", parents=[common], help="Make a published version the active one")
+    activate.add_argument("version")
+    commands.add_parser("list", parents=[common], help="List published versions")
+    args = parser.parse_args(argv)
+    if not args.registry:
+        raise SystemExit(f"Pass --registry or set {REGISTRY_ENV}.")
+
+    registry = ModelRegistry(args.registry)
+    try:
+        if args.command == "publish":
+            print(registry.publish_file(args.path, activate=not args.no_activate))
+        elif args.command == "activate":
+            registry.activate(args.version)
+        else:
+            for item in registry.versions():
+                created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(item["created_at"] or 0))
+                print(f"{'*' if item['active'] else ' '} {item['version']}  {created}  {json.dumps(item['metadata'])}")
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Read-only model data of one model version as memory-mapped files, shared by every worker
+process on a host.
+
+    <store>/
+        meta.json              format, version, parameters, factor table names and labels
+        factors/<table>.npy    factor arrays, lookup default in the last slot
+
+A store is written once, when model_registry publishes or activates a version, and opened by
+every process with np.load(mmap_mode="r"): N workers share one copy of the arrays through the
+page cache, and switching a worker to a new version maps files instead of rebuilding tables. Keep the registry on a tmpfs (e.g. /dev/shm) to hold the pages in RAM.
+"""
+import json
+import os
+import numpy as np
+from factor_tables import FACTOR_TABLES, FactorTable
+from storage import replace_directory, resolve_directory, staging_directory
+
+# 2: stores no longer carry a premium cube.
+STORE_FORMAT_VERSION = 2
+
+
+def save_model_store(snapshot, path: str) -> None:
+    """
+    Writes the factor arrays of a model_registry snapshot and publishes them with
+    storage.replace_directory, so a concurrent load sees either the old or the new store in full.
+    """
+    staging = staging_directory(path)
+    os.makedirs(os.path.join(staging, "factors"))
+    for name, table in snapshot.tables.items():
+        np.save(os.path.join(staging, "factors", f"{name}.npy"), np.asarray(table.values))
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"format": STORE_FORMAT_VERSION, "version": snapshot.version, "params": dict(snapshot.params),
+                   "labels": {name: list(table.vocabulary.labels) for name, table in snapshot.tables.items()}},
+                  f, indent=2)
+    replace_directory(staging, path)
+
+
+def load_model_store(path: str):
+    """
+    Memory-maps a saved store: {"version", "params", "tables" {name: FactorTable over a
+    read-only memmap}}. Returns None when it is missing, in another format or was written with
+    other category vocabularies, i.e. when it must be rewritten.
+    """
+    path = resolve_directory(path)
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != STORE_FORMAT_VERSION or set(meta["labels"]) != set(FACTOR_TABLES):
+        return None
+    if any(meta["labels"][name] != list(table.vocabulary.labels) for name, table in FACTOR_TABLES.items()):
+        return None
+    tables = {name: FactorTable.from_values(table.vocabulary,
+                                            np.load(os.path.join(path, "factors", f"{name}.npy"), mmap_mode="r"))
+              for name, table in FACTOR_TABLES.items()}
+    return {"version": meta["version"], "params": meta["params"], "tables": tables}
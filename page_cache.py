@@ -0,0 +1,133 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from instrumentation import register_collector
+from model_registry import subscribe
+from premium_cube import quote_profile
+from visualizations import plot_risk_factor_contributions, plot_historical_trends, plot_skill_gap_radar
+
+DEFAULT_MAXSIZE = 256
+
+
+class LRUCache:
+    """
+    Thread-safe bounded mapping with least-recently-used eviction and hit/miss/eviction counters.
+    Streamlit runs sessions on separate threads of one process, so a module-level instance is
+    shared by every session served by that process.
+    """
+
+    def __init__(self, name: str, maxsize: int = DEFAULT_MAXSIZE):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+def memoize(cache: LRUCache, make_key):
+    """Decorator caching `func(*args, **kwargs)` in `cache` under `make_key(*args, **kwargs)`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache.get_or_compute(make_key(*args, **kwargs), lambda: func(*args, **kwargs))
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def frame_key(df) -> tuple:
+    """Content key of a DataFrame: column names plus a digest of the row hashes."""
+    import pandas as pd
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+    return tuple(df.columns), len(df), digest
+
+
+PRICING_CACHE = LRUCache("pricing")
+RISK_FACTOR_FIGURE_CACHE = LRUCache("risk_factor_figures")
+HISTORY_FIGURE_CACHE = LRUCache("historical_trend_figures")
+RADAR_FIGURE_CACHE = LRUCache("skill_gap_radar_figures")
+CACHES = (PRICING_CACHE, RISK_FACTOR_FIGURE_CACHE, HISTORY_FIGURE_CACHE, RADAR_FIGURE_CACHE)
+
+
+def price_with_snapshot(profile: dict, params: dict, snapshot=None) -> dict:
+    """
+    price_profile with the factor tables of a model_registry snapshot (built-in tables for None),
+    answered from the published premium cube when it matches (see premium_cube.quote_profile).
+    """
+    return quote_profile(profile, params, snapshot)
+
+
+# The pricing key holds the whole profile, the whole actuarial parameter set and the model
+# version, so moving any sidebar slider or publishing a new version yields a new key and never
+# serves a result computed under other parameters or factor tables. Figure keys are their
+# numeric inputs, which already reflect the parameters they were priced with.
+cached_price_profile = memoize(
+    PRICING_CACHE, lambda profile, params, snapshot=None: (tuple(sorted(profile.items())), tuple(sorted(params.items())),
+                                                           None if snapshot is None else snapshot.version)
+)(price_with_snapshot)
+
+cached_plot_risk_factor_contributions = memoize(
+    RISK_FACTOR_FIGURE_CACHE, lambda *args: tuple(float(a) for a in args)
+)(plot_risk_factor_contributions)
+
+cached_plot_historical_trends = memoize(
+    HISTORY_FIGURE_CACHE, lambda history_df, max_points=None, method="lttb": (frame_key(history_df), max_points, method)
+)(plot_historical_trends)
+
+cached_plot_skill_gap_radar = memoize(
+    RADAR_FIGURE_CACHE, lambda user_skills, recommended_skills: (tuple(sorted(user_skills.items())),
+                                                                 tuple(sorted(recommended_skills.items())))
+)(plot_skill_gap_radar)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of every page cache, keyed by cache name."""
+    return {cache.name: cache.stats() for cache in CACHES}
+
+
+def _cache_metrics() -> list:
+    metrics = []
+    for cache in CACHES:
+        stats = cache.stats()
+        labels = {"cache": cache.name}
+        metrics += [("cache_hits_total", labels, stats["hits"], "counter"),
+                    ("cache_misses_total", labels, stats["misses"], "counter"),
+                    ("cache_evictions_total", labels, stats["evictions"], "counter"),
+                    ("cache_entries", labels, stats["size"], "gauge")]
+    return metrics
+
+
+register_collector(_cache_metrics)
+# Entries priced under a replaced model version can no longer be hit; drop them on the swap.
+subscribe(lambda snapshot: PRICING_CACHE.clear())
+
+
+def clear_caches() -> None:
+    for cache in CACHES:
+        cache.clear()
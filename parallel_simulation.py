@@ -0,0 +1,180 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from simulation import (
+    DEFAULT_CHUNK_TRIALS, DEFAULT_MAX_CELLS, DEFAULT_LEVELS,
+    SystemicClasses, check_trials, chunk_rng, chunk_sizes, prepare_book
+)
+
+DEFAULT_HISTOGRAM_BINS = 8192
+
+
+class LossSketch:
+    """
+    Mergeable summary of simulated losses: an exact zero bin plus geometric bins between the
+    smallest possible non-zero loss and the total book payout (bounded relative error), and the
+    exact `tail_size` largest losses so VaR/TVaR at the requested levels are exact. Losses equal
+    to the smallest retained one that did not fit are counted in `tail_ties`, since TVaR averages
+    every loss tied at the VaR. Integer counts and top-k merges are order independent, so merged
+    sketches do not depend on how chunks were sharded.
+    """
+
+    def __init__(self, min_loss: float, max_loss: float, n_bins: int = DEFAULT_HISTOGRAM_BINS, tail_size: int = 0):
+        self.edges = np.geomspace(min_loss, max_loss * (1 + 1e-9), n_bins + 1)
+        self.counts = np.zeros(n_bins + 2, dtype=np.int64)
+        self.tail_size = tail_size
+        self.tail = np.zeros(0, dtype=np.float64)
+        self.tail_ties = 0
+
+    def add(self, losses: np.ndarray) -> None:
+        self.counts += np.bincount(np.searchsorted(self.edges, losses, side="right"), minlength=self.counts.size)
+        self._keep_tail(losses)
+
+    def merge(self, other: "LossSketch") -> None:
+        self.counts += other.counts
+        self._keep_tail(other.tail, other.tail[0] if other.tail.size else None, other.tail_ties)
+
+    def _keep_tail(self, values: np.ndarray, dropped_value: float = None, dropped: int = 0) -> None:
+        if self.tail_size <= 0:
+            return
+        # Losses already left out: ours and `dropped` of the other sketch, tied at their tail minima
+        left_out = [(self.tail[0], self.tail_ties)] if self.tail.size else []
+        left_out.append((dropped_value, dropped))
+        tail = np.concatenate([self.tail, values])
+        out = tail[:0]
+        if tail.size > self.tail_size:
+            cut = tail.size - self.tail_size
+            tail = np.partition(tail, cut)
+            tail, out = tail[cut:], tail[:cut]
+        self.tail = np.sort(tail)
+        threshold = self.tail[0] if self.tail.size else None
+        self.tail_ties = int((out == threshold).sum()) + sum(n for value, n in left_out if n and value == threshold)
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def quantile(self, level: float) -> float:
+        """
+        Inverted-CDF quantile. Exact when it falls inside the retained tail; otherwise the upper
+        edge of the histogram bin holding it (a conservative estimate).
+        """
+        rank = max(1, math.ceil(level * self.n))
+        from_top = self.n - rank
+        if from_top < self.tail.size:
+            return float(self.tail[self.tail.size - 1 - from_top])
+        b = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return 0.0 if b == 0 else float(self.edges[min(b, self.edges.size - 1)])
+
+    def exceedance(self, threshold: float) -> float:
+        """
+        Fraction of losses above `threshold`. Exact when the retained tail reaches below it,
+        otherwise counted from the bins lying wholly above it.
+        """
+        if self.tail.size and self.tail[0] <= threshold:
+            return int((self.tail > threshold).sum()) / self.n
+        first = int(np.searchsorted(self.edges, threshold, side="left")) + 1
+        return int(self.counts[first:].sum()) / self.n
+
+    def tvar(self, level: float) -> float:
+        """Mean loss at or above the VaR (ties included); requires the tail to cover the level."""
+        var = self.quantile(level)
+        if self.n - max(1, math.ceil(level * self.n)) >= self.tail.size:
+            raise ValueError(f"Retained tail of {self.tail.size} losses does not cover level {level}.")
+        selected = self.tail[self.tail >= var]
+        ties = self.tail_ties if var == self.tail[0] else 0
+        return float((selected.sum() + ties * var) / (selected.size + ties))
+
+
+def _merge_moments(a, b):
+    """Chan et al. pairwise merge of (count, mean, M2)."""
+    n = a[0] + b[0]
+    if n == 0:
+        return a
+    delta = b[1] - a[1]
+    mean = a[1] + delta * b[0] / n
+    return n, mean, a[2] + b[2] + delta * delta * a[0] * b[0] / n
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(classes: SystemicClasses, config: dict) -> None:
+    _WORKER_STATE["classes"] = classes
+    _WORKER_STATE["config"] = config
+
+
+def _run_shard(chunks: list):
+    """Simulates the given chunks; returns per-chunk moments and one merged sketch."""
+    classes, config = _WORKER_STATE["classes"], _WORKER_STATE["config"]
+    sketch = LossSketch(config["min_loss"], config["max_loss"], config["n_bins"], config["tail_size"])
+    moments = {}
+    for chunk, size in chunks:
+        losses = classes.simulate_chunk(chunk_rng(config["seed"], chunk), size, config["max_cells"])
+        sketch.add(losses)
+        mean = float(losses.mean())
+        moments[chunk] = (size, mean, float(((losses - mean) ** 2).sum()), float(losses.max()))
+    return moments, sketch
+
+
+def simulate_book_parallel(df, n_trials: int, seed: int = 0, workers: int = None,
+                           chunk_trials: int = DEFAULT_CHUNK_TRIALS, max_cells: int = DEFAULT_MAX_CELLS,
+                           levels=DEFAULT_LEVELS, n_bins: int = DEFAULT_HISTOGRAM_BINS, **pricing_kwargs) -> dict:
+    """
+    Process-pool version of simulation.simulate_book. Trials are cut into fixed chunks and each
+    chunk draws from its own SeedSequence child (seed, chunk), so every worker consumes independent
+    streams and the trial outcomes do not depend on `workers`. Workers return per-chunk moments and a
+    LossSketch instead of raw samples; moments are merged in chunk order, which makes the summary
+    bit-identical for a given seed regardless of worker count. Raises ValueError for n_trials < 1
+    or unknown occupations.
+    """
+    check_trials(n_trials, chunk_trials)
+    classes, priced = prepare_book(df, **pricing_kwargs)
+    payout = priced["l_payout"]
+    positive = payout[payout > 0]
+    config = {
+        "seed": seed, "max_cells": max_cells, "n_bins": n_bins,
+        "min_loss": float(positive.min()) if positive.size else 1.0,
+        "max_loss": float(positive.sum()) if positive.size else 1.0,
+        "tail_size": n_trials - math.ceil(min(levels) * n_trials) + 1,
+    }
+    chunks = list(enumerate(chunk_sizes(n_trials, chunk_trials)))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+    shards = [chunks[w::workers] for w in range(workers)]
+
+    if workers == 1:
+        _init_worker(classes, config)
+        results = [_run_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(classes, config)) as pool:
+            results = list(pool.map(_run_shard, shards))
+
+    sketch = LossSketch(config["min_loss"], config["max_loss"], n_bins, config["tail_size"])
+    per_chunk = {}
+    for moments, shard_sketch in results:
+        sketch.merge(shard_sketch)
+        per_chunk.update(moments)
+    total = (0, 0.0, 0.0)
+    for chunk, _ in chunks:
+        total = _merge_moments(total, per_chunk[chunk][:3])
+    n, mean, m2 = total
+
+    annual_premium = 12.0 * float(priced["p_monthly"].sum())
+    summary = {
+        "n_trials": n,
+        "annual_premium": annual_premium,
+        "expected_loss": float(priced["e_loss"].sum()),
+        "mean_loss": mean,
+        "std_loss": math.sqrt(m2 / n) if n else 0.0,
+        "max_loss": max(m[3] for m in per_chunk.values()) if per_chunk else 0.0,
+        "loss_ratio_mean": mean / annual_premium if annual_premium > 0 else float("nan"),
+        "prob_loss_ratio_above_1": sketch.exceedance(annual_premium) if n else 0.0,
+        "var": {}, "tvar": {}, "loss_ratio_quantiles": {},
+        "sketch": sketch,
+    }
+    for level in levels:
+        summary["var"][level] = sketch.quantile(level)
+        summary["tvar"][level] = sketch.tvar(level)
+        summary["loss_ratio_quantiles"][level] = summary["var"][level] / annual_premium if annual_premium > 0 else float("nan")
+    return summary
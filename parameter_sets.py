@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from actuarial_params import PARAMETER_NAMES
+
+PARAMETER_SET_FORMAT_VERSION = 1
+
+
+def parameter_set_version(params: dict, factors: dict = None) -> str:
+    """
+    Content version of a parameter set: a digest of its values (and of its factor tables
+    {table: {label: factor}} when given), equal for equal sets.
+    """
+    payload = {name: float(params[name]) for name in PARAMETER_NAMES}
+    if factors is not None:
+        payload = {"parameters": payload,
+                   "factors": {table: {label: float(v) for label, v in values.items()} for table, values in factors.items()}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def save_parameter_set(params: dict, path: str, metadata: dict = None, factors: dict = None) -> str:
+    """
+    Writes a parameter set (every PARAMETER_NAMES entry, plus factor tables when given) with its
+    version and `metadata` as JSON, via a temporary file and a rename so readers never see a
+    partial file. Returns the version.
+    """
+    missing = [name for name in PARAMETER_NAMES if name not in params]
+    if missing:
+        raise KeyError(f"Parameter set is missing: {missing}")
+    version = parameter_set_version(params, factors)
+    document = {
+        "format": PARAMETER_SET_FORMAT_VERSION, "version": version, "created_at": time.time(),
+        "parameters": {name: int(params[name]) if name == "TTV" else float(params[name]) for name in PARAMETER_NAMES},
+        "metadata": metadata or {},
+    }
+    if factors is not None:
+        document["factors"] = {table: {label: float(v) for label, v in values.items()} for table, values in factors.items()}
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix=".params-", suffix=".json", dir=parent)
+    with os.fdopen(fd, "w") as f:
+        json.dump(document, f, indent=2)
+    os.replace(staging, path)
+    return version
+
+
+def load_parameter_set(path: str) -> dict:
+    """
+    Reads a saved parameter set: {"version", "created_at", "parameters", "metadata"}, plus
+    "factors" when it was saved with factor tables.
+    Raises ValueError for another format, missing parameters or a version that does not
+    match the stored values.
+    """
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("format") != PARAMETER_SET_FORMAT_VERSION:
+        raise ValueError(f"Unsupported parameter set format: {document.get('format')}")
+    params = document.get("parameters", {})
+    missing = [name for name in PARAMETER_NAMES if name not in params]
+    if missing:
+        raise ValueError(f"Parameter set is missing: {missing}")
+    if parameter_set_version(params, document.get("factors")) != document.get("version"):
+        raise ValueError("Parameter set version does not match its values")
+    params["TTV"] = int(params["TTV"])
+    return document
@@ -0,0 +1,190 @@
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from actuarial_params import PARAMETER_NAMES, default_parameters
+from batch_pricing import calculate_v_idiosyncratic_normalized_vec, calculate_monthly_premium_vec, price_portfolio
+from data.environmental_data import ECONOMIC_CLIMATE_SCENARIOS, AI_INNOVATION_SCENARIOS
+
+SCENARIO_AXES = {"economic_climate": ECONOMIC_CLIMATE_SCENARIOS, "ai_innovation_pace": AI_INNOVATION_SCENARIOS}
+
+# Which swept inputs each per-policy intermediate depends on. FHC, FCR, H_base (k = 0) and
+# L_payout depend on none of them and are computed once per sweep.
+V_DEPENDS_ON = ("GAMMA_GEN", "GAMMA_SPEC", "W_CR", "W_US")
+H_DEPENDS_ON = ("economic_climate", "ai_innovation_pace", "W_ECON", "W_INNO")
+DEFAULT_POINTS_PER_TASK = 64
+
+
+def expand_grid(grid: dict) -> list:
+    """
+    Cartesian product of a {name: [values]} grid over actuarial_params names and the scenario
+    keys. Unswept parameters take their actuarial_params values; unswept scenarios are "Neutral".
+    Values are cast to plain Python scalars (int TTV, float parameters, str scenarios) so points
+    are JSON-serialisable and 2 and 2.0 are the same point. Points are ordered so that those
+    sharing V_i(t) and then H_i inputs are adjacent.
+    """
+    for name, values in grid.items():
+        if name in SCENARIO_AXES:
+            unknown = [v for v in values if v not in SCENARIO_AXES[name]]
+            if unknown:
+                raise KeyError(f"Unknown {name} scenarios: {unknown}")
+        elif name not in PARAMETER_NAMES:
+            raise KeyError(f"Unknown sweep axis: {name}")
+    cast = {name: str if name in SCENARIO_AXES else int if name == "TTV" else float for name in grid}
+    grid = {name: [cast[name](v) for v in values] for name, values in grid.items()}
+    base = dict(default_parameters(), economic_climate="Neutral", ai_innovation_pace="Neutral")
+    order = [n for n in V_DEPENDS_ON + H_DEPENDS_ON if n in grid] + [n for n in grid if n not in V_DEPENDS_ON + H_DEPENDS_ON]
+    return [dict(base, **dict(zip(order, combo))) for combo in itertools.product(*(grid[n] for n in order))]
+
+
+def point_key(point: dict, book: str = "") -> str:
+    """Resume key of a grid point swept over the book with fingerprint `book`."""
+    return json.dumps({"book": book, "point": point}, sort_keys=True)
+
+
+def book_fingerprint(base: dict) -> str:
+    """Hash of the sweep_base() arrays: everything the book and the factor tables contribute."""
+    digest = hashlib.sha256()
+    for name in sorted(base):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(base[name], dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _read_results(path: str) -> dict:
+    """
+    {key: metrics} of the points recorded in a results file. A last line cut short by an
+    interruption is truncated away, so the next append starts on a line of its own.
+    """
+    with open(path, "rb+") as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            f.truncate(complete)
+    done = {}
+    for line in data[:complete].splitlines():
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        done[row["key"]] = row["metrics"]
+    return done
+
+
+class SweepEvaluator:
+    """
+    Evaluates grid points against precomputed per-policy intermediates, keeping the last
+    V_i(t) and H_i arrays so consecutive points that share their inputs skip recomputation.
+    """
+
+    def __init__(self, base: dict):
+        self.base = base
+        self._v_key = self._h_key = None
+        self._v = self._h = None
+        self.v_computations = self.h_computations = 0
+
+    def _v_idiosyncratic(self, point: dict) -> np.ndarray:
+        key = tuple(point[n] for n in V_DEPENDS_ON)
+        if key != self._v_key:
+            b = self.base
+            fus = 1 - (point["GAMMA_GEN"] * b["p_gen"] + point["GAMMA_SPEC"] * b["p_spec"])
+            v_raw = b["fhc"] * (point["W_CR"] * b["fcr"] + point["W_US"] * fus)
+            self._v, self._v_key = calculate_v_idiosyncratic_normalized_vec(v_raw), key
+            self.v_computations += 1
+        return self._v
+
+    def _h_systematic(self, point: dict) -> np.ndarray:
+        key = tuple(point[n] for n in H_DEPENDS_ON)
+        if key != self._h_key:
+            m_econ = ECONOMIC_CLIMATE_SCENARIOS[point["economic_climate"]]
+            i_ai = AI_INNOVATION_SCENARIOS[point["ai_innovation_pace"]]
+            self._h = self.base["h_base"] * (point["W_ECON"] * m_econ + point["W_INNO"] * i_ai)
+            self._h_key = key
+            self.h_computations += 1
+        return self._h
+
+    def evaluate(self, point: dict) -> dict:
+        """Portfolio premium and expected-loss metrics at one grid point."""
+        v = self._v_idiosyncratic(point)
+        h = self._h_systematic(point)
+        p_claim = ((h / 100.0) * point["BETA_SYSTEMIC"]) * ((v / 100.0) * point["BETA_INDIVIDUAL"])
+        e_loss = p_claim * self.base["l_payout"]
+        p_monthly = calculate_monthly_premium_vec(e_loss, point["LAMBDA"], point["P_MIN"])
+        annual_premium = 12.0 * float(p_monthly.sum())
+        expected_loss = float(e_loss.sum())
+        return {
+            "policies": int(p_monthly.size),
+            "annual_premium": annual_premium,
+            "mean_monthly_premium": float(p_monthly.mean()) if p_monthly.size else 0.0,
+            "expected_loss": expected_loss,
+            "expected_loss_ratio": expected_loss / annual_premium if annual_premium > 0 else float("nan"),
+            "share_at_p_min": float((p_monthly == point["P_MIN"]).mean()) if p_monthly.size else 0.0,
+            "mean_p_claim": float(p_claim.mean()) if p_claim.size else 0.0,
+        }
+
+
+def sweep_base(df) -> dict:
+    """Per-policy inputs that no swept parameter affects, computed once."""
+    priced = price_portfolio(df)
+    return {
+        "fhc": priced["fhc"], "fcr": priced["fcr"], "h_base": priced["h_base"], "l_payout": priced["l_payout"],
+        "p_gen": np.asarray(df["general_skill_progress"], dtype=np.float64),
+        "p_spec": np.asarray(df["firm_specific_skill_progress"], dtype=np.float64),
+    }
+
+
+_WORKER_EVALUATOR = {}
+
+
+def _init_worker(base: dict) -> None:
+    _WORKER_EVALUATOR["base"] = base
+
+
+def _run_task(points: list) -> list:
+    evaluator = SweepEvaluator(_WORKER_EVALUATOR["base"])
+    return [(point, evaluator.evaluate(point)) for point in points]
+
+
+def run_sweep(df, grid: dict, results_path: str = None, workers: int = 1,
+              points_per_task: int = DEFAULT_POINTS_PER_TASK) -> list:
+    """
+    Evaluates the book at every point of `grid` and returns [{**point, **metrics}] in grid order.
+    When `results_path` is given, each finished point is appended to it as a JSON line and points
+    already present there for the same book (see book_fingerprint) are skipped, so an interrupted
+    sweep resumes where it stopped.
+    With workers > 1, contiguous runs of points are evaluated in a process pool.
+    """
+    points = expand_grid(grid)
+    base = sweep_base(df)
+    book = book_fingerprint(base)
+    done = _read_results(results_path) if results_path and os.path.exists(results_path) else {}
+    pending = [p for p in points if point_key(p, book) not in done]
+
+    if pending:
+        tasks = [pending[i:i + points_per_task] for i in range(0, len(pending), points_per_task)]
+        out = open(results_path, "a") if results_path else None
+        try:
+            def record(results):
+                for point, metrics in results:
+                    done[point_key(point, book)] = metrics
+                    if out is not None:
+                        out.write(json.dumps({"key": point_key(point, book), "book": book, "point": point,
+                                              "metrics": metrics}) + "\n")
+                if out is not None:
+                    out.flush()
+
+            if workers <= 1:
+                _init_worker(base)
+                for task in tasks:
+                    record(_run_task(task))
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(base,)) as pool:
+                    for future in as_completed([pool.submit(_run_task, task) for task in tasks]):
+                        record(future.result())
+        finally:
+            if out is not None:
+                out.close()
+
+    return [dict(point, **done[point_key(point, book)]) for point in points]
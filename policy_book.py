@@ -0,0 +1,212 @@
+import json
+import os
+import numpy as np
+from actuarial_params import default_parameters
+from batch_pricing import PORTFOLIO_COLUMNS, SCENARIO_COLUMNS, price_portfolio, portfolio_kwargs
+from factor_tables import VOCABULARIES, UNKNOWN_CODE, encode_column
+from storage import replace_directory, resolve_directory, staging_directory
+
+BOOK_FORMAT_VERSION = 1
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Storage dtype of every column. Categories are factor_tables codes (UNKNOWN_CODE = -1 keeps the
+# lookup default). Progress and coverage fractions stay float64: float32 would move e.g. 0.05 off
+# the slider grid and change prices. Experience and salaries are float32, which is exact for
+# whole (or half, quarter, ...) years and whole-dollar salaries up to $16.7M.
+INPUT_SCHEMA = {
+    "occupation": np.int8, "education_level": np.int8, "education_field": np.int8,
+    "school_tier": np.int8, "company_type": np.int8, "economic_climate": np.int8, "ai_innovation_pace": np.int8,
+    "years_experience": np.float32, "general_skill_progress": np.float64,
+    "firm_specific_skill_progress": np.float64, "annual_salary": np.float32,
+    "coverage_duration": np.int16, "coverage_percentage": np.float64,
+}
+# Cached pricing intermediates, filled by PolicyBook.price().
+INTERMEDIATE_SCHEMA = {
+    "fhc": np.float32, "fcr": np.float32, "v_idiosyncratic": np.float32, "h_systematic": np.float32,
+    "p_systemic": np.float32, "p_individual_conditional": np.float32, "p_claim": np.float32,
+    "l_payout": np.float32, "e_loss": np.float32, "p_monthly": np.float32,
+}
+SCHEMA = {**INPUT_SCHEMA, **INTERMEDIATE_SCHEMA}
+
+for _column, _vocab in VOCABULARIES.items():
+    if len(_vocab) > np.iinfo(INPUT_SCHEMA[_column]).max:
+        raise ValueError(f"{_column} has too many labels for {INPUT_SCHEMA[_column].__name__} codes")
+
+
+def _storage_column(column: str, values, dtype) -> np.ndarray:
+    """
+    Casts an input column to its INPUT_SCHEMA dtype. Raises ValueError for values the cast
+    would change beyond float rounding: non-finite values, fractional or out-of-range
+    integers and magnitudes beyond the float32 range.
+    """
+    values = np.asarray(values)
+    if column in VOCABULARIES:
+        return values.astype(dtype)
+    numeric = values.astype(np.float64)
+    if not np.isfinite(numeric).all():
+        raise ValueError(f"{column} has non-finite values")
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        if np.any(numeric != np.floor(numeric)) or (numeric.size and (numeric.min() < info.min or numeric.max() > info.max)):
+            raise ValueError(f"{column} must hold whole numbers in [{info.min}, {info.max}]")
+    elif numeric.size and np.abs(numeric).max() > np.finfo(dtype).max:
+        raise ValueError(f"{column} has values beyond the {np.dtype(dtype).name} range")
+    return numeric.astype(dtype)
+
+
+class PolicyRecord:
+    """
+    View of one row of a PolicyBook. Reads go to the book's arrays, so a record costs two
+    references however many columns the book has; categorical fields decode to their labels.
+    """
+    __slots__ = ("_book", "_row")
+
+    def __init__(self, book: "PolicyBook", row: int):
+        self._book = book
+        self._row = row
+
+    def __getattr__(self, name: str):
+        # Only column names are looked up; private and dunder names (e.g. probed by copy and
+        # pickle on an instance whose slots are not set yet) must not recurse into self._book.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            value = self._book.columns[name][self._row]
+        except KeyError:
+            raise AttributeError(name) from None
+        if name in VOCABULARIES:
+            return VOCABULARIES[name].labels[value] if value != UNKNOWN_CODE else None
+        return value.item()
+
+    def to_dict(self) -> dict:
+        """Field -> value for every stored column (a profile dict usable by pricing.price_profile)."""
+        return {name: getattr(self, name) for name in self._book.columns}
+
+    def __repr__(self) -> str:
+        return f"PolicyRecord({self._row}, {self.to_dict()})"
+
+
+class PolicyBook:
+    """
+    A book of policies stored as one contiguous array per column (struct of arrays) with the
+    INPUT_SCHEMA/INTERMEDIATE_SCHEMA dtypes: 41 bytes of inputs per policy, 40 more once priced. Slicing with
+    a step-1 slice returns a view sharing the same arrays, so chunks can be priced in place.
+    """
+
+    def __init__(self, columns: dict):
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        missing = [column for column in INPUT_SCHEMA if column not in columns]
+        if missing:
+            raise KeyError(f"Policy book is missing columns: {missing}")
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df, unknown_report: dict = None) -> "PolicyBook":
+        """
+        Builds a book from any column mapping holding PORTFOLIO_COLUMNS (labels or codes).
+        Scenario columns default to "Neutral"; unknown labels are tallied into `unknown_report`.
+        Raises ValueError for numeric values the INPUT_SCHEMA dtypes cannot hold (see _storage_column).
+        """
+        missing = [column for column in PORTFOLIO_COLUMNS if column not in df]
+        if missing:
+            raise KeyError(f"Portfolio is missing required columns: {missing}")
+        n = len(df["occupation"])
+        columns = {}
+        for column, dtype in INPUT_SCHEMA.items():
+            values = df[column] if column in df else np.full(n, "Neutral")
+            if column in VOCABULARIES:
+                values = encode_column(column, values, unknown_report)
+            columns[column] = _storage_column(column, values, dtype)
+        return cls(columns)
+
+    @classmethod
+    def from_records(cls, records, unknown_report: dict = None) -> "PolicyBook":
+        """Builds a book from profile dicts (e.g. PolicyRecord.to_dict()); only inputs are kept."""
+        records = list(records)
+        columns = {column: [r[column] for r in records] for column in PORTFOLIO_COLUMNS}
+        for column in SCENARIO_COLUMNS:
+            columns[column] = [r.get(column, "Neutral") for r in records]
+        return cls.from_frame(columns, unknown_report)
+
+    def __len__(self) -> int:
+        return len(self.columns["occupation"])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                raise ValueError("Only contiguous slices are supported (they are zero-copy views)")
+            return PolicyBook({name: values[key] for name, values in self.columns.items()})
+        row = int(key)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(key)
+        return PolicyRecord(self, row)
+
+    def __iter__(self):
+        return (PolicyRecord(self, row) for row in range(len(self)))
+
+    def chunks(self, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        """Zero-copy consecutive views of at most `chunk_rows` policies."""
+        for start in range(0, len(self), chunk_rows):
+            yield self[start:start + chunk_rows]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.columns.values())
+
+    def pricing_columns(self) -> dict:
+        """The PORTFOLIO_COLUMNS and SCENARIO_COLUMNS arrays, as price_portfolio takes them."""
+        return {column: self.columns[column] for column in PORTFOLIO_COLUMNS + list(SCENARIO_COLUMNS)}
+
+    def allocate_intermediates(self) -> None:
+        """Adds zeroed INTERMEDIATE_SCHEMA columns so chunk views can be priced into the parent."""
+        for column, dtype in INTERMEDIATE_SCHEMA.items():
+            if column not in self.columns:
+                self.columns[column] = np.zeros(len(self), dtype=dtype)
+
+    def price(self, params: dict = None, unknown_report: dict = None) -> None:
+        """
+        Prices the book with batch_pricing.price_portfolio and stores the INTERMEDIATE_SCHEMA
+        columns. Existing intermediate arrays are overwritten in place, so pricing the chunks
+        of an allocated (or writable memory-mapped) book fills the whole book.
+        """
+        params = default_parameters() if params is None else params
+        results = price_portfolio(self.pricing_columns(), unknown_report=unknown_report, **portfolio_kwargs(params))
+        for column, dtype in INTERMEDIATE_SCHEMA.items():
+            if column in self.columns:
+                self.columns[column][...] = results[column]
+            else:
+                self.columns[column] = results[column].astype(dtype)
+
+
+def save_policy_book(book: PolicyBook, path: str) -> None:
+    """
+    Writes one .npy file per column plus meta.json and publishes it with
+    storage.replace_directory, so a concurrent load sees either the old or the new book in full.
+    """
+    staging = staging_directory(path)
+    for name, values in book.columns.items():
+        np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(values))
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"format": BOOK_FORMAT_VERSION, "rows": len(book), "columns": list(book.columns),
+                   "labels": {name: list(vocab.labels) for name, vocab in VOCABULARIES.items()}}, f, indent=2)
+    replace_directory(staging, path)
+
+
+def load_policy_book(path: str, mmap_mode: str = "r") -> PolicyBook:
+    """
+    Memory-maps a saved book (mmap_mode "r+" to price it in place). Raises ValueError if it
+    was written with another format or other category vocabularies, whose codes would not match.
+    """
+    path = resolve_directory(path)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != BOOK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported policy book format: {meta.get('format')}")
+    if meta["labels"] != {name: list(vocab.labels) for name, vocab in VOCABULARIES.items()}:
+        raise ValueError("Policy book was written with different category vocabularies")
+    return PolicyBook({name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                       for name in meta["columns"]})
@@ -0,0 +1,339 @@
+"""
+Precomputed premium lookup cube over the discrete input space of app.py.
+
+    python premium_cube.py --output /srv/airisk/cube
+    python premium_cube.py --output /srv/airisk/cube --parameter-set calibrated.json
+
+The build step evaluates the cube for a parameter set (default: the active
+model_registry.current_snapshot()) and publishes it with storage.replace_directory. Processes that
+find it at $AIRISK_PREMIUM_CUBE quote single profiles from it (quote_profile) whenever the
+profile lies on the grid and the cube's fingerprint matches the model they price with; every
+other quote runs the scalar pricing.price_profile chain.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import numpy as np
+from actuarial_params import default_parameters
+from calculations import (
+    calculate_fexp, calculate_fus, calculate_v_idiosyncratic_normalized,
+    calculate_p_systemic, calculate_p_individual_conditional, calculate_p_claim,
+    calculate_l_payout, calculate_expected_loss, calculate_monthly_premium
+)
+from factor_tables import (
+    FACTOR_TABLES, OCCUPATIONS, EDUCATION_LEVELS, EDUCATION_FIELDS, SCHOOL_TIERS, COMPANY_TYPES,
+    ECONOMIC_CLIMATES, AI_INNOVATION_PACES
+)
+from instrumentation import increment
+from pricing import price_profile
+from storage import replace_directory, resolve_directory, staging_directory
+
+PREMIUM_CUBE_ENV = "AIRISK_PREMIUM_CUBE"
+
+CUBE_FORMAT_VERSION = 2
+
+# Experience beyond 20 years does not change f_exp, so the cube stores 0..20 and
+# lookups clamp; this halves the V cube with no loss of exactness.
+EXPERIENCE_STEPS = 21
+# Skill sliders in app.py move in 5% steps: 0, 5, ..., 100 -> 0.00, 0.05, ..., 1.00.
+SKILL_PROGRESS_GRID = np.arange(0, 101, 5) / 100.0
+
+# V_i(t) = clip(50 * FHC * (W_CR * FCR + W_US * FUS)) is stored as its two factors, each over
+# only the axes it depends on; the full product over all eight V axes would take ~167 MB.
+# FHC axes: occupation, level, field, tier, experience. Company term axes: company, P_gen, P_spec.
+# H_i axes: occupation, economic climate, AI innovation pace.
+FHC_AXES = ("occupation", "education_level", "education_field", "school_tier", "years_experience")
+COMPANY_TERM_AXES = ("company_type", "general_skill_progress", "firm_specific_skill_progress")
+H_AXES = ("occupation", "economic_climate", "ai_innovation_pace")
+
+
+# Order in which the factor tables enter the fingerprint.
+FINGERPRINT_TABLES = ("occupation_hazard", "role_multiplier", "education_level_factor", "education_field_factor",
+                      "school_tier_factor", "company_type_factor", "economic_climate_modifier", "ai_innovation_index")
+
+
+def cube_fingerprint(params: dict, tables: dict = None) -> str:
+    """
+    Hashes everything a cube depends on: the actuarial parameter set, the factor tables
+    (factor_tables.FACTOR_TABLES unless `tables` is given), the grid and the storage format.
+    A cube is only reused when fingerprints match.
+    """
+    tables = FACTOR_TABLES if tables is None else tables
+    payload = {
+        "format": CUBE_FORMAT_VERSION,
+        "params": {name: float(value) for name, value in sorted(params.items())},
+        "tables": [tables[name].values.tolist() for name in FINGERPRINT_TABLES],
+        "labels": [list(vocab.labels) for vocab in (
+            OCCUPATIONS, EDUCATION_LEVELS, EDUCATION_FIELDS, SCHOOL_TIERS, COMPANY_TYPES,
+            ECONOMIC_CLIMATES, AI_INNOVATION_PACES)],
+        "grid": [EXPERIENCE_STEPS, SKILL_PROGRESS_GRID.tolist()],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _skill_step(progress) -> np.ndarray:
+    """Maps skill progress fractions onto grid steps, rejecting values off the 5% grid."""
+    progress = np.asarray(progress, dtype=np.float64)
+    steps = np.rint(progress * 20).astype(np.intp)
+    if np.any((steps < 0) | (steps >= len(SKILL_PROGRESS_GRID))) or np.any(SKILL_PROGRESS_GRID[np.clip(steps, 0, 20)] != progress):
+        raise ValueError("Skill progress must lie on the 5% slider grid (0.00, 0.05, ..., 1.00).")
+    return steps
+
+
+def _experience_step(years) -> np.ndarray:
+    """Maps years of experience onto the experience axis (clamped at 20), rejecting fractional or negative values."""
+    years = np.asarray(years, dtype=np.float64)
+    if np.any(years < 0) or np.any(years != np.floor(years)):
+        raise ValueError("Years of experience must be whole numbers >= 0.")
+    return np.minimum(years, EXPERIENCE_STEPS - 1).astype(np.intp)
+
+
+class PremiumCube:
+    """
+    Precomputed V_i(t) and H_i over the discrete input space of app.py for one parameter set.
+    V_i(t) is kept as its FHC and company-term factors, multiplied at lookup in the operation
+    order of calculations.py, and the H_i cube only spans the axes H_i depends on, so the
+    arrays stay compact (well under 1 MB with the built-in tables).
+    """
+
+    def __init__(self, fhc: np.ndarray, company_term: np.ndarray, h_systematic: np.ndarray,
+                 params: dict, fingerprint: str):
+        self.fhc = fhc
+        self.company_term = company_term
+        self.h_systematic = h_systematic
+        self.params = dict(params)
+        self.fingerprint = fingerprint
+
+    @property
+    def nbytes(self) -> int:
+        return self.fhc.nbytes + self.company_term.nbytes + self.h_systematic.nbytes
+
+    def lookup_codes(self, occupation, education_level, education_field, school_tier, company_type,
+                     years_experience, general_skill_progress, firm_specific_skill_progress,
+                     economic_climate, ai_innovation_pace):
+        """
+        Vectorized lookup from factor_tables codes (scalars or arrays). Returns (V_i(t), H_i).
+        Raises ValueError for experience that is not a whole number >= 0 or skill progress off the grid.
+        """
+        fhc = self.fhc[occupation, education_level, education_field, school_tier, _experience_step(years_experience)]
+        company_term = self.company_term[company_type, _skill_step(general_skill_progress),
+                                         _skill_step(firm_specific_skill_progress)]
+        v = np.minimum(100.0, np.maximum(5.0, (fhc * company_term) * 50.0))
+        h = self.h_systematic[occupation, economic_climate, ai_innovation_pace]
+        return v, h
+
+    def lookup(self, occupation: str, education_level: str, education_field: str, school_tier: str,
+               company_type: str, years_experience: int, general_skill_progress: float,
+               firm_specific_skill_progress: float, economic_climate: str, ai_innovation_pace: str):
+        """
+        O(1) lookup of (V_i(t), H_i) for one profile given by its app.py labels.
+        Raises KeyError for labels outside the factor tables.
+        """
+        v, h = self.lookup_codes(
+            OCCUPATIONS.index[occupation], EDUCATION_LEVELS.index[education_level],
+            EDUCATION_FIELDS.index[education_field], SCHOOL_TIERS.index[school_tier],
+            COMPANY_TYPES.index[company_type], years_experience, general_skill_progress,
+            firm_specific_skill_progress, ECONOMIC_CLIMATES.index[economic_climate],
+            AI_INNOVATION_PACES.index[ai_innovation_pace])
+        return float(v), float(h)
+
+    def quote(self, annual_salary: float, coverage_duration: int, coverage_percentage: float, **profile) -> dict:
+        """
+        Quotes one profile: V_i(t) and H_i come from the cube, the remaining
+        closed-form steps run through calculations.py with the cube's parameters.
+        """
+        v, h = self.lookup(**profile)
+        p_claim = calculate_p_claim(calculate_p_systemic(h, self.params["BETA_SYSTEMIC"]),
+                                    calculate_p_individual_conditional(v, self.params["BETA_INDIVIDUAL"]))
+        e_loss = calculate_expected_loss(p_claim, calculate_l_payout(annual_salary, coverage_duration, coverage_percentage))
+        return {
+            "v_idiosyncratic": v, "h_systematic": h, "p_claim": p_claim, "e_loss": e_loss,
+            "p_monthly": calculate_monthly_premium(e_loss, self.params["LAMBDA"], self.params["P_MIN"]),
+        }
+
+    def price_profile(self, profile: dict, tables: dict = None):
+        """
+        Every output of pricing.price_profile for one profile, with FHC, V_raw and H_i read from
+        the cube; the single-factor lookups come from `tables` (the tables the cube was built
+        with; FACTOR_TABLES by default). Results are bit-identical to price_profile. Returns
+        None when the profile is off the grid or has labels outside the factor tables.
+        """
+        tables = FACTOR_TABLES if tables is None else tables
+        economic_climate = profile.get("economic_climate", "Neutral")
+        ai_innovation_pace = profile.get("ai_innovation_pace", "Neutral")
+        try:
+            occupation = OCCUPATIONS.index[profile["occupation"]]
+            company_type = COMPANY_TYPES.index[profile["company_type"]]
+            econ, inno = ECONOMIC_CLIMATES.index[economic_climate], AI_INNOVATION_PACES.index[ai_innovation_pace]
+            fhc = float(self.fhc[occupation, EDUCATION_LEVELS.index[profile["education_level"]],
+                                 EDUCATION_FIELDS.index[profile["education_field"]],
+                                 SCHOOL_TIERS.index[profile["school_tier"]],
+                                 _experience_step(profile["years_experience"])])
+            company_term = float(self.company_term[company_type, _skill_step(profile["general_skill_progress"]),
+                                                   _skill_step(profile["firm_specific_skill_progress"])])
+        except (KeyError, TypeError, ValueError):
+            return None
+        v_raw = fhc * company_term
+        v_idiosyncratic = calculate_v_idiosyncratic_normalized(v_raw)
+        h_systematic = float(self.h_systematic[occupation, econ, inno])
+        p_systemic = calculate_p_systemic(h_systematic, self.params["BETA_SYSTEMIC"])
+        p_individual_conditional = calculate_p_individual_conditional(v_idiosyncratic, self.params["BETA_INDIVIDUAL"])
+        p_claim = calculate_p_claim(p_systemic, p_individual_conditional)
+        l_payout = calculate_l_payout(profile["annual_salary"], profile["coverage_duration"], profile["coverage_percentage"])
+        e_loss = calculate_expected_loss(p_claim, l_payout)
+        increment("premium_cube_quotes_total")
+        return {
+            "f_exp": calculate_fexp(profile["years_experience"]),
+            "f_role": tables["role_multiplier"].lookup(profile["occupation"]),
+            "f_level": tables["education_level_factor"].lookup(profile["education_level"]),
+            "f_field": tables["education_field_factor"].lookup(profile["education_field"]),
+            "f_school": tables["school_tier_factor"].lookup(profile["school_tier"]),
+            "fhc": fhc, "fcr": tables["company_type_factor"].lookup(profile["company_type"]),
+            "fus": calculate_fus(profile["general_skill_progress"], profile["firm_specific_skill_progress"],
+                                 self.params["GAMMA_GEN"], self.params["GAMMA_SPEC"]),
+            "v_raw": v_raw, "v_idiosyncratic": v_idiosyncratic,
+            "h_base": tables["occupation_hazard"].lookup(profile["occupation"]),
+            "m_econ": tables["economic_climate_modifier"].lookup(economic_climate),
+            "i_ai": tables["ai_innovation_index"].lookup(ai_innovation_pace), "h_systematic": h_systematic,
+            "p_systemic": p_systemic, "p_individual_conditional": p_individual_conditional,
+            "p_claim": p_claim, "l_payout": l_payout, "e_loss": e_loss,
+            "p_monthly": calculate_monthly_premium(e_loss, self.params["LAMBDA"], self.params["P_MIN"]),
+        }
+
+
+def build_premium_cube(params: dict = None, tables: dict = None) -> PremiumCube:
+    """
+    Evaluates the V_i(t) factors and H_i over the full grid with the operation order of
+    calculations.py. `tables` replaces the built-in factor tables (e.g. with a model_registry
+    snapshot's).
+    """
+    params = default_parameters() if params is None else dict(params)
+    tables = FACTOR_TABLES if tables is None else tables
+    f_exp = 1 - (0.015 * np.minimum(np.arange(EXPERIENCE_STEPS, dtype=np.float64), 20))
+    p = SKILL_PROGRESS_GRID
+    fus = 1 - (params["GAMMA_GEN"] * p[:, None] + params["GAMMA_SPEC"] * p[None, :])
+    company_term = params["W_CR"] * tables["company_type_factor"].values[:-1, None, None] + params["W_US"] * fus[None, :, :]
+
+    role = tables["role_multiplier"].values[:-1]
+    level = tables["education_level_factor"].values[:-1]
+    field = tables["education_field_factor"].values[:-1]
+    tier = tables["school_tier_factor"].values[:-1]
+    fhc = (role[:, None, None, None, None] * level[None, :, None, None, None] * field[None, None, :, None, None]
+           * tier[None, None, None, :, None] * f_exp[None, None, None, None, :])
+
+    # H_base(0) equals the current hazard, as in the "Calculate AI-Q Score" branch.
+    modifier = (params["W_ECON"] * tables["economic_climate_modifier"].values[:-1, None]
+                + params["W_INNO"] * tables["ai_innovation_index"].values[None, :-1])
+    h_cube = tables["occupation_hazard"].values[:-1, None, None] * modifier[None, :, :]
+    return PremiumCube(fhc, company_term, h_cube, params, cube_fingerprint(params, tables))
+
+
+def save_premium_cube(cube: PremiumCube, path: str) -> None:
+    """
+    Writes the cube as .npy arrays plus meta.json and publishes it with
+    storage.replace_directory, so a concurrent load sees either the old or the new cube in full.
+    """
+    staging = staging_directory(path)
+    np.save(os.path.join(staging, "fhc.npy"), cube.fhc)
+    np.save(os.path.join(staging, "company_term.npy"), cube.company_term)
+    np.save(os.path.join(staging, "h_systematic.npy"), cube.h_systematic)
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"fingerprint": cube.fingerprint, "params": cube.params, "fhc_axes": FHC_AXES,
+                   "company_term_axes": COMPANY_TERM_AXES, "h_axes": H_AXES}, f, indent=2)
+    replace_directory(staging, path)
+
+
+def load_premium_cube(path: str, params: dict = None, tables: dict = None):
+    """
+    Memory-maps a saved cube. Returns None when it is missing or was built for a
+    different parameter set / factor tables, i.e. when it must be rebuilt.
+    """
+    path = resolve_directory(path)
+    params = default_parameters() if params is None else params
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("fingerprint") != cube_fingerprint(params, tables):
+        return None
+    return PremiumCube(np.load(os.path.join(path, "fhc.npy"), mmap_mode="r"),
+                       np.load(os.path.join(path, "company_term.npy"), mmap_mode="r"),
+                       np.load(os.path.join(path, "h_systematic.npy"), mmap_mode="r"),
+                       meta["params"], meta["fingerprint"])
+
+
+def get_premium_cube(path: str, params: dict = None, tables: dict = None) -> PremiumCube:
+    """Loads the cube at `path`, rebuilding and saving it first if it is stale or missing."""
+    cube = load_premium_cube(path, params, tables)
+    if cube is None:
+        save_premium_cube(build_premium_cube(params, tables), path)
+        cube = load_premium_cube(path, params, tables)
+    return cube
+
+
+_ACTIVE = {}
+_active_lock = threading.Lock()
+# Distinct (cube, parameter set) pairs kept loaded; sidebar overrides each add one.
+MAX_ACTIVE_CUBES = 16
+
+
+def active_cube(params: dict, snapshot=None):
+    """
+    The cube published at $AIRISK_PREMIUM_CUBE if it was built for `params` and the factor
+    tables of `snapshot` (a model_registry snapshot; built-in tables for None), else None.
+    Results are kept per published cube directory, model version and parameter set, so a
+    republished cube or a new model version is picked up on the next quote.
+    """
+    path = os.environ.get(PREMIUM_CUBE_ENV)
+    if not path:
+        return None
+    key = (resolve_directory(path), None if snapshot is None else snapshot.version, tuple(sorted(params.items())))
+    with _active_lock:
+        if key in _ACTIVE:
+            return _ACTIVE[key]
+    cube = load_premium_cube(path, params, None if snapshot is None else snapshot.tables)
+    with _active_lock:
+        if len(_ACTIVE) >= MAX_ACTIVE_CUBES:
+            _ACTIVE.clear()
+        _ACTIVE[key] = cube
+    return cube
+
+
+def quote_profile(profile: dict, params: dict, snapshot=None) -> dict:
+    """
+    pricing.price_profile for one profile, answered from the active cube (see active_cube) when
+    the profile lies on its grid, and by the scalar chain otherwise. The results are identical.
+    """
+    tables = None if snapshot is None else snapshot.tables
+    cube = active_cube(params, snapshot)
+    result = None if cube is None else cube.price_profile(profile, tables)
+    return price_profile(profile, params, tables) if result is None else result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build and publish the premium lookup cube for a parameter set.")
+    parser.add_argument("--output", default=os.environ.get(PREMIUM_CUBE_ENV),
+                        help=f"Directory to publish the cube to (default ${PREMIUM_CUBE_ENV})")
+    parser.add_argument("--parameter-set", help="Parameter set JSON (default: the active model_registry model)")
+    args = parser.parse_args(argv)
+    if not args.output:
+        parser.error(f"Pass --output or set {PREMIUM_CUBE_ENV}.")
+
+    from model_registry import current_snapshot, load_snapshot
+    try:
+        snapshot = load_snapshot(args.parameter_set) if args.parameter_set else current_snapshot()
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    cube = build_premium_cube(dict(snapshot.params), snapshot.tables)
+    save_premium_cube(cube, args.output)
+    print(f"Wrote the premium cube of model {snapshot.version} ({cube.nbytes / 1e6:.2f} MB) to {args.output}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
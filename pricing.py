@@ -0,0 +1,134 @@
+import math
+import numbers
+from collections.abc import Mapping
+from actuarial_params import default_parameters
+from calculations import (
+    calculate_fexp, calculate_fhc, calculate_fus,
+    calculate_v_idiosyncratic_raw, calculate_v_idiosyncratic_normalized,
+    calculate_h_base_ttv, calculate_systematic_risk,
+    calculate_p_systemic, calculate_p_individual_conditional, calculate_p_claim,
+    calculate_l_payout, calculate_expected_loss, calculate_monthly_premium
+)
+from data_utils import (
+    get_occupation_hazard, get_role_multiplier, get_company_type_factor,
+    get_education_level_factor, get_education_field_factor, get_school_tier_factor,
+    get_economic_climate_modifier, get_ai_innovation_index
+)
+from factor_tables import VOCABULARIES
+from instrumentation import instrumented, increment, is_enabled
+
+# Profile fields of a single quote; the same names are used as batch_pricing columns.
+NUMERIC_FIELDS = ("years_experience", "general_skill_progress", "firm_specific_skill_progress",
+                  "annual_salary", "coverage_duration", "coverage_percentage")
+PROFILE_FIELDS = ("occupation", "education_level", "education_field", "school_tier", "company_type") + NUMERIC_FIELDS
+# Inclusive (low, high) bounds of each numeric field; None leaves that side open.
+VALID_RANGES = {
+    "years_experience": (0, None), "general_skill_progress": (0.0, 1.0),
+    "firm_specific_skill_progress": (0.0, 1.0), "annual_salary": (0, None),
+    "coverage_duration": (0, None), "coverage_percentage": (0.0, 1.0),
+}
+CATEGORICAL_FIELDS = ("occupation", "education_level", "education_field", "school_tier",
+                      "company_type", "economic_climate", "ai_innovation_pace")
+# Parameters that are probabilities; overrides must lie in (0, 1].
+PROBABILITY_PARAMETERS = ("BETA_SYSTEMIC", "BETA_INDIVIDUAL")
+# The data_utils getters under their factor_tables.FACTOR_TABLES names.
+_DATA_UTILS_LOOKUPS = {
+    "occupation_hazard": get_occupation_hazard, "role_multiplier": get_role_multiplier,
+    "education_level_factor": get_education_level_factor, "education_field_factor": get_education_field_factor,
+    "school_tier_factor": get_school_tier_factor, "company_type_factor": get_company_type_factor,
+    "economic_climate_modifier": get_economic_climate_modifier, "ai_innovation_index": get_ai_innovation_index,
+}
+
+
+def resolve_parameters(overrides: dict = None, base: dict = None) -> dict:
+    """
+    Returns `base` (default: the actuarial_params constants) with `overrides` applied.
+    Override values may be numbers or numeric strings (e.g. from a command line).
+    Raises KeyError for names that are not in actuarial_params.PARAMETER_NAMES, TypeError for
+    overrides that are not a mapping or values that are not numbers, and ValueError for
+    non-finite values, a TTV that is not a whole number of months >= 1 or a
+    PROBABILITY_PARAMETERS value outside (0, 1].
+    """
+    if overrides is not None and not isinstance(overrides, Mapping):
+        raise TypeError("Parameter overrides must be an object of name: value pairs.")
+    params = default_parameters() if base is None else dict(base)
+    for name, value in (overrides or {}).items():
+        if name not in params:
+            raise KeyError(f"Unknown actuarial parameter: {name}")
+        if isinstance(value, bool) or not isinstance(value, (numbers.Real, str)):
+            raise TypeError(f"Parameter {name} must be a number.")
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"Parameter {name} must be a number, got {value!r}.")
+        if not math.isfinite(value):
+            raise ValueError(f"Parameter {name} must be finite.")
+        if name == "TTV":
+            if value < 1 or not value.is_integer():
+                raise ValueError("TTV must be a whole number of months >= 1.")
+            value = int(value)
+        elif name in PROBABILITY_PARAMETERS and not 0.0 < value <= 1.0:
+            raise ValueError(f"Parameter {name} must be a probability in (0, 1].")
+        params[name] = value
+    return params
+
+
+def unknown_categories(profile: dict) -> dict:
+    """Returns {field: label} for categorical fields whose label is not in the factor tables."""
+    return {field: profile[field] for field in CATEGORICAL_FIELDS
+            if field in profile and profile[field] not in VOCABULARIES[field].index}
+
+
+@instrumented()
+def price_profile(profile: dict, params: dict = None, tables: dict = None) -> dict:
+    """
+    Runs the "Calculate AI-Q Score" chain of app.py for one profile and returns every
+    intermediate factor. Scenario fields default to "Neutral". Factors come from the data_utils
+    lookups, or from `tables` ({factor_tables.FACTOR_TABLES name: FactorTable}) when given.
+    """
+    params = default_parameters() if params is None else params
+    occupation = profile["occupation"]
+    increment("quotes_total")
+    if is_enabled():
+        for field in unknown_categories(profile):
+            increment("unknown_categories_total", field=field)
+
+    if tables is None:
+        lookup = _DATA_UTILS_LOOKUPS
+    else:
+        lookup = {name: table.lookup for name, table in tables.items()}
+    economic_climate = profile.get("economic_climate", "Neutral")
+    ai_innovation_pace = profile.get("ai_innovation_pace", "Neutral")
+
+    f_exp = calculate_fexp(profile["years_experience"])
+    f_role = lookup["role_multiplier"](occupation)
+    f_level = lookup["education_level_factor"](profile["education_level"])
+    f_field = lookup["education_field_factor"](profile["education_field"])
+    f_school = lookup["school_tier_factor"](profile["school_tier"])
+    fcr = lookup["company_type_factor"](profile["company_type"])
+    fhc = calculate_fhc(f_role, f_level, f_field, f_school, f_exp)
+    fus = calculate_fus(profile["general_skill_progress"], profile["firm_specific_skill_progress"],
+                        params["GAMMA_GEN"], params["GAMMA_SPEC"])
+    v_raw = calculate_v_idiosyncratic_raw(fhc, fcr, fus, params["W_CR"], params["W_US"])
+    v_idiosyncratic = calculate_v_idiosyncratic_normalized(v_raw)
+
+    h_base_current = lookup["occupation_hazard"](occupation)
+    h_base = calculate_h_base_ttv(h_base_current, h_base_current, 0, params["TTV"])
+    m_econ = lookup["economic_climate_modifier"](economic_climate)
+    i_ai = lookup["ai_innovation_index"](ai_innovation_pace)
+    h_systematic = calculate_systematic_risk(h_base, m_econ, i_ai, params["W_ECON"], params["W_INNO"])
+
+    p_systemic = calculate_p_systemic(h_systematic, params["BETA_SYSTEMIC"])
+    p_individual_conditional = calculate_p_individual_conditional(v_idiosyncratic, params["BETA_INDIVIDUAL"])
+    p_claim = calculate_p_claim(p_systemic, p_individual_conditional)
+    l_payout = calculate_l_payout(profile["annual_salary"], profile["coverage_duration"], profile["coverage_percentage"])
+    e_loss = calculate_expected_loss(p_claim, l_payout)
+    p_monthly = calculate_monthly_premium(e_loss, params["LAMBDA"], params["P_MIN"])
+
+    return {
+        "f_exp": f_exp, "f_role": f_role, "f_level": f_level, "f_field": f_field, "f_school": f_school,
+        "fhc": fhc, "fcr": fcr, "fus": fus, "v_raw": v_raw, "v_idiosyncratic": v_idiosyncratic,
+        "h_base": h_base, "m_econ": m_econ, "i_ai": i_ai, "h_systematic": h_systematic,
+        "p_systemic": p_systemic, "p_individual_conditional": p_individual_conditional,
+        "p_claim": p_claim, "l_payout": l_payout, "e_loss": e_loss, "p_monthly": p_monthly,
+    }
@@ -0,0 +1,170 @@
+"""
+Headless quoting service: a plain ASGI application around the pricing pipeline.
+
+Run with any ASGI server, e.g.
+    uvicorn quote_service:app --workers 4
+
+Endpoints (JSON in, JSON out):
+    POST /quote        {"profile": {...}, "params": {...}}            -> all intermediate factors
+    POST /quote/batch  {"profiles": [{...}, ...], "params": {...}}    -> columnar results
+    GET  /health
+    GET  /metrics                                                      -> Prometheus text (see instrumentation)
+
+"params" is optional and overrides the active model's parameters by name (e.g. {"LAMBDA": 2.0});
+the merged set must pass model_registry.validate_model. The model is
+model_registry.current_snapshot(), taken once per request, so a version published while the
+service runs is picked up without a restart. Every response carries the base "model_version" and
+the "parameter_version" it was actually priced with, which differs from it when "params" is given.
+This module deliberately does not import streamlit or plotly.
+"""
+import asyncio
+import json
+import math
+import numpy as np
+import instrumentation
+from batch_pricing import price_portfolio
+from model_registry import current_snapshot
+from premium_cube import quote_profile
+from pricing import CATEGORICAL_FIELDS, NUMERIC_FIELDS, PROFILE_FIELDS, VALID_RANGES, unknown_categories
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# Batches above this size are priced in a worker thread so the event loop keeps serving.
+OFFLOAD_BATCH_ROWS = 1000
+
+
+class RequestError(Exception):
+    """A client error, reported back with the given HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _validate_profile(profile) -> dict:
+    """Checks one profile for required fields, finite numbers within VALID_RANGES and known categories."""
+    if not isinstance(profile, dict):
+        raise RequestError(422, "Each profile must be a JSON object.")
+    missing = [field for field in PROFILE_FIELDS if field not in profile]
+    if missing:
+        raise RequestError(422, f"Profile is missing fields: {missing}")
+    for field in NUMERIC_FIELDS:
+        if isinstance(profile[field], bool) or not isinstance(profile[field], (int, float)):
+            raise RequestError(422, f"Field '{field}' must be numeric.")
+        if not math.isfinite(profile[field]):
+            raise RequestError(422, f"Field '{field}' must be finite.")
+        low, high = VALID_RANGES[field]
+        if (low is not None and profile[field] < low) or (high is not None and profile[field] > high):
+            raise RequestError(422, f"Field '{field}' must lie in [{low}, {'inf' if high is None else high}].")
+    for field in CATEGORICAL_FIELDS:
+        if field in profile and not isinstance(profile[field], str):
+            raise RequestError(422, f"Field '{field}' must be a string.")
+    unknown = unknown_categories(profile)
+    if unknown:
+        raise RequestError(422, f"Unknown categories: {unknown}")
+    return profile
+
+
+def _parameters(payload: dict, snapshot) -> dict:
+    try:
+        return snapshot.resolve(payload.get("params"))
+    except (KeyError, TypeError, ValueError) as e:
+        raise RequestError(422, str(e.args[0]) if e.args else str(e))
+
+
+def quote(payload: dict) -> dict:
+    """Handles POST /quote, from the premium cube when one is published for the model (see premium_cube)."""
+    profile = _validate_profile(payload.get("profile"))
+    snapshot = current_snapshot()
+    params = _parameters(payload, snapshot)
+    return {"profile": profile, "model_version": snapshot.version,
+            "parameter_version": snapshot.parameter_version(params),
+            "result": quote_profile(profile, params, snapshot)}
+
+
+def quote_batch(payload: dict) -> dict:
+    """Handles POST /quote/batch with the vectorized batch_pricing engine."""
+    profiles = payload.get("profiles")
+    if not isinstance(profiles, list) or not profiles:
+        raise RequestError(422, "'profiles' must be a non-empty list.")
+    for profile in profiles:
+        _validate_profile(profile)
+    snapshot = current_snapshot()
+    params = _parameters(payload, snapshot)
+    columns = {field: [profile[field] for profile in profiles] for field in PROFILE_FIELDS}
+    columns["economic_climate"] = [profile.get("economic_climate", "Neutral") for profile in profiles]
+    columns["ai_innovation_pace"] = [profile.get("ai_innovation_pace", "Neutral") for profile in profiles]
+    results = price_portfolio(columns, strict=True, **snapshot.pricing_kwargs(params))
+    return {"count": len(profiles), "model_version": snapshot.version,
+            "parameter_version": snapshot.parameter_version(params),
+            "results": {name: values.tolist() for name, values in results.items()}}
+
+
+ROUTES = {
+    ("POST", "/quote"): quote,
+    ("POST", "/quote/batch"): quote_batch,
+}
+
+
+async def _read_body(receive) -> bytes:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise RequestError(413, "Request body too large.")
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _send_json(send, status: int, body: dict) -> None:
+    data = json.dumps(body, default=lambda o: o.item() if isinstance(o, np.generic) else str(o)).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]})
+    await send({"type": "http.response.body", "body": data})
+
+
+async def app(scope, receive, send):
+    """ASGI entry point."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"].rstrip("/") or "/"
+    if method == "GET" and path == "/health":
+        await _send_json(send, 200, {"status": "ok", "model_version": current_snapshot().version})
+        return
+    if method == "GET" and path == "/metrics":
+        data = instrumentation.prometheus_text().encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain; version=0.0.4"), (b"content-length", str(len(data)).encode())]})
+        await send({"type": "http.response.body", "body": data})
+        return
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        await _send_json(send, 404, {"error": f"No route for {method} {path}"})
+        return
+    try:
+        try:
+            payload = json.loads(await _read_body(receive) or b"{}")
+        except ValueError:
+            raise RequestError(400, "Request body is not valid JSON.")
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Request body must be a JSON object.")
+        if handler is quote_batch and len(payload.get("profiles") or ()) > OFFLOAD_BATCH_ROWS:
+            body = await asyncio.get_running_loop().run_in_executor(None, handler, payload)
+        else:
+            body = handler(payload)
+    except RequestError as e:
+        await _send_json(send, e.status, {"error": e.message})
+        return
+    await _send_json(send, 200, body)
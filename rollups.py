@@ -0,0 +1,229 @@
+import itertools
+import json
+import os
+import numpy as np
+from actuarial_params import default_parameters
+from batch_pricing import PORTFOLIO_COLUMNS, SCENARIO_COLUMNS, price_portfolio, portfolio_kwargs
+from factor_tables import UNKNOWN_CODE, VOCABULARIES, encode_column
+from instrumentation import instrumented
+from storage import replace_directory, resolve_directory, staging_directory
+
+ROLLUP_FORMAT_VERSION = 1
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Group-by dimensions (categorical portfolio columns). Each axis has one slot per label plus a
+# trailing slot for unknown labels (UNKNOWN_CODE = -1 indexes it), like the factor tables.
+DEFAULT_DIMENSIONS = ("occupation", "company_type", "education_level", "education_field", "school_tier",
+                      "economic_climate", "ai_innovation_pace")
+UNKNOWN_LABEL = "Unknown"
+# Summed per cell (next to the policy count) from the price_portfolio outputs.
+MEASURES = ("p_monthly", "e_loss", "p_claim", "v_idiosyncratic", "h_systematic", "l_payout")
+# Fixed histogram bin edges, so cells can be updated incrementally; values outside the edges
+# are counted in the first/last bin.
+HISTOGRAM_EDGES = {
+    "p_monthly": np.array([0.0, 5, 10, 15, 20, 25, 30, 40, 50, 75, 100, 150, 200, 300, 500, 750,
+                           1_000, 1_500, 2_000, 3_000, 5_000, 10_000]),
+    "v_idiosyncratic": np.linspace(0.0, 100.0, 21),
+    "h_systematic": np.linspace(0.0, 150.0, 16),
+}
+
+
+class BookRollup:
+    """
+    Pre-aggregated priced book: per cell of the dimension cube, the policy count, the sums of
+    MEASURES and histograms of HISTOGRAM_EDGES. Rows are added or removed with signed bincounts,
+    so repriced policies update the cube without rescanning the book, and any filter / group-by
+    is answered from the cube (tens of thousands of cells) instead of the policies.
+    """
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS, params: dict = None, edges: dict = None):
+        unknown = [dim for dim in dimensions if dim not in VOCABULARIES]
+        if unknown:
+            raise KeyError(f"Unknown rollup dimensions: {unknown}")
+        self.dimensions = tuple(dimensions)
+        self.params = dict(default_parameters() if params is None else params)
+        self.edges = dict(HISTOGRAM_EDGES if edges is None else edges)
+        self.shape = tuple(len(VOCABULARIES[dim]) + 1 for dim in self.dimensions)
+        # [..., 0] is the policy count, [..., 1:] the MEASURES sums
+        self.sums = np.zeros(self.shape + (1 + len(MEASURES),))
+        # int32 counts (at most 2**31 - 1 policies per cell and bin) halve the cube
+        self.histograms = {name: np.zeros(self.shape + (len(e) - 1,), dtype=np.int32) for name, e in self.edges.items()}
+
+    @property
+    def n_cells(self) -> int:
+        return int(np.prod(self.shape))
+
+    def _cells(self, columns: dict, rows) -> np.ndarray:
+        """Flat cell index per row; UNKNOWN_CODE goes to the trailing slot, other bad codes raise ValueError."""
+        codes = []
+        for dim, size in zip(self.dimensions, self.shape):
+            dim_codes = np.asarray(columns[dim])[rows].astype(np.intp)
+            codes.append(np.where(dim_codes == UNKNOWN_CODE, size - 1, dim_codes))
+        return np.ravel_multi_index(codes, self.shape)
+
+    def add(self, columns: dict, rows=slice(None), sign: int = 1) -> None:
+        """
+        Adds (sign=1) or removes (sign=-1) priced policies. `columns` maps every dimension to
+        factor_tables codes and every measure to values (e.g. IncrementalPricer inputs + nodes,
+        or a priced PolicyBook's columns); `rows` selects the policies.
+        """
+        cells = self._cells(columns, rows)
+        flat_sums = self.sums.reshape(self.n_cells, -1)
+        flat_sums[:, 0] += sign * np.bincount(cells, minlength=self.n_cells)
+        for i, measure in enumerate(MEASURES, start=1):
+            flat_sums[:, i] += sign * np.bincount(cells, weights=np.asarray(columns[measure])[rows], minlength=self.n_cells)
+        for name, edges in self.edges.items():
+            n_bins = len(edges) - 1
+            bins = np.clip(np.searchsorted(edges, np.asarray(columns[name])[rows], side="right") - 1, 0, n_bins - 1)
+            flat = self.histograms[name].reshape(self.n_cells, n_bins)
+            flat += sign * np.bincount(cells * n_bins + bins, minlength=self.n_cells * n_bins).reshape(flat.shape)
+
+    def remove(self, columns: dict, rows=slice(None)) -> None:
+        self.add(columns, rows, sign=-1)
+
+    def clear(self) -> None:
+        self.sums[...] = 0.0
+        for histogram in self.histograms.values():
+            histogram[...] = 0
+
+    def reprice(self, pricer, rows=None, inputs: dict = None, params: dict = None, unknown_report: dict = None,
+                tables: dict = None) -> dict:
+        """
+        Runs IncrementalPricer.update() and keeps the rollup in step: the updated rows are taken
+        out of their old cells before the update and added to their new cells after it. A
+        parameter or factor table change reprices every policy, so the rollup is rebuilt from
+        the pricer. Returns the pricer's premium diff.
+        """
+        params = params or {}
+        if tables or any(value != pricer.params.get(name) for name, value in params.items()):
+            diff = pricer.update(rows, inputs, params, unknown_report, tables)
+            self.params = dict(pricer.params)
+            self.clear()
+            self.add(_pricer_columns(pricer))
+            return diff
+        rows = np.arange(pricer.n) if rows is None else np.asarray(rows, dtype=np.int64).reshape(-1)
+        self.remove(_pricer_columns(pricer), rows)
+        diff = pricer.update(rows, inputs, params, unknown_report)
+        self.add(_pricer_columns(pricer), rows)
+        return diff
+
+    def _label_codes(self, dim: str, labels) -> list:
+        labels = [labels] if isinstance(labels, str) or labels is None else labels
+        vocab = VOCABULARIES[dim]
+        return [len(vocab) if label in (None, UNKNOWN_LABEL) else vocab.index[label] for label in labels]
+
+    def group_labels(self, dim: str) -> tuple:
+        """Labels of a dimension's axis, with UNKNOWN_LABEL for the trailing slot."""
+        return VOCABULARIES[dim].labels + (UNKNOWN_LABEL,)
+
+    @instrumented()
+    def query(self, filters: dict = None, by=()) -> dict:
+        r"""
+        Aggregates over the cells matching `filters` (dimension -> label or list of labels),
+        grouped by the dimensions in `by` (all cells summed when empty). Returns arrays over the
+        groups: "groups" (label tuples), "count", sum_<measure>, mean_<measure>, "loss_ratio"
+        $= \sum E[Loss] / 12 / \sum P_{monthly}$ and "histograms" {name: (groups, bins)}, plus
+        the histogram "edges". Groups without policies are dropped.
+        """
+        filters, by = filters or {}, tuple(by)
+        unknown = [dim for dim in list(filters) + list(by) if dim not in self.dimensions]
+        if unknown:
+            raise KeyError(f"Not a rollup dimension: {unknown}")
+        sums, histograms = self.sums, dict(self.histograms)
+        axis_labels = {dim: self.group_labels(dim) for dim in self.dimensions}
+        for axis, dim in enumerate(self.dimensions):
+            if dim in filters:
+                codes = self._label_codes(dim, filters[dim])
+                sums = np.take(sums, codes, axis=axis)
+                histograms = {name: np.take(h, codes, axis=axis) for name, h in histograms.items()}
+                axis_labels[dim] = tuple(axis_labels[dim][code] for code in codes)
+
+        # Sum out the other dimensions, then order the group axes as in `by`
+        kept = [self.dimensions.index(dim) for dim in by]
+        summed = tuple(axis for axis in range(len(self.dimensions)) if axis not in kept)
+        perm = [sorted(kept).index(axis) for axis in kept]
+
+        def reduce(values: np.ndarray) -> np.ndarray:
+            values = values.sum(axis=summed)
+            values = values.transpose(perm + list(range(len(kept), values.ndim)))
+            return values.reshape((-1,) + values.shape[len(kept):])
+
+        totals = reduce(sums)
+        hists = {name: reduce(h) for name, h in histograms.items()}
+        groups = list(itertools.product(*(axis_labels[dim] for dim in by)))
+        present = totals[:, 0] > 0 if by else np.ones(1, dtype=bool)
+        totals = totals[present]
+        count = totals[:, 0]
+        result = {"groups": [g for g, p in zip(groups, present) if p], "count": count}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i, measure in enumerate(MEASURES, start=1):
+                result[f"sum_{measure}"] = totals[:, i]
+                result[f"mean_{measure}"] = totals[:, i] / count
+            result["loss_ratio"] = totals[:, 1 + MEASURES.index("e_loss")] / 12.0 / totals[:, 1 + MEASURES.index("p_monthly")]
+        result["histograms"] = {name: h[present] for name, h in hists.items()}
+        result["edges"] = self.edges
+        return result
+
+
+def _pricer_columns(pricer) -> dict:
+    return {**pricer.inputs, **pricer.nodes}
+
+
+@instrumented()
+def build_rollup(df, params: dict = None, dimensions=DEFAULT_DIMENSIONS, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 unknown_report: dict = None, tables: dict = None) -> BookRollup:
+    """
+    Prices a book (any column mapping holding PORTFOLIO_COLUMNS, labels or codes; scenario
+    columns default to "Neutral") in chunks of `chunk_rows` and aggregates it into a BookRollup.
+    `tables` replaces the built-in factor tables (see batch_pricing.price_portfolio).
+    """
+    missing = [column for column in PORTFOLIO_COLUMNS if column not in df]
+    if missing:
+        raise KeyError(f"Portfolio is missing required columns: {missing}")
+    params = default_parameters() if params is None else params
+    rollup = BookRollup(dimensions, params)
+    n = len(df["occupation"])
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        chunk = {}
+        for column in PORTFOLIO_COLUMNS + list(SCENARIO_COLUMNS):
+            values = np.asarray(df[column])[start:stop] if column in df else np.full(stop - start, "Neutral")
+            chunk[column] = encode_column(column, values, unknown_report) if column in VOCABULARIES else values
+        chunk.update(price_portfolio(chunk, tables=tables, **portfolio_kwargs(params)))
+        rollup.add(chunk)
+    return rollup
+
+
+def save_rollup(rollup: BookRollup, path: str) -> None:
+    """
+    Writes the cube as .npy arrays plus meta.json and publishes it with
+    storage.replace_directory, so a concurrent load sees either the old or the new rollup in full.
+    """
+    staging = staging_directory(path)
+    np.save(os.path.join(staging, "sums.npy"), rollup.sums)
+    for name, histogram in rollup.histograms.items():
+        np.save(os.path.join(staging, f"histogram_{name}.npy"), histogram)
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"format": ROLLUP_FORMAT_VERSION, "dimensions": rollup.dimensions, "measures": MEASURES,
+                   "params": rollup.params, "edges": {name: e.tolist() for name, e in rollup.edges.items()},
+                   "labels": {dim: list(VOCABULARIES[dim].labels) for dim in rollup.dimensions}}, f, indent=2)
+    replace_directory(staging, path)
+
+
+def load_rollup(path: str) -> BookRollup:
+    """
+    Loads a saved rollup into memory (it is updated in place, so it is not memory-mapped).
+    Raises ValueError if it was written with another format, measures or vocabularies.
+    """
+    path = resolve_directory(path)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != ROLLUP_FORMAT_VERSION or tuple(meta["measures"]) != MEASURES:
+        raise ValueError(f"Unsupported rollup format: {meta.get('format')}")
+    if meta["labels"] != {dim: list(VOCABULARIES[dim].labels) for dim in meta["dimensions"]}:
+        raise ValueError("Rollup was written with different category vocabularies")
+    rollup = BookRollup(meta["dimensions"], meta["params"], {name: np.array(e) for name, e in meta["edges"].items()})
+    rollup.sums[...] = np.load(os.path.join(path, "sums.npy"))
+    for name, histogram in rollup.histograms.items():
+        histogram[...] = np.load(os.path.join(path, f"histogram_{name}.npy"))
+    return rollup
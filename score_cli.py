@@ -0,0 +1,274 @@
+"""
+Streaming batch scoring of a policyholder extract.
+
+    python score_cli.py extract.csv scored.csv --chunksize 200000
+    python score_cli.py extract.parquet scored.parquet --param LAMBDA=2.0 --rejects rejects.csv
+
+The extract is read chunk by chunk (CSV via pandas, Parquet via pyarrow), each chunk is validated,
+priced with batch_pricing.price_portfolio and appended to the output, so memory stays constant
+regardless of file size. Columns are matched to the inputs of the "Calculate AI-Q Score" branch
+of app.py either by their snake_case name or by the app.py widget label; use --map to rename others.
+The whole run prices with the model_registry snapshot active when it starts, and every scored
+row carries its model_version and the parameter_version it was priced with (which differs from
+model_version when --param overrides are given).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from batch_pricing import PORTFOLIO_OUTPUTS, price_portfolio
+from factor_tables import UNKNOWN_CODE, encode_column
+from model_registry import current_snapshot
+from pricing import CATEGORICAL_FIELDS, NUMERIC_FIELDS, VALID_RANGES
+
+# Accepted source column names for each pricing input, in lookup order.
+COLUMN_ALIASES = {
+    "occupation": ["occupation", "Current Occupation"],
+    "education_level": ["education_level", "Highest Education Level"],
+    "education_field": ["education_field", "Education Field"],
+    "school_tier": ["school_tier", "School Tier"],
+    "company_type": ["company_type", "Company Type"],
+    "economic_climate": ["economic_climate", "Economic Climate"],
+    "ai_innovation_pace": ["ai_innovation_pace", "AI Innovation Pace"],
+    "years_experience": ["years_experience", "Years of Experience"],
+    "general_skill_progress": ["general_skill_progress", "General Skill Progress (0-100%)"],
+    "firm_specific_skill_progress": ["firm_specific_skill_progress", "Firm-Specific Skill Progress (0-100%)"],
+    "annual_salary": ["annual_salary", "Annual Salary ($)"],
+    "coverage_duration": ["coverage_duration", "Coverage Duration (Months)"],
+    "coverage_percentage": ["coverage_percentage", "Coverage Percentage (%)"],
+}
+# Skill progress is entered in percent in app.py and divided by 100 before pricing.
+PERCENT_LABELS = {"General Skill Progress (0-100%)", "Firm-Specific Skill Progress (0-100%)"}
+STAGES = ("read", "validate", "price", "write")
+
+
+def resolve_columns(available, overrides: dict) -> dict:
+    """Maps each pricing input to a source column name (or None when absent)."""
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        candidates = [overrides[field]] if field in overrides else aliases
+        mapping[field] = next((name for name in candidates if name in available), None)
+    return mapping
+
+
+def read_chunks(path: str, chunksize: int):
+    """Yields DataFrame chunks of a CSV or Parquet file."""
+    if path.endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet requires pyarrow (pip install pyarrow).")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Appends DataFrames to a CSV or Parquet file, writing the header/schema once."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith((".parquet", ".pq"))
+        self._writer = None
+        self._started = False
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            frame.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def prepare_chunk(chunk: pd.DataFrame, mapping: dict, defaults: dict, rejected: dict):
+    """
+    Builds pricing columns for a chunk and drops invalid rows.
+    Returns (columns, valid_mask); reasons for rejection are tallied into `rejected`.
+    """
+    n = len(chunk)
+    valid = np.ones(n, dtype=bool)
+    columns = {}
+
+    def reject(mask, reason):
+        fresh = mask & valid
+        count = int(fresh.sum())
+        if count:
+            rejected[reason] = rejected.get(reason, 0) + count
+            valid[fresh] = False
+
+    for field in CATEGORICAL_FIELDS:
+        source = mapping[field]
+        if source is None:
+            values = np.full(n, defaults[field], dtype=object)
+        else:
+            values = chunk[source].astype(object).to_numpy()
+            reject(pd.isna(values), f"missing {field}")
+        codes = encode_column(field, np.where(pd.isna(values), "", values))
+        reject(codes == UNKNOWN_CODE, f"unknown {field}")
+        columns[field] = codes
+
+    for field in NUMERIC_FIELDS:
+        source = mapping[field]
+        if source is None:
+            values = np.full(n, defaults[field], dtype=np.float64)
+        else:
+            values = pd.to_numeric(chunk[source], errors="coerce").to_numpy(dtype=np.float64)
+            if source in PERCENT_LABELS:
+                values = values / 100.0
+            reject(np.isnan(values), f"invalid {field}")
+        low, high = VALID_RANGES[field]
+        out_of_range = np.zeros(n, dtype=bool)
+        if low is not None:
+            out_of_range |= values < low
+        if high is not None:
+            out_of_range |= values > high
+        reject(out_of_range, f"out-of-range {field}")
+        columns[field] = values
+
+    return {field: values[valid] for field, values in columns.items()}, valid
+
+
+def score_file(input_path: str, output_path: str, chunksize: int = 100_000, params: dict = None,
+               column_overrides: dict = None, defaults: dict = None, rejects_path: str = None, snapshot=None) -> dict:
+    """
+    Scores `input_path` into `output_path` chunk by chunk and returns a run report. `params`
+    overrides the parameters of `snapshot` (default: model_registry.current_snapshot()).
+    """
+    snapshot = current_snapshot() if snapshot is None else snapshot
+    params = snapshot.resolve(params)
+    parameter_version = snapshot.parameter_version(params)
+    pricing_kwargs = snapshot.pricing_kwargs(params)
+    defaults = dict({"economic_climate": "Neutral", "ai_innovation_pace": "Neutral"}, **(defaults or {}))
+    timings = dict.fromkeys(STAGES, 0.0)
+    rejected = {}
+    rows_in = rows_out = 0
+    writer, reject_writer = ChunkWriter(output_path), ChunkWriter(rejects_path) if rejects_path else None
+    mapping = None
+    start = time.perf_counter()
+    try:
+        chunks = read_chunks(input_path, chunksize)
+        while True:
+            t0 = time.perf_counter()
+            chunk = next(chunks, None)
+            timings["read"] += time.perf_counter() - t0
+            if chunk is None:
+                break
+            if mapping is None:
+                mapping = resolve_columns(chunk.columns, column_overrides or {})
+                absent = [f for f, src in mapping.items() if src is None and f not in defaults]
+                if absent:
+                    raise SystemExit(f"Input has no column for {absent}; use --map or --default.")
+            rows_in += len(chunk)
+
+            t0 = time.perf_counter()
+            columns, valid = prepare_chunk(chunk, mapping, defaults, rejected)
+            timings["validate"] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            results = price_portfolio(columns, **pricing_kwargs) if valid.any() else {}
+            timings["price"] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            if valid.any():
+                scored = chunk.loc[valid].reset_index(drop=True)
+                for name in PORTFOLIO_OUTPUTS:
+                    scored[name] = results[name]
+                scored["model_version"] = snapshot.version
+                scored["parameter_version"] = parameter_version
+                writer.write(scored)
+                rows_out += len(scored)
+            if reject_writer is not None and not valid.all():
+                reject_writer.write(chunk.loc[~valid])
+            timings["write"] += time.perf_counter() - t0
+    finally:
+        writer.close()
+        if reject_writer is not None:
+            reject_writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "input": input_path, "output": output_path,
+        "rows_in": rows_in, "rows_scored": rows_out, "rows_rejected": rows_in - rows_out,
+        "rejected_by_reason": rejected,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": rows_in / elapsed if elapsed > 0 else 0.0,
+        "stage_seconds": timings,
+        "model_version": snapshot.version, "parameter_version": parameter_version, "params": params,
+    }
+
+
+def _key_value(item: str) -> tuple:
+    """argparse type of the NAME=VALUE options."""
+    key, sep, value = item.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got '{item}'")
+    return key, value
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet policyholder extract with the AI risk premium model.")
+    parser.add_argument("input", help="Input extract (.csv or .parquet)")
+    parser.add_argument("output", help="Scored output (.csv or .parquet)")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk (default 100000)")
+    parser.add_argument("--map", action="append", type=_key_value, metavar="FIELD=COLUMN",
+                        help="Source column for a pricing input")
+    parser.add_argument("--default", action="append", type=_key_value, metavar="FIELD=VALUE",
+                        help="Value for an input missing from the extract")
+    parser.add_argument("--param", action="append", type=_key_value, metavar="NAME=VALUE",
+                        help="Override an actuarial parameter")
+    parser.add_argument("--rejects", help="Optional file receiving rejected rows")
+    parser.add_argument("--report", help="Optional JSON file receiving the run report")
+    args = parser.parse_args(argv)
+
+    overrides, defaults = dict(args.map or []), dict(args.default or [])
+    for option, fields in (("--map", overrides), ("--default", defaults)):
+        unknown = sorted(set(fields) - set(COLUMN_ALIASES))
+        if unknown:
+            parser.error(f"{option}: unknown fields {unknown}; expected one of {list(COLUMN_ALIASES)}")
+    for field in NUMERIC_FIELDS:
+        if field in defaults:
+            try:
+                defaults[field] = float(defaults[field])
+            except ValueError:
+                parser.error(f"--default {field}: expected a number, got '{defaults[field]}'")
+    # Overrides are checked against the snapshot up front, so a bad value is a usage error
+    snapshot = current_snapshot()
+    params = dict(args.param or [])
+    try:
+        snapshot.resolve(params)
+    except (KeyError, TypeError, ValueError) as e:
+        parser.error(f"--param: {e.args[0] if e.args else e}")
+    if os.path.abspath(args.input) == os.path.abspath(args.output):
+        raise SystemExit("Output must differ from input.")
+
+    report = score_file(args.input, args.output, args.chunksize, params, overrides, defaults,
+                        args.rejects, snapshot)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    print(f"Scored {report['rows_scored']:,} of {report['rows_in']:,} rows "
+          f"in {report['elapsed_seconds']:.2f}s ({report['rows_per_second']:,.0f} rows/s)", file=sys.stderr)
+    if report["rejected_by_reason"]:
+        print(f"Rejected {report['rows_rejected']:,} rows:", file=sys.stderr)
+        for reason, count in sorted(report["rejected_by_reason"].items()):
+            print(f"  {reason}: {count:,}", file=sys.stderr)
+    for stage, seconds in report["stage_seconds"].items():
+        print(f"  {stage:<8} {seconds:8.3f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
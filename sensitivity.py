@@ -0,0 +1,84 @@
+import numpy as np
+from actuarial_params import PARAMETER_NAMES, default_parameters
+from batch_pricing import price_portfolio, portfolio_kwargs
+
+
+def _clamp_right_derivative(y: np.ndarray, dy: np.ndarray, low: float, high: float) -> np.ndarray:
+    """
+    Right derivative of min(high, max(low, y)) when y moves by dy. Strictly inside the band the
+    slope passes through, strictly outside it is 0, and on a boundary it passes through only if
+    the move points back into the band.
+    """
+    inside = (y > low) & (y < high)
+    return np.where(inside, dy,
+                    np.where(y == low, np.maximum(dy, 0.0),
+                             np.where(y == high, np.minimum(dy, 0.0), 0.0)))
+
+
+def premium_sensitivities(df, params: dict = None, unknown_report: dict = None) -> dict:
+    r"""
+    Analytic partial derivatives of P_monthly with respect to every actuarial parameter, for
+    every policy, from a single pricing pass. The chain differentiated is
+
+        F_US = 1 - (\gamma_{gen} P_{gen} + \gamma_{spec} P_{spec})
+        V_raw = FHC (w_{CR} FCR + w_{US} F_US),     V = \min(100, \max(5, 50 V_raw))
+        H = H_base (w_{econ} M_{econ} + w_{inno} I_{AI})
+        E[Loss] = (H/100 \beta_{sys}) (V/100 \beta_{ind}) L_payout
+        P_monthly = \max(E[Loss] \lambda / 12, P_{min})
+
+    The V clamps and the P_MIN floor are kinks; derivatives are right derivatives (the response
+    to a small increase of the parameter), so a policy sitting exactly on a kink gets the slope
+    of the side the increase moves it to. Masks of policies on or beyond each kink are returned.
+    TTV has zero sensitivity here because quotes use k = 0.
+    Returns {"p_monthly", "d_p_monthly": {name: array}, "portfolio": {name: d sum(P_monthly)},
+    "kinks": {...}}.
+    """
+    params = default_parameters() if params is None else params
+    r = price_portfolio(df, unknown_report=unknown_report, **portfolio_kwargs(params))
+    p_gen = np.asarray(df["general_skill_progress"], dtype=np.float64)
+    p_spec = np.asarray(df["firm_specific_skill_progress"], dtype=np.float64)
+    zeros = np.zeros_like(r["p_monthly"])
+
+    # d V_raw / d theta
+    d_v_raw = {
+        "W_CR": r["fhc"] * r["fcr"],
+        "W_US": r["fhc"] * r["fus"],
+        "GAMMA_GEN": r["fhc"] * params["W_US"] * -p_gen,
+        "GAMMA_SPEC": r["fhc"] * params["W_US"] * -p_spec,
+    }
+    y = r["v_raw"] * 50.0
+    d_v = {name: _clamp_right_derivative(y, 50.0 * d, 5.0, 100.0) for name, d in d_v_raw.items()}
+    # d H / d theta
+    d_h = {"W_ECON": r["h_base"] * r["m_econ"], "W_INNO": r["h_base"] * r["i_ai"]}
+
+    p_sys, p_ind = r["p_systemic"], r["p_individual_conditional"]
+    scale = r["l_payout"] * params["LAMBDA"] / 12.0
+    # d (E[Loss] * lambda / 12) / d theta, before the floor
+    d_z = {name: zeros for name in PARAMETER_NAMES}
+    for name, dv in d_v.items():
+        d_z[name] = p_sys * (dv / 100.0 * params["BETA_INDIVIDUAL"]) * scale
+    for name, dh in d_h.items():
+        d_z[name] = (dh / 100.0 * params["BETA_SYSTEMIC"]) * p_ind * scale
+    d_z["BETA_SYSTEMIC"] = (r["h_systematic"] / 100.0) * p_ind * scale
+    d_z["BETA_INDIVIDUAL"] = p_sys * (r["v_idiosyncratic"] / 100.0) * scale
+    d_z["LAMBDA"] = r["e_loss"] / 12.0
+
+    z = (r["e_loss"] * params["LAMBDA"]) / 12.0
+    p_min = params["P_MIN"]
+    d_p = {}
+    for name in PARAMETER_NAMES:
+        if name == "P_MIN":
+            d_p[name] = np.where(z > p_min, 0.0, 1.0)
+        else:
+            d_p[name] = np.where(z > p_min, d_z[name], np.where(z == p_min, np.maximum(d_z[name], 0.0), 0.0))
+
+    return {
+        "p_monthly": r["p_monthly"],
+        "d_p_monthly": d_p,
+        "portfolio": {name: float(values.sum()) for name, values in d_p.items()},
+        "kinks": {
+            "v_at_or_below_floor": y <= 5.0,
+            "v_at_or_above_cap": y >= 100.0,
+            "premium_at_or_below_p_min": z <= p_min,
+        },
+    }
@@ -0,0 +1,137 @@
+import numpy as np
+from batch_pricing import price_portfolio
+from factor_tables import UNKNOWN_CODE, encode_column
+
+DEFAULT_CHUNK_TRIALS = 10_000
+# Upper bound on the (triggered trials x policies) block of individual draws held at once.
+DEFAULT_MAX_CELLS = 4_000_000
+DEFAULT_LEVELS = (0.9, 0.95, 0.99, 0.995)
+
+
+class SystemicClasses:
+    """
+    Policies grouped by (occupation, P_systemic). All classes of one occupation share a single
+    uniform draw per trial, so a systemic event hits every member of the occupation together;
+    a class with a higher P_systemic (e.g. a harsher scenario) is triggered whenever a lower one is.
+    Unknown occupations (UNKNOWN_CODE) raise ValueError: sharing one draw would wrongly make
+    unrelated unknown jobs lose their income together.
+    """
+
+    def __init__(self, occupation_codes, p_systemic, p_individual_conditional, l_payout):
+        occupation_codes = np.asarray(occupation_codes)
+        unknown = int((occupation_codes == UNKNOWN_CODE).sum())
+        if unknown:
+            raise ValueError(f"{unknown} policies have unknown occupations; map or drop them before simulating.")
+        p_systemic = np.asarray(p_systemic, dtype=np.float64)
+        self.p_individual_conditional = np.ascontiguousarray(p_individual_conditional, dtype=np.float64)
+        self.l_payout = np.ascontiguousarray(l_payout, dtype=np.float64)
+
+        _, group = np.unique(occupation_codes, return_inverse=True)
+        group = group.reshape(-1)
+        self.n_groups = int(group.max()) + 1 if group.size else 0
+        keys, class_of = np.unique(np.stack([group.astype(np.float64), p_systemic]), axis=1, return_inverse=True)
+        class_of = class_of.reshape(-1)
+        self.class_group = keys[0].astype(np.intp)
+        self.class_p_systemic = keys[1]
+        order = np.argsort(class_of, kind="stable")
+        bounds = np.searchsorted(class_of[order], np.arange(len(self.class_group) + 1))
+        self.class_members = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.class_group))]
+
+    def simulate_chunk(self, rng: np.random.Generator, n_trials: int, max_cells: int = DEFAULT_MAX_CELLS) -> np.ndarray:
+        """Returns the total book loss for each of `n_trials` trials drawn from `rng`."""
+        u = rng.random((n_trials, self.n_groups))
+        losses = np.zeros(n_trials, dtype=np.float64)
+        for group, p_sys, members in zip(self.class_group, self.class_p_systemic, self.class_members):
+            hit = np.flatnonzero(u[:, group] < p_sys)
+            if hit.size == 0:
+                continue
+            block = max(1, max_cells // hit.size)
+            for start in range(0, members.size, block):
+                m = members[start:start + block]
+                claims = rng.random((hit.size, m.size)) < self.p_individual_conditional[m]
+                losses[hit] += claims @ self.l_payout[m]
+        return losses
+
+
+def chunk_rng(seed: int, chunk: int) -> np.random.Generator:
+    """Independent, reproducible generator for trial chunk `chunk` of a run seeded with `seed`."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+
+
+def check_trials(n_trials: int, chunk_trials: int = DEFAULT_CHUNK_TRIALS) -> None:
+    """Raises ValueError unless a run has at least one trial and positive chunks."""
+    if n_trials < 1:
+        raise ValueError(f"n_trials must be >= 1, got {n_trials}")
+    if chunk_trials < 1:
+        raise ValueError(f"chunk_trials must be >= 1, got {chunk_trials}")
+
+
+def chunk_sizes(n_trials: int, chunk_trials: int = DEFAULT_CHUNK_TRIALS) -> list:
+    """Splits a run into fixed-size trial chunks; the split depends only on the two arguments."""
+    return [min(chunk_trials, n_trials - start) for start in range(0, n_trials, chunk_trials)]
+
+
+def simulate_losses(classes: SystemicClasses, n_trials: int, seed: int = 0,
+                    chunk_trials: int = DEFAULT_CHUNK_TRIALS, max_cells: int = DEFAULT_MAX_CELLS) -> np.ndarray:
+    """
+    Simulates `n_trials` annual book losses in chunks. Memory is bounded by the chunk size
+    and `max_cells`, never by trials x policies. Raises ValueError for n_trials < 1.
+    """
+    check_trials(n_trials, chunk_trials)
+    return np.concatenate([np.zeros(0)] + [
+        classes.simulate_chunk(chunk_rng(seed, chunk), size, max_cells)
+        for chunk, size in enumerate(chunk_sizes(n_trials, chunk_trials))
+    ])
+
+
+def var_tvar(losses: np.ndarray, level: float):
+    """Empirical Value-at-Risk and Tail Value-at-Risk at confidence `level`."""
+    var = float(np.quantile(losses, level, method="inverted_cdf"))
+    return var, float(losses[losses >= var].mean())
+
+
+def summarize_losses(losses: np.ndarray, annual_premium: float, levels=DEFAULT_LEVELS) -> dict:
+    """VaR/TVaR of the simulated annual loss and the distribution of the loss ratio."""
+    loss_ratio = losses / annual_premium if annual_premium > 0 else np.full_like(losses, np.nan)
+    summary = {
+        "n_trials": int(losses.size),
+        "annual_premium": float(annual_premium),
+        "mean_loss": float(losses.mean()),
+        "std_loss": float(losses.std()),
+        "max_loss": float(losses.max()),
+        "loss_ratio_mean": float(loss_ratio.mean()),
+        "prob_loss_ratio_above_1": float((loss_ratio > 1.0).mean()),
+        "var": {}, "tvar": {}, "loss_ratio_quantiles": {},
+    }
+    for level in levels:
+        var, tvar = var_tvar(losses, level)
+        summary["var"][level] = var
+        summary["tvar"][level] = tvar
+        summary["loss_ratio_quantiles"][level] = float(np.quantile(loss_ratio, level, method="inverted_cdf"))
+    return summary
+
+
+def prepare_book(df, **pricing_kwargs):
+    """Prices a book with price_portfolio and returns (SystemicClasses, priced results)."""
+    priced = price_portfolio(df, **pricing_kwargs)
+    occupation_codes = encode_column("occupation", df["occupation"])
+    classes = SystemicClasses(occupation_codes, priced["p_systemic"],
+                              priced["p_individual_conditional"], priced["l_payout"])
+    return classes, priced
+
+
+def simulate_book(df, n_trials: int, seed: int = 0, chunk_trials: int = DEFAULT_CHUNK_TRIALS,
+                  max_cells: int = DEFAULT_MAX_CELLS, levels=DEFAULT_LEVELS, **pricing_kwargs) -> dict:
+    """
+    Monte Carlo loss distribution of a whole book. Each trial draws one systemic event per
+    occupation with P_systemic, then an individual loss per member of a hit occupation with
+    P_individual|systemic, paying L_payout. Premiums collected are 12 * sum(P_monthly).
+    Raises ValueError for n_trials < 1 or unknown occupations (see SystemicClasses).
+    """
+    check_trials(n_trials, chunk_trials)
+    classes, priced = prepare_book(df, **pricing_kwargs)
+    losses = simulate_losses(classes, n_trials, seed, chunk_trials, max_cells)
+    summary = summarize_losses(losses, 12.0 * float(priced["p_monthly"].sum()), levels)
+    summary["expected_loss"] = float(priced["e_loss"].sum())
+    summary["losses"] = losses
+    return summary
@@ -0,0 +1,311 @@
+"""
+Indexed catalog of learning resources and occupation -> skill recommendations.
+
+    python skill_catalog.py courses.csv --occupations occupation_skills.csv --output skill_catalog
+
+courses.csv has the columns Skill, Type, Course Name, Platform, Link, Effort Hours and Progress
+Gain; occupation_skills.csv has
+Occupation, Skill, Type, one row per recommended skill in recommendation order. Without input
+files the catalog is compiled from data/skill_data.py and data/occupation_data.py.
+
+A compiled catalog is a directory of .npy arrays plus meta.json. Labels are interned into small
+vocabularies and every course column is an integer code, so the skill/type/platform indexes are
+CSR layouts (row ids grouped by code, `offsets[c]:offsets[c + 1]` per code) and a query is a
+slice, or the narrowest slice filtered on the other code columns. load_catalog memory-maps the
+arrays, so worker processes loading the same directory share one read-only copy through the
+page cache.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import numpy as np
+from data.occupation_data import OCCUPATION_HAZARDS
+from data.skill_data import (
+    SKILL_CATEGORIES, LEARNING_RESOURCE_RECORDS, OCCUPATION_SKILL_RULES, DEFAULT_OCCUPATION_SKILLS
+)
+from storage import replace_directory, resolve_directory, staging_directory
+
+CATALOG_FORMAT_VERSION = 2
+CATALOG_COLUMNS = ("Skill", "Type", "Course Name", "Platform", "Link", "Effort Hours", "Progress Gain")
+NUMERIC_COLUMNS = {"Effort Hours": "effort_hours", "Progress Gain": "progress_gain"}
+OCCUPATION_SKILL_COLUMNS = ("Occupation", "Skill", "Type")
+DEFAULT_CATALOG_PATH = os.environ.get("AIRISK_SKILL_CATALOG")
+INDEXED_COLUMNS = {"skill": "Skill", "type": "Type", "platform": "Platform"}
+
+
+def rule_based_skills(occupation: str) -> dict:
+    """Recommended skills from the keyword rules in data/skill_data.py (first match wins)."""
+    for keywords, skills in OCCUPATION_SKILL_RULES:
+        if any(keyword in occupation for keyword in keywords):
+            return {skill_type: list(names) for skill_type, names in skills.items()}
+    return {skill_type: list(names) for skill_type, names in DEFAULT_OCCUPATION_SKILLS.items()}
+
+
+def _intern(values, labels: list, index: dict) -> np.ndarray:
+    """Codes of `values`, appending labels not seen yet to `labels`/`index`."""
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(labels)
+            labels.append(value)
+        codes[i] = code
+    return codes
+
+
+def _csr(codes: np.ndarray, n_codes: int) -> tuple:
+    """(offsets, rows): row ids grouped by code, ascending within each group."""
+    rows = np.argsort(codes, kind="stable").astype(np.int64)
+    offsets = np.zeros(n_codes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=n_codes), out=offsets[1:])
+    return offsets, rows
+
+
+def _numeric_column(values) -> np.ndarray:
+    """int64 when every value is an integer (or an integer string, as read from CSV), else float64."""
+    values = list(values)
+    if all((isinstance(v, (int, np.integer)) and not isinstance(v, bool))
+           or (isinstance(v, str) and v.strip().lstrip("+-").isdigit()) for v in values):
+        return np.array([int(v) for v in values], dtype=np.int64)
+    return np.array([float(v) for v in values], dtype=np.float64)
+
+
+def _pack_strings(values) -> tuple:
+    """UTF-8 bytes of all strings back to back, plus their start offsets."""
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class SkillCatalog:
+    """
+    Read-only course catalog with CSR indexes by skill, type and platform, and per-occupation
+    recommended skills. `arrays` holds the numeric columns and indexes (NumPy or memmap);
+    `labels` holds the small vocabularies.
+    """
+
+    def __init__(self, arrays: dict, labels: dict):
+        self.arrays = arrays
+        self.labels = labels
+        self.codes = {name: {label: i for i, label in enumerate(values)} for name, values in labels.items()}
+        self._label_arrays = {name: np.array(values, dtype=object) for name, values in labels.items()}
+        self._string_columns = {}
+        self._frame = None
+
+    @property
+    def n_courses(self) -> int:
+        return len(self.arrays["skill_codes"])
+
+    def _strings(self, column: str) -> np.ndarray:
+        """All values of a packed string column as an object array, decoded once per catalog."""
+        if column not in self._string_columns:
+            data, offsets = bytes(self.arrays[f"{column}_bytes"]), self.arrays[f"{column}_offsets"].tolist()
+            self._string_columns[column] = np.array(
+                [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])], dtype=object)
+        return self._string_columns[column]
+
+    def _columns(self, rows: np.ndarray) -> dict:
+        """CATALOG_COLUMNS of `rows`, each gathered with one vectorized lookup."""
+        return {
+            "Skill": self._label_arrays["skill"][self.arrays["skill_codes"][rows]],
+            "Type": self._label_arrays["type"][self.arrays["type_codes"][rows]],
+            "Course Name": self._strings("course_name")[rows],
+            "Platform": self._label_arrays["platform"][self.arrays["platform_codes"][rows]],
+            "Link": self._strings("link")[rows],
+            "Effort Hours": np.asarray(self.arrays["effort_hours"][rows]),
+            "Progress Gain": np.asarray(self.arrays["progress_gain"][rows]),
+        }
+
+    def _index_rows(self, name: str, label: str) -> np.ndarray:
+        code = self.codes[name].get(label)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        offsets = self.arrays[f"{name}_offsets"]
+        return self.arrays[f"{name}_rows"][offsets[code]:offsets[code + 1]]
+
+    def courses(self, skill: str = None, type: str = None, platform: str = None) -> np.ndarray:
+        """Row ids (ascending) of courses matching every given filter; all rows when none is given."""
+        filters = {name: label for name, label in (("skill", skill), ("type", type), ("platform", platform))
+                   if label is not None}
+        if not filters:
+            return np.arange(self.n_courses, dtype=np.int64)
+        if any(label not in self.codes[name] for name, label in filters.items()):
+            return np.empty(0, dtype=np.int64)
+        # Start from the narrowest index slice and check the remaining filters on its code columns
+        slices = {name: self._index_rows(name, label) for name, label in filters.items()}
+        narrowest = min(slices, key=lambda name: len(slices[name]))
+        rows = np.asarray(slices[narrowest])
+        for name, label in filters.items():
+            if name != narrowest:
+                rows = rows[self.arrays[f"{name}_codes"][rows] == self.codes[name][label]]
+        return rows
+
+    def records(self, rows) -> list:
+        """Course rows as dicts keyed by CATALOG_COLUMNS, with numbers as Python scalars."""
+        columns = self._columns(np.asarray(rows, dtype=np.int64))
+        return [dict(zip(CATALOG_COLUMNS, values))
+                for values in zip(*(columns[name].tolist() for name in CATALOG_COLUMNS))]
+
+    def frame(self, rows):
+        """
+        Course rows as a DataFrame indexed by row id, keeping the stored numeric dtypes. The frame
+        of the whole catalog is built once, column by column, and each query takes its rows from it.
+        """
+        if self._frame is None:
+            import pandas as pd
+            self._frame = pd.DataFrame(self._columns(np.arange(self.n_courses)), columns=list(CATALOG_COLUMNS))
+        return self._frame.take(np.asarray(rows, dtype=np.int64))
+
+    def skills_for_occupation(self, occupation: str):
+        """{type: [skills]} recommended for `occupation`, or None if the catalog does not list it."""
+        code = self.codes["occupation"].get(occupation)
+        if code is None:
+            return None
+        offsets = self.arrays["occupation_offsets"]
+        start, end = offsets[code], offsets[code + 1]
+        skills = {}
+        for skill, skill_type in zip(self.arrays["occupation_skill_codes"][start:end],
+                                     self.arrays["occupation_type_codes"][start:end]):
+            skills.setdefault(self.labels["type"][skill_type], []).append(self.labels["skill"][skill])
+        return skills
+
+    def recommend(self, occupation: str, skill_type: str = None, platform: str = None) -> np.ndarray:
+        """
+        Row ids of courses teaching the skills recommended for `occupation`, in recommendation
+        order, optionally restricted to one skill type and platform.
+        """
+        skills = self.skills_for_occupation(occupation)
+        if skills is None:
+            skills = rule_based_skills(occupation)
+        rows = [self.courses(skill=skill, platform=platform)
+                for kind, names in skills.items() if skill_type in (None, kind) for skill in names]
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+
+def build_catalog(courses: list, occupation_skills: list) -> SkillCatalog:
+    """
+    Compiles course dicts (CATALOG_COLUMNS) and (occupation, skill, type) rows into a catalog.
+    Occupation rows keep their order, which is the order skills are recommended in.
+    """
+    labels = {"skill": [], "type": [], "platform": [], "occupation": []}
+    index = {name: {} for name in labels}
+    # Seed the skill/type vocabularies so SKILL_CATEGORIES keep stable codes across catalogs
+    _intern(list(SKILL_CATEGORIES), labels["skill"], index["skill"])
+    _intern(list(SKILL_CATEGORIES.values()), labels["type"], index["type"])
+
+    arrays = {
+        "skill_codes": _intern([c["Skill"] for c in courses], labels["skill"], index["skill"]),
+        "type_codes": _intern([c["Type"] for c in courses], labels["type"], index["type"]),
+        "platform_codes": _intern([c["Platform"] for c in courses], labels["platform"], index["platform"]),
+    }
+    for column, key in (("Course Name", "course_name"), ("Link", "link")):
+        arrays[f"{key}_bytes"], arrays[f"{key}_offsets"] = _pack_strings(c[column] for c in courses)
+    for column, key in NUMERIC_COLUMNS.items():
+        arrays[key] = _numeric_column(c[column] for c in courses)
+
+    occupation_codes = _intern([o for o, _, _ in occupation_skills], labels["occupation"], index["occupation"])
+    skill_codes = _intern([s for _, s, _ in occupation_skills], labels["skill"], index["skill"])
+    type_codes = _intern([t for _, _, t in occupation_skills], labels["type"], index["type"])
+    offsets, order = _csr(occupation_codes, len(labels["occupation"]))
+    arrays["occupation_offsets"] = offsets
+    arrays["occupation_skill_codes"] = skill_codes[order]
+    arrays["occupation_type_codes"] = type_codes[order]
+
+    for name, column in INDEXED_COLUMNS.items():
+        arrays[f"{name}_offsets"], arrays[f"{name}_rows"] = _csr(arrays[f"{name}_codes"], len(labels[name]))
+    return SkillCatalog(arrays, labels)
+
+
+def default_catalog() -> SkillCatalog:
+    """The catalog described by data/: LEARNING_RESOURCE_RECORDS and the occupation skill rules."""
+    occupation_skills = [(occupation, skill, skill_type)
+                         for occupation in OCCUPATION_HAZARDS
+                         for skill_type, skills in rule_based_skills(occupation).items()
+                         for skill in skills]
+    return build_catalog(LEARNING_RESOURCE_RECORDS, occupation_skills)
+
+
+def read_catalog_files(courses_path: str, occupations_path: str = None) -> SkillCatalog:
+    """Builds a catalog from a course CSV and an optional occupation-skill CSV."""
+    with open(courses_path, newline="", encoding="utf-8") as f:
+        courses = list(csv.DictReader(f))
+    missing = [c for c in CATALOG_COLUMNS if courses and c not in courses[0]]
+    if missing:
+        raise KeyError(f"{courses_path} is missing columns: {missing}")
+    occupation_skills = []
+    if occupations_path:
+        with open(occupations_path, newline="", encoding="utf-8") as f:
+            occupation_skills = [tuple(row[c] for c in OCCUPATION_SKILL_COLUMNS) for row in csv.DictReader(f)]
+    return build_catalog(courses, occupation_skills)
+
+
+def save_catalog(catalog: SkillCatalog, path: str) -> None:
+    """
+    Writes the catalog as .npy arrays plus meta.json and publishes it with
+    storage.replace_directory, so a concurrent load sees either the old or the new catalog in full.
+    """
+    staging = staging_directory(path)
+    for name, values in catalog.arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), np.asarray(values))
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"format": CATALOG_FORMAT_VERSION, "arrays": sorted(catalog.arrays),
+                   "labels": catalog.labels}, f)
+    replace_directory(staging, path)
+
+
+def load_catalog(path: str):
+    """Memory-maps a saved catalog. Returns None when it is missing or in another format version."""
+    path = resolve_directory(path)
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != CATALOG_FORMAT_VERSION:
+        return None
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in meta["arrays"]}
+    return SkillCatalog(arrays, meta["labels"])
+
+
+_CATALOG = {}
+
+
+def get_catalog(path: str = None) -> SkillCatalog:
+    """
+    Process-wide catalog: the compiled one at `path` (or $AIRISK_SKILL_CATALOG) when it loads,
+    otherwise the default catalog built from data/. Loaded once per process and path. When
+    `path` does not exist yet, the default catalog is compiled there first, so the first
+    worker on a host builds it and the others only map it.
+    """
+    path = DEFAULT_CATALOG_PATH if path is None else path
+    if path not in _CATALOG:
+        catalog = load_catalog(path) if path else None
+        if catalog is None and path and not os.path.exists(path):
+            try:
+                save_catalog(default_catalog(), path)
+            except OSError:
+                pass  # another process won the race to write it
+            catalog = load_catalog(path)
+        _CATALOG[path] = default_catalog() if catalog is None else catalog
+    return _CATALOG[path]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compile a learning-resource catalog into indexed arrays.")
+    parser.add_argument("courses", nargs="?", help="Course CSV with the CATALOG_COLUMNS")
+    parser.add_argument("--occupations", help="Occupation skill CSV (Occupation, Skill, Type)")
+    parser.add_argument("--output", required=True, help="Directory to write the compiled catalog to")
+    args = parser.parse_args(argv)
+
+    catalog = read_catalog_files(args.courses, args.occupations) if args.courses else default_catalog()
+    save_catalog(catalog, args.output)
+    print(f"Wrote {catalog.n_courses} courses, {len(catalog.labels['skill'])} skills and "
+          f"{len(catalog.labels['occupation'])} occupations to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Publication of directories of .npy arrays (premium cubes, skill catalogs, policy books, rollups,
+model stores) that other processes memory-map while they are being replaced.
+
+A saved `path` is a symlink to a sibling version directory (.<name>.v-XXXXXXXX). A writer fills a
+staging directory from staging_directory(path) and calls replace_directory(staging, path), which
+renames it to a new version directory and renames a new symlink over `path`. Both renames are
+atomic, so `path` always exists and always names one complete version. Readers call
+resolve_directory(path) once and open every file below the directory it returns, so a load never
+mixes two versions. The previous version is kept for readers that resolved it just before the
+swap; older ones are removed (processes that already mapped their files keep the pages).
+"""
+import os
+import shutil
+import tempfile
+
+STAGING_TAG = "staging"
+VERSION_TAG = "v"
+
+
+def _prefix(path: str, tag: str) -> str:
+    return f".{os.path.basename(os.path.abspath(path))}.{tag}-"
+
+
+def staging_directory(path: str) -> str:
+    """A new empty directory next to `path` for the next version of it."""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=_prefix(path, STAGING_TAG), dir=parent)
+
+
+def replace_directory(staging: str, path: str) -> None:
+    """
+    Publishes a filled `staging` directory as `path` (see the module docstring). A plain
+    directory left at `path` by an older release is moved aside first; only that one-time
+    migration leaves a moment in which `path` is missing.
+    """
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    prefix = _prefix(path, VERSION_TAG)
+    version = tempfile.mkdtemp(prefix=prefix, dir=parent)
+    os.replace(staging, version)
+    previous = None
+    if os.path.islink(path):
+        previous = os.path.basename(os.readlink(path))
+    elif os.path.isdir(path):
+        previous = os.path.basename(tempfile.mkdtemp(prefix=prefix, dir=parent))
+        os.replace(path, os.path.join(parent, previous))
+    link = version + ".link"
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, path)
+
+    keep = {os.path.basename(version), previous, os.path.basename(os.readlink(path))}
+    for entry in os.listdir(parent):
+        full = os.path.join(parent, entry)
+        if entry.startswith(prefix) and entry not in keep and not os.path.islink(full):
+            shutil.rmtree(full, ignore_errors=True)
+
+
+def resolve_directory(path: str) -> str:
+    """The version directory `path` currently names; load every file of one read below it."""
+    return os.path.realpath(path)
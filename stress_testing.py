@@ -0,0 +1,151 @@
+import numpy as np
+from actuarial_params import default_parameters
+from batch_pricing import PORTFOLIO_COLUMNS, SCENARIO_COLUMNS, price_portfolio, portfolio_kwargs
+from factor_tables import FACTOR_TABLES
+from data.environmental_data import (
+    ECONOMIC_CLIMATE_SCENARIOS, AI_INNOVATION_SCENARIOS, ECONOMIC_CLIMATE_TRANSITIONS,
+    AI_INNOVATION_TRANSITIONS, PAIRED_AI_INNOVATION
+)
+from simulation import chunk_rng, chunk_sizes
+
+DEFAULT_CHUNK_PATHS = 2_000
+DEFAULT_CHUNK_ROWS = 1_000_000
+DEFAULT_FAN_LEVELS = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_CORRELATION = 0.5
+
+# Joint macro regimes: state = econ_index * len(AI_INNOVATION_SCENARIOS) + inno_index.
+ECONOMIC_REGIMES = tuple(ECONOMIC_CLIMATE_SCENARIOS)
+AI_INNOVATION_REGIMES = tuple(AI_INNOVATION_SCENARIOS)
+JOINT_REGIMES = tuple((econ, inno) for econ in ECONOMIC_REGIMES for inno in AI_INNOVATION_REGIMES)
+
+
+def regime_state(economic_climate: str, ai_innovation_pace: str) -> int:
+    """Joint regime index of a (economic climate, AI innovation pace) pair."""
+    return JOINT_REGIMES.index((economic_climate, ai_innovation_pace))
+
+
+def joint_transition_matrix(correlation: float = DEFAULT_CORRELATION,
+                            econ_transitions: dict = None, inno_transitions: dict = None) -> np.ndarray:
+    r"""
+    Monthly transition matrix over JOINT_REGIMES. The economic regime follows its own chain;
+    the AI innovation regime follows its chain with probability 1 - \rho and otherwise jumps to
+    the regime paired with the new economic regime (PAIRED_AI_INNOVATION):
+    $P[(e, i) \to (e', i')] = P_{econ}[e, e'] ((1 - \rho) P_{inno}[i, i'] + \rho 1[i' = pair(e')])$
+    """
+    if not 0.0 <= correlation <= 1.0:
+        raise ValueError("correlation must lie in [0, 1]")
+    econ_transitions = ECONOMIC_CLIMATE_TRANSITIONS if econ_transitions is None else econ_transitions
+    inno_transitions = AI_INNOVATION_TRANSITIONS if inno_transitions is None else inno_transitions
+    econ = np.array([[econ_transitions[a][b] for b in ECONOMIC_REGIMES] for a in ECONOMIC_REGIMES])
+    inno = np.array([[inno_transitions[a][b] for b in AI_INNOVATION_REGIMES] for a in AI_INNOVATION_REGIMES])
+    paired = np.array([[float(PAIRED_AI_INNOVATION[e] == i) for i in AI_INNOVATION_REGIMES] for e in ECONOMIC_REGIMES])
+    # [e, i, e', i']
+    joint = econ[:, None, :, None] * ((1 - correlation) * inno[None, :, None, :] + correlation * paired[None, None, :, :])
+    joint = joint.reshape(len(JOINT_REGIMES), len(JOINT_REGIMES))
+    if not np.allclose(joint.sum(axis=1), 1.0):
+        raise ValueError("Transition rows must each sum to 1")
+    return joint
+
+
+def simulate_regime_paths(n_paths: int, n_months: int, seed: int = 0, transitions: np.ndarray = None,
+                          initial_state: int = 0, chunk_paths: int = DEFAULT_CHUNK_PATHS) -> np.ndarray:
+    """
+    (n_paths, n_months) int8 joint regime states; month 0 is `initial_state`. Paths are drawn in
+    fixed-size chunks with independent generators, so a path depends only on its index and `seed`.
+    """
+    transitions = joint_transition_matrix() if transitions is None else np.asarray(transitions)
+    cdf = np.cumsum(transitions, axis=1)
+    cdf[:, -1] = 1.0
+    paths = np.empty((n_paths, n_months), dtype=np.int8)
+    start = 0
+    for chunk, size in enumerate(chunk_sizes(n_paths, chunk_paths)):
+        u = chunk_rng(seed, chunk).random((size, max(n_months - 1, 0)))
+        block = paths[start:start + size]
+        if n_months:
+            block[:, 0] = initial_state
+        for t in range(1, n_months):
+            block[:, t] = (u[:, t - 1, None] >= cdf[block[:, t - 1]]).sum(axis=1)
+        start += size
+    return paths
+
+
+def _book_slice(df, start: int, stop: int) -> dict:
+    # Rows are sliced before conversion so a chunk never materialises the whole column
+    columns = {}
+    for column in PORTFOLIO_COLUMNS + [c for c in SCENARIO_COLUMNS if c in df]:
+        values = df[column]
+        columns[column] = np.asarray(values.iloc[start:stop] if hasattr(values, "iloc") else values[start:stop])
+    return columns
+
+
+def regime_book_totals(df, params: dict = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                       unknown_report: dict = None, tables: dict = None) -> dict:
+    """
+    Book totals for the stress test: {"premium": sum P_monthly, "expected_loss": sum E[Loss],
+    "mean_p_claim": mean P_claim}. The premium is what the book charges, priced once from its own
+    scenario columns ("Neutral" where absent); expected_loss and mean_p_claim are arrays over
+    JOINT_REGIMES, re-evaluating H_i and P_claim per policy with the regime applied to the whole
+    book. Rows are processed in chunks of `chunk_rows`. `tables` replaces the built-in factor
+    tables (see batch_pricing.price_portfolio).
+    """
+    params = default_parameters() if params is None else params
+    tables = FACTOR_TABLES if tables is None else tables
+    n_regimes = len(JOINT_REGIMES)
+    premium, expected_loss, p_claim_sum = 0.0, np.zeros(n_regimes), np.zeros(n_regimes)
+    n = len(df["occupation"])
+    for start in range(0, n, chunk_rows):
+        # H_base, P_individual, L_payout and the charged premium do not depend on the regime;
+        # price once per chunk
+        base = price_portfolio(_book_slice(df, start, start + chunk_rows), unknown_report=unknown_report,
+                               tables=tables, **portfolio_kwargs(params))
+        premium += float(base["p_monthly"].sum())
+        for state, (econ, inno) in enumerate(JOINT_REGIMES):
+            m_econ = tables["economic_climate_modifier"].lookup(econ)
+            i_ai = tables["ai_innovation_index"].lookup(inno)
+            h_systematic = base["h_base"] * (params["W_ECON"] * m_econ + params["W_INNO"] * i_ai)
+            p_claim = ((h_systematic / 100.0) * params["BETA_SYSTEMIC"]) * base["p_individual_conditional"]
+            e_loss = p_claim * base["l_payout"]
+            expected_loss[state] += e_loss.sum()
+            p_claim_sum[state] += p_claim.sum()
+    return {"premium": premium, "expected_loss": expected_loss, "mean_p_claim": p_claim_sum / n if n else p_claim_sum}
+
+
+def evaluate_paths(paths: np.ndarray, totals: dict, levels=DEFAULT_FAN_LEVELS) -> dict:
+    """
+    Path-wise book results from regime totals. Monthly premium income is the charged sum P_monthly
+    in every month and the monthly expected loss is sum E[Loss] / 12 under that month's regime, so
+    the loss ratio matches simulation.summarize_losses. Losses are expected values given each
+    month's regime: the spread across paths is macro regime risk only, with no claim-count
+    randomness (see simulation.py for that).
+    Returns per-path arrays (n_paths, n_months) and fan quantiles {level: per-month values} of
+    the monthly and cumulative loss ratios.
+    """
+    premium = np.full(paths.shape, float(totals["premium"]))
+    loss = totals["expected_loss"][paths] / 12.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loss_ratio = loss / premium
+        cumulative_loss_ratio = np.cumsum(loss, axis=1) / np.cumsum(premium, axis=1)
+    return {
+        "premium": premium, "expected_loss": loss, "mean_p_claim": totals["mean_p_claim"][paths],
+        "loss_ratio": loss_ratio, "cumulative_loss_ratio": cumulative_loss_ratio,
+        "loss_ratio_fan": {level: np.quantile(loss_ratio, level, axis=0) for level in levels},
+        "cumulative_loss_ratio_fan": {level: np.quantile(cumulative_loss_ratio, level, axis=0) for level in levels},
+        "horizon_loss_ratio": cumulative_loss_ratio[:, -1] if paths.shape[1] else np.zeros(len(paths)),
+    }
+
+
+def stress_test(df, n_paths: int = 10_000, n_months: int = 60, seed: int = 0, params: dict = None,
+                correlation: float = DEFAULT_CORRELATION, initial_state: int = 0, levels=DEFAULT_FAN_LEVELS,
+                chunk_rows: int = DEFAULT_CHUNK_ROWS, unknown_report: dict = None, tables: dict = None) -> dict:
+    """
+    Stress test of a book over `n_paths` Markov regime-switching macro paths of `n_months`
+    (expected losses per regime, see evaluate_paths).
+    The book is priced once and its expected loss evaluated once per joint regime (chunked over
+    rows), after which every (path, month) is a table lookup, so cost does not grow with
+    paths x months x policies.
+    """
+    totals = regime_book_totals(df, params, chunk_rows, unknown_report, tables)
+    paths = simulate_regime_paths(n_paths, n_months, seed, joint_transition_matrix(correlation), initial_state)
+    result = evaluate_paths(paths, totals, levels)
+    result.update(paths=paths, regime_totals=totals)
+    return result
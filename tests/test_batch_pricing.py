@@ -0,0 +1,13 @@
+from batch_pricing import PORTFOLIO_OUTPUTS, price_portfolio
+from benchmark import make_profiles
+from pricing import price_profile
+
+
+def test_price_portfolio_matches_scalar_path():
+    profiles = [{k: v for k, v in p.items() if k not in ("user_id", "name")} for p in make_profiles(300)]
+    columns = {field: [p[field] for p in profiles] for field in profiles[0]}
+    results = price_portfolio(columns)
+    for i, profile in enumerate(profiles):
+        expected = price_profile(profile)
+        for name in PORTFOLIO_OUTPUTS:
+            assert results[name][i] == expected[name], (name, profile)
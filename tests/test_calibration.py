@@ -0,0 +1,120 @@
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from actuarial_params import default_parameters
+from batch_pricing import portfolio_kwargs, price_portfolio
+from benchmark import make_book, make_profiles
+from calibration import (
+    FITTABLE_PARAMETERS, SATURATED_LOGIT, _logit, _scores, fit_parameters, prepare_exposures, save_calibration,
+    tie_parameters
+)
+from model_registry import ModelRegistry, current_snapshot, load_snapshot, validate_model
+
+TRUE = tie_parameters({**default_parameters(), "BETA_INDIVIDUAL": 0.8, "W_CR": 0.3, "GAMMA_GEN": 0.6,
+                       "GAMMA_SPEC": 0.2, "W_ECON": 0.65, "BETA_SYSTEMIC": 0.3})
+START = {**default_parameters(), "BETA_SYSTEMIC": 0.3}
+
+
+def exposures(seed: int, n: int = 20_000, true: dict = TRUE) -> dict:
+    book = make_book(make_profiles(500), n, seed=seed)
+    rng = np.random.default_rng(seed)
+    book["economic_climate"] = rng.integers(0, 3, n).astype(np.int16)
+    book["ai_innovation_pace"] = rng.integers(0, 3, n).astype(np.int16)
+    book["exposure_years"] = rng.integers(1, 4, n).astype(float)
+    p_claim = price_portfolio(book, **portfolio_kwargs(true))["p_claim"]
+    book["claims"] = rng.binomial(book["exposure_years"].astype(int), p_claim).astype(float)
+    return prepare_exposures(book)
+
+
+@pytest.fixture(scope="module")
+def datasets():
+    return exposures(1), exposures(2)
+
+
+@pytest.fixture(scope="module")
+def large():
+    return exposures(2, 100_000)
+
+
+def test_concurrent_fits_do_not_share_features(datasets):
+    sequential = [fit_parameters(data, START, epochs=1) for data in datasets]
+    with ThreadPoolExecutor(2) as pool:
+        concurrent = list(pool.map(lambda data: fit_parameters(data, START, epochs=1), datasets))
+    for alone, together in zip(sequential, concurrent):
+        assert alone["parameters"] == together["parameters"]
+        assert alone["log_likelihood"] == together["log_likelihood"]
+
+
+def test_fit_that_cannot_reach_tol_is_not_converged(datasets):
+    result = fit_parameters(datasets[0], START, epochs=1, tol=-1.0, max_newton_steps=20)
+    assert not result["converged"]
+    assert result["newton_steps"] <= 20
+
+
+def test_fit_recovers_the_true_parameters(large):
+    result = fit_parameters(large, START, epochs=1)
+    assert result["converged"]
+    for name in result["free"]:
+        assert abs(result["parameters"][name] - TRUE[name]) < 3 * result["standard_errors"][name]
+
+
+def test_saturated_parameter_is_not_converged(datasets):
+    # On this sample the likelihood keeps rising as W_CR falls towards 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = fit_parameters(datasets[1], START, epochs=1)
+    assert abs(_logit(result["parameters"]["W_CR"])) > SATURATED_LOGIT
+    assert not result["converged"]
+
+
+def test_scores_match_finite_differences(datasets):
+    free = FITTABLE_PARAMETERS
+    rows = slice(0, 5_000)
+    _, gradient, _ = _scores(datasets[0], TRUE, free, rows)
+    h = 1e-6
+    for i, name in enumerate(free):
+        up, _, _ = _scores(datasets[0], tie_parameters({**TRUE, name: TRUE[name] + h}), free, rows)
+        down, _, _ = _scores(datasets[0], tie_parameters({**TRUE, name: TRUE[name] - h}), free, rows)
+        assert gradient[i] == pytest.approx((up - down) / (2 * h), rel=1e-5, abs=1e-4)
+
+
+def test_workers_do_not_change_the_fit(datasets):
+    alone = fit_parameters(datasets[0], START, epochs=1, block_rows=4_096)
+    pooled = fit_parameters(datasets[0], START, epochs=1, block_rows=4_096, workers=2)
+    assert pooled["parameters"] == alone["parameters"]
+    assert pooled["log_likelihood"] == alone["log_likelihood"]
+    assert pooled["standard_errors"] == alone["standard_errors"]
+
+
+def test_saved_calibration_loads_as_the_app_model(datasets, tmp_path, monkeypatch):
+    result = fit_parameters(datasets[0], START, epochs=1)
+    path = str(tmp_path / "calibrated.json")
+    version = save_calibration(result, path)
+    monkeypatch.delenv("AIRISK_MODEL_REGISTRY", raising=False)
+    monkeypatch.setenv("AIRISK_PARAMETER_SET", path)
+    snapshot = current_snapshot()
+    assert snapshot.version == version
+    assert dict(snapshot.params) == pytest.approx(result["parameters"], rel=0, abs=0)
+    assert snapshot.metadata["converged"] == result["converged"]
+
+
+def test_fit_keeps_general_skills_weighted_above_firm_specific(tmp_path):
+    # Data generated with firm-specific skills weighted above general ones, which the model forbids
+    data = exposures(3, true={**TRUE, "GAMMA_GEN": 0.15, "GAMMA_SPEC": 0.7})
+    result = fit_parameters(data, START, epochs=1)
+    fitted = result["parameters"]
+    assert 0.0 <= fitted["GAMMA_SPEC"] < fitted["GAMMA_GEN"] <= 1.0
+    validate_model(fitted)
+    path = str(tmp_path / "calibrated.json")
+    save_calibration(result, path)
+    assert ModelRegistry(str(tmp_path / "registry")).publish_file(path) == load_snapshot(path).version
+
+
+def test_invalid_fit_is_not_saved(datasets, tmp_path):
+    result = fit_parameters(datasets[0], START, epochs=1)
+    result["parameters"] = {**result["parameters"], "GAMMA_SPEC": 0.9, "GAMMA_GEN": 0.5}
+    path = tmp_path / "calibrated.json"
+    with pytest.raises(ValueError, match="GAMMA_SPEC < GAMMA_GEN"):
+        save_calibration(result, str(path))
+    assert not path.exists()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from downsampling import downsample_indices, lttb_indices, minmax_indices
+from history_store import RISK_HISTORY_COLUMNS
+from visualizations import extend_line_figure, plot_historical_trends
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(7)
+    x = np.arange(5_000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=x.size))
+    y[1_234], y[3_210] = 500.0, -500.0
+    return x, y
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [4, 17, 200, 4_999])
+def test_endpoints_kept_and_length_capped(series, method, max_points):
+    x, y = series
+    kept = downsample_indices(x, y, max_points, method)
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+    assert len(kept) <= max_points
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_short_series_are_returned_whole(series):
+    x, y = series
+    assert np.array_equal(downsample_indices(x[:50], y[:50], 100), np.arange(50))
+
+
+@pytest.mark.parametrize("max_points", [4, 10, 101])
+def test_minmax_keeps_the_extrema(series, max_points):
+    _, y = series
+    kept = minmax_indices(y, max_points)
+    assert y.argmax() in kept and y.argmin() in kept
+    n_buckets = (max_points - 2) // 2
+    buckets = np.arange(len(y)) * n_buckets // len(y)
+    for b in range(n_buckets):
+        members = np.flatnonzero(buckets == b)
+        assert y[members].max() in y[kept] and y[members].min() in y[kept]
+
+
+def test_lttb_rejects_too_few_points(series):
+    with pytest.raises(ValueError):
+        lttb_indices(*series, 2)
+
+
+def _history(months):
+    return pd.DataFrame({"Month": months, "Idiosyncratic Risk": np.sin(months), "Systematic Risk": np.cos(months),
+                         "Monthly Premium": months * 0.1}, columns=RISK_HISTORY_COLUMNS)
+
+
+def test_extend_line_figure_caps_series():
+    max_points = 50
+    fig = plot_historical_trends(_history(np.arange(300)), max_points=max_points)
+    assert all(len(trace.x) <= max_points for trace in fig.data)
+
+    extended = extend_line_figure(fig, _history(np.arange(300, 340)), max_points)
+    assert extended is not None
+    assert all(len(trace.x) == len(old.x) + 40 and trace.x[-1] == 339 for trace, old in zip(extended.data, fig.data))
+    room = 2 * max_points - len(extended.data[0].x)
+    assert extend_line_figure(extended, _history(np.arange(340, 340 + room)), max_points) is not None
+    assert extend_line_figure(extended, _history(np.arange(340, 341 + room)), max_points) is None
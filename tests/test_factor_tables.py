@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from factor_tables import ENCODED_UNKNOWN_LABEL, OCCUPATIONS, UNKNOWN_CODE, encode_column
+
+
+def test_labels_and_codes_encode_alike():
+    labels = list(OCCUPATIONS.labels) + ["Astronaut"]
+    report = {}
+    codes = encode_column("occupation", labels, report)
+    assert codes.tolist() == list(range(len(OCCUPATIONS))) + [UNKNOWN_CODE]
+    assert report == {"occupation": {"Astronaut": 1}}
+    assert encode_column("occupation", codes, report).tolist() == codes.tolist()
+    assert report == {"occupation": {"Astronaut": 1, ENCODED_UNKNOWN_LABEL: 1}}
+
+
+@pytest.mark.parametrize("code", [-2, len(OCCUPATIONS), 40_000])
+def test_out_of_range_codes_are_rejected(code):
+    with pytest.raises(ValueError):
+        encode_column("occupation", np.array([0, code]))
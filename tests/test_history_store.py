@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from history_store import ProgressHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProgressHistoryStore(str(tmp_path / "history.db"))
+
+
+def test_assessment_round_trips_numpy_scalars(store):
+    store.save_assessment("u1", {"years_experience": np.int64(5)}, {"LAMBDA": np.float64(1.5)}, "v1")
+    store.save_assessment("u1", {"years_experience": 6}, {"LAMBDA": 2.0}, "v2")
+    assert store.load_assessment("u1") == ({"years_experience": 6}, {"LAMBDA": 2.0}, "v2")
+    assert store.load_assessment("u2") is None
+
+
+def test_unserialisable_values_raise_type_error(store):
+    with pytest.raises(TypeError):
+        store.save_assessment("u1", {"occupation": object()}, {}, "v1")
+    assert store.load_assessment("u1") is None
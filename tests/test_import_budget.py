@@ -0,0 +1,9 @@
+import pytest
+from benchmark import CORE_MODULES, DEFAULT_IMPORT_BUDGET, probe_import
+
+
+@pytest.mark.parametrize("module", CORE_MODULES)
+def test_core_module_import_is_light(module):
+    result = probe_import(module)
+    assert result["heavy"] == [], f"{module} imports {result['heavy']}"
+    assert result["seconds"] < DEFAULT_IMPORT_BUDGET
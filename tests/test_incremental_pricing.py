@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from actuarial_params import default_parameters
+from batch_pricing import PORTFOLIO_OUTPUTS, portfolio_kwargs, price_portfolio
+from benchmark import make_book, make_profiles
+from factor_tables import FACTOR_TABLES, FactorTable
+from incremental_pricing import IncrementalPricer, downstream
+
+
+@pytest.fixture
+def book():
+    return make_book(make_profiles(50), 2_000)
+
+
+def assert_matches_full_price(pricer, book, **kwargs):
+    priced = price_portfolio(book, **kwargs)
+    for name in PORTFOLIO_OUTPUTS:
+        if name in pricer.nodes:
+            assert np.array_equal(pricer.nodes[name], priced[name]), name
+
+
+def test_update_matches_a_full_re_price(book):
+    pricer = IncrementalPricer(book)
+    p_min = default_parameters()["P_MIN"]
+    above_floor = np.flatnonzero(pricer.nodes["p_monthly"] > p_min)
+    rows = above_floor[[0, 5, 9]]
+    unchanged = above_floor[12]
+    salary = book["annual_salary"].astype(np.float64)
+    new_salary = np.append(salary[rows] * 2, salary[unchanged])
+    before = pricer.nodes["p_monthly"].copy()
+
+    diff = pricer.update(np.append(rows, unchanged), {"annual_salary": new_salary})
+    book["annual_salary"] = salary
+    book["annual_salary"][rows] *= 2
+    assert_matches_full_price(pricer, book)
+    assert np.array_equal(diff["rows"], rows)
+    assert np.array_equal(diff["old"], before[rows])
+    assert np.array_equal(diff["new"], pricer.nodes["p_monthly"][rows])
+    assert diff["recomputed"] == {"l_payout": 3, "e_loss": 3, "p_monthly": 3}
+
+
+def test_category_update_matches_a_full_re_price(book):
+    pricer = IncrementalPricer(book)
+    rows = np.array([1, 40, 1_999])
+    codes = (book["occupation"][rows] + 1) % len(FACTOR_TABLES["occupation_hazard"].vocabulary)
+    pricer.update(rows, {"occupation": codes, "years_experience": [3, 30, 12]})
+    book["occupation"] = book["occupation"].copy()
+    book["occupation"][rows] = codes
+    book["years_experience"] = book["years_experience"].copy()
+    book["years_experience"][rows] = [3, 30, 12]
+    assert_matches_full_price(pricer, book)
+
+
+def test_parameter_change_reprices_every_policy(book):
+    pricer = IncrementalPricer(book)
+    params = dict(default_parameters(), LAMBDA=2.0)
+    diff = pricer.update(params={"LAMBDA": 2.0})
+    assert diff["recomputed"] == {"p_monthly": len(pricer.nodes["p_monthly"])}
+    assert_matches_full_price(pricer, book, **portfolio_kwargs(params))
+
+
+def test_table_change_reprices_every_policy(book):
+    pricer = IncrementalPricer(book)
+    hazard = FACTOR_TABLES["occupation_hazard"]
+    tables = dict(FACTOR_TABLES, occupation_hazard=FactorTable.from_values(hazard.vocabulary, hazard.values * 1.5))
+    diff = pricer.update(tables={"occupation_hazard": tables["occupation_hazard"]})
+    n = len(pricer.nodes["p_monthly"])
+    assert set(diff["recomputed"]) == {"h_base_current", "h_base", "h_systematic", "p_systemic", "p_claim",
+                                       "e_loss", "p_monthly"}
+    assert set(diff["recomputed"].values()) == {n}
+    assert_matches_full_price(pricer, book, tables=tables)
+
+
+def test_downstream_lists_only_affected_nodes():
+    assert downstream(["annual_salary"]) == ["l_payout", "e_loss", "p_monthly"]
+    assert downstream(["W_CR"]) == ["v_raw", "v_idiosyncratic", "p_individual_conditional", "p_claim",
+                                    "e_loss", "p_monthly"]
+    assert downstream(["economic_climate"]) == ["m_econ", "h_systematic", "p_systemic", "p_claim",
+                                                "e_loss", "p_monthly"]
+    assert downstream(["LAMBDA", "P_MIN"]) == ["p_monthly"]
+    assert downstream([]) == []
@@ -0,0 +1,41 @@
+import pytest
+import instrumentation
+from batch_pricing import price_portfolio
+from benchmark import make_book, make_profiles
+from calculations import calculate_fexp
+
+
+@pytest.fixture
+def enabled():
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    if not was_enabled:
+        instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_enable_at_runtime_records_function_spans(enabled):
+    calculate_fexp(5)
+    assert instrumentation.snapshot()["spans"]["calculations.calculate_fexp"]["count"] == 1
+
+
+def test_disabled_functions_record_nothing():
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.disable()
+    instrumentation.reset()
+    try:
+        calculate_fexp(5)
+        assert instrumentation.snapshot()["spans"] == {}
+    finally:
+        if was_enabled:
+            instrumentation.enable()
+
+
+def test_price_portfolio_records_stage_spans(enabled):
+    price_portfolio(make_book(make_profiles(10), 100))
+    spans = instrumentation.snapshot()["spans"]
+    for stage in ("encode", "idiosyncratic", "systematic", "premium"):
+        assert spans[f"batch_pricing.price_portfolio.{stage}"]["count"] == 1
+    assert spans["batch_pricing.price_portfolio"]["count"] == 1
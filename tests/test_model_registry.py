@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pytest
+import model_registry
+from actuarial_params import default_parameters
+from factor_tables import FACTOR_TABLES
+from model_registry import ModelRegistry, ModelSnapshot, builtin_snapshot
+from storage import resolve_directory
+
+
+def hazards(scale: float) -> dict:
+    factors = FACTOR_TABLES["occupation_hazard"].factors()
+    return {"occupation_hazard": {label: scale * factor for label, factor in factors.items()}}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / "registry"), poll_seconds=0.0)
+
+
+def test_publish_activates_the_new_version(registry):
+    assert registry.current().version == builtin_snapshot().version
+    version = registry.publish(dict(default_parameters(), LAMBDA=2.0), hazards(1.2), {"source": "test"})
+    snapshot = registry.current()
+    assert snapshot.version == version
+    assert snapshot.params["LAMBDA"] == 2.0
+    occupation = FACTOR_TABLES["occupation_hazard"].vocabulary.labels[0]
+    assert snapshot.tables["occupation_hazard"].lookup(occupation) == pytest.approx(
+        1.2 * FACTOR_TABLES["occupation_hazard"].lookup(occupation))
+    assert [item["active"] for item in registry.versions()] == [True]
+
+
+def test_activate_hot_swaps_and_notifies_subscribers(registry):
+    first = registry.publish(default_parameters())
+    second = registry.publish(dict(default_parameters(), LAMBDA=2.0), activate=False)
+    assert registry.current().version == first
+    seen = []
+    registry.subscribe(seen.append)
+    # Another process serving from the same directory picks the swap up on its next poll
+    worker = ModelRegistry(registry.root, poll_seconds=0.0)
+    held = worker.current()
+    registry.activate(second)
+    assert [snapshot.version for snapshot in seen] == [second]
+    assert worker.current().version == second
+    assert held.version == first and held.params["LAMBDA"] != 2.0
+    assert not registry.refresh()
+    registry.activate(second)
+    assert len(seen) == 1
+
+
+def test_module_subscribers_follow_the_process_registry(registry, monkeypatch):
+    seen = []
+    monkeypatch.setenv(model_registry.REGISTRY_ENV, registry.root)
+    monkeypatch.setattr(model_registry, "_SUBSCRIBERS", [seen.append])
+    monkeypatch.setattr(model_registry, "_REGISTRY", None)
+    version = ModelRegistry(registry.root).publish(dict(default_parameters(), LAMBDA=1.5))
+    assert model_registry.current_snapshot().version == version
+    assert [snapshot.version for snapshot in seen] == [version]
+
+
+def test_get_rejects_data_that_does_not_match_the_version(registry):
+    version = registry.publish(default_parameters(), hazards(1.1), activate=False)
+    store = resolve_directory(os.path.join(registry.root, model_registry.STORES_DIR, version))
+    tampered = np.asarray(FACTOR_TABLES["occupation_hazard"].values) * 3
+    np.save(os.path.join(store, "factors", "occupation_hazard.npy"), tampered)
+    with pytest.raises(ValueError, match="hashes to"):
+        registry.get(version)
+
+
+def test_unloadable_version_keeps_the_previous_snapshot(registry):
+    good = registry.publish(default_parameters())
+    bad = registry.publish(dict(default_parameters(), LAMBDA=2.0), activate=False)
+    os.replace(registry._version_path(good), registry._version_path(bad))
+    with open(os.path.join(registry.root, model_registry.CURRENT_FILE), "w") as f:
+        f.write(bad + "\n")
+    assert not registry.refresh()
+    assert registry.current().version == good
+    assert registry.last_error.startswith(bad)
+
+
+def test_invalid_model_is_not_published(registry):
+    with pytest.raises(ValueError, match="BETA_SYSTEMIC"):
+        registry.publish(dict(default_parameters(), BETA_SYSTEMIC=1.5))
+    assert registry.versions() == []
+
+
+def test_snapshot_is_immutable(registry):
+    version = registry.publish(default_parameters(), hazards(1.3))
+    for snapshot in (ModelSnapshot(default_parameters(), hazards(1.3)), registry.get(version)):
+        with pytest.raises(AttributeError):
+            snapshot.version = "other"
+        with pytest.raises(TypeError):
+            snapshot.params["LAMBDA"] = 3.0
+        with pytest.raises(TypeError):
+            snapshot.tables["occupation_hazard"] = FACTOR_TABLES["occupation_hazard"]
+        with pytest.raises(ValueError):
+            snapshot.tables["occupation_hazard"].values[0] = 0.0
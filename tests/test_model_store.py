@@ -0,0 +1,43 @@
+import json
+import os
+import numpy as np
+import pytest
+from actuarial_params import default_parameters
+from factor_tables import FACTOR_TABLES
+from model_registry import ModelSnapshot
+from model_store import load_model_store, save_model_store
+from storage import resolve_directory
+
+
+@pytest.fixture
+def snapshot():
+    factors = {label: 1.5 * factor for label, factor in FACTOR_TABLES["role_multiplier"].factors().items()}
+    return ModelSnapshot(dict(default_parameters(), LAMBDA=2.0), {"role_multiplier": factors})
+
+
+def test_store_round_trips_as_read_only_memmaps(snapshot, tmp_path):
+    path = str(tmp_path / "store")
+    save_model_store(snapshot, path)
+    store = load_model_store(path)
+    assert store["version"] == snapshot.version
+    assert store["params"] == dict(snapshot.params)
+    assert set(store["tables"]) == set(FACTOR_TABLES)
+    for name, table in store["tables"].items():
+        assert isinstance(table.values, np.memmap)
+        assert not table.values.flags.writeable
+        assert np.array_equal(table.values, snapshot.tables[name].values)
+        assert table.factors() == snapshot.tables[name].factors()
+    assert ModelSnapshot(snapshot.params, tables=store["tables"]).version == snapshot.version
+
+
+def test_store_from_other_vocabularies_must_be_rewritten(snapshot, tmp_path):
+    path = str(tmp_path / "store")
+    assert load_model_store(path) is None
+    save_model_store(snapshot, path)
+    meta_path = os.path.join(resolve_directory(path), "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["labels"]["occupation_hazard"] = meta["labels"]["occupation_hazard"][::-1]
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    assert load_model_store(path) is None
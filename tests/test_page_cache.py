@@ -0,0 +1,68 @@
+import pytest
+import model_registry
+import page_cache
+from actuarial_params import default_parameters
+from model_registry import ModelRegistry, ModelSnapshot
+from page_cache import PRICING_CACHE, LRUCache, cached_price_profile, memoize
+
+PROFILE = {
+    "occupation": "Software Engineer", "education_level": "Bachelor's",
+    "education_field": "Business/Finance", "school_tier": "Tier 2 (Reputable University)",
+    "company_type": "Mid-size Firm (stable, moderate risk)",
+    "years_experience": 5, "general_skill_progress": 0.4, "firm_specific_skill_progress": 0.2,
+    "annual_salary": 80_000, "coverage_duration": 6, "coverage_percentage": 0.5,
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    page_cache.clear_caches()
+    yield
+    page_cache.clear_caches()
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache("test", maxsize=2)
+    calls = []
+    square = memoize(cache, lambda x: x)(lambda x: calls.append(x) or x * x)
+    assert [square(1), square(2), square(1), square(3)] == [1, 4, 1, 9]
+    # 2 was the least recently used entry when 3 arrived
+    assert square(1) == 1 and square(2) == 4
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 4, "evictions": 2}
+
+
+def test_changed_params_miss():
+    params = default_parameters()
+    before = PRICING_CACHE.stats()
+    first = cached_price_profile(PROFILE, params)
+    assert cached_price_profile(dict(PROFILE), dict(params)) is first
+    changed = cached_price_profile(PROFILE, dict(params, W_CR=0.5, W_US=0.5))
+    assert changed is not first
+    assert changed["v_raw"] != first["v_raw"]
+    after = PRICING_CACHE.stats()
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 2)
+
+
+def test_changed_snapshot_version_misses():
+    params = default_parameters()
+    hazards = {label: 2 * factor for label, factor in
+               model_registry.FACTOR_TABLES["occupation_hazard"].factors().items()}
+    base = ModelSnapshot(params)
+    doubled = ModelSnapshot(params, {"occupation_hazard": hazards})
+    first = cached_price_profile(PROFILE, params, base)
+    second = cached_price_profile(PROFILE, params, doubled)
+    assert second is not first
+    assert second["h_base"] == 2 * first["h_base"]
+    assert cached_price_profile(PROFILE, params, ModelSnapshot(params)) is first
+
+
+def test_registry_swap_clears_the_pricing_cache(tmp_path, monkeypatch):
+    root = str(tmp_path / "registry")
+    monkeypatch.setenv(model_registry.REGISTRY_ENV, root)
+    monkeypatch.setattr(model_registry, "_REGISTRY", None)
+    cached_price_profile(PROFILE, default_parameters())
+    assert PRICING_CACHE.stats()["size"] == 1
+    version = ModelRegistry(root).publish(dict(default_parameters(), LAMBDA=2.0))
+    assert model_registry.current_snapshot().version == version
+    assert PRICING_CACHE.stats()["size"] == 0
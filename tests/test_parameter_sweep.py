@@ -0,0 +1,40 @@
+import json
+import numpy as np
+import pytest
+from benchmark import make_book, make_profiles
+from parameter_sweep import run_sweep
+
+GRID = {"LAMBDA": np.array([1.2, 1.5, 2.0]), "economic_climate": ["Neutral", "Recession (Low Investment)"]}
+
+
+@pytest.fixture(scope="module")
+def books():
+    profiles = make_profiles(40)
+    return make_book(profiles, 300, seed=0), make_book(profiles, 300, seed=1)
+
+
+def test_numpy_grid_values_are_recorded(tmp_path, books):
+    path = tmp_path / "sweep.jsonl"
+    rows = run_sweep(books[0], GRID, str(path))
+    assert len(rows) == 6
+    assert all(type(row["LAMBDA"]) is float for row in rows)
+    assert len(path.read_text().splitlines()) == 6
+
+
+def test_resume_after_a_truncated_line(tmp_path, books):
+    path = tmp_path / "sweep.jsonl"
+    expected = run_sweep(books[0], GRID, str(path))
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:3]) + lines[3][:25])
+    assert run_sweep(books[0], GRID, str(path)) == expected
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(rows) == 6
+
+
+def test_results_of_another_book_are_not_reused(tmp_path, books):
+    path = tmp_path / "sweep.jsonl"
+    first = run_sweep(books[0], GRID, str(path))
+    second = run_sweep(books[1], GRID, str(path))
+    assert second == run_sweep(books[1], GRID)
+    assert second != first
+    assert len(path.read_text().splitlines()) == 12
@@ -0,0 +1,66 @@
+import copy
+import pickle
+import numpy as np
+import pytest
+from batch_pricing import price_portfolio
+from benchmark import make_profiles
+from policy_book import INTERMEDIATE_SCHEMA, PolicyBook, load_policy_book, save_policy_book
+from premium_cube import _skill_step
+
+
+@pytest.fixture
+def profiles():
+    return [{k: v for k, v in p.items() if k not in ("user_id", "name")} for p in make_profiles(20)]
+
+
+def test_records_copy_and_pickle(profiles):
+    record = PolicyBook.from_records(profiles)[3]
+    assert copy.copy(record).to_dict() == record.to_dict()
+    assert pickle.loads(pickle.dumps(record)).to_dict() == record.to_dict()
+    with pytest.raises(AttributeError):
+        record._missing
+
+
+@pytest.mark.parametrize("column, value", [
+    ("coverage_duration", 6.5), ("coverage_duration", 40_000), ("coverage_duration", float("nan")),
+    ("annual_salary", float("inf")), ("annual_salary", 1e40), ("years_experience", float("nan")),
+])
+def test_values_the_schema_cannot_hold_are_rejected(profiles, column, value):
+    profiles[0][column] = value
+    with pytest.raises(ValueError):
+        PolicyBook.from_records(profiles)
+
+
+def test_save_and_load_round_trip(tmp_path, profiles):
+    book = PolicyBook.from_records(profiles)
+    book.price()
+    save_policy_book(book, str(tmp_path / "book"))
+    loaded = load_policy_book(str(tmp_path / "book"))
+    assert all(np.array_equal(loaded.columns[name], values) for name, values in book.columns.items())
+    assert loaded[0].to_dict() == book[0].to_dict()
+
+
+def test_stored_book_prices_like_the_float64_pipeline(profiles):
+    for i, profile in enumerate(profiles):
+        profile["general_skill_progress"] = (i % 21) / 20
+        profile["firm_specific_skill_progress"] = 0.35
+        profile["coverage_percentage"] = 0.55
+    book = PolicyBook.from_records(profiles)
+    _skill_step(book.columns["general_skill_progress"])
+    _skill_step(book.columns["firm_specific_skill_progress"])
+    expected = price_portfolio({column: np.array([p[column] for p in profiles]) for column in profiles[0]})
+    assert np.array_equal(price_portfolio(book.pricing_columns())["p_monthly"], expected["p_monthly"])
+
+
+def test_pricing_chunks_fills_the_parent_in_place(profiles):
+    book = PolicyBook.from_records(profiles)
+    book.allocate_intermediates()
+    allocated = {column: book.columns[column] for column in INTERMEDIATE_SCHEMA}
+    for chunk in book.chunks(6):
+        assert np.shares_memory(chunk.columns["p_monthly"], book.columns["p_monthly"])
+        chunk.price()
+    whole = PolicyBook.from_records(profiles)
+    whole.price()
+    for column in INTERMEDIATE_SCHEMA:
+        assert book.columns[column] is allocated[column]
+        assert np.array_equal(book.columns[column], whole.columns[column]), column
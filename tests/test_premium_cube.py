@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from benchmark import make_profiles
+from factor_tables import VOCABULARIES
+import model_registry
+import premium_cube
+import quote_service
+from actuarial_params import default_parameters
+from premium_cube import PREMIUM_CUBE_ENV, PremiumCube, build_premium_cube, get_premium_cube, load_premium_cube
+from pricing import price_profile
+
+CUBE_OUTPUTS = ("v_idiosyncratic", "h_systematic", "p_claim", "e_loss", "p_monthly")
+
+
+@pytest.fixture(scope="module")
+def profiles():
+    return [{k: v for k, v in p.items() if k not in ("user_id", "name")} for p in make_profiles(300)]
+
+
+@pytest.fixture(scope="module")
+def cube():
+    return build_premium_cube()
+
+
+def test_cube_matches_price_profile(cube, profiles):
+    for profile in profiles:
+        expected = price_profile(profile)
+        quoted = cube.quote(**profile)
+        assert {name: quoted[name] for name in CUBE_OUTPUTS} == {name: expected[name] for name in CUBE_OUTPUTS}
+
+
+def test_lookup_codes_matches_scalar_lookups(cube, profiles):
+    codes = {field: VOCABULARIES[field].encode([p[field] for p in profiles]) for field in VOCABULARIES}
+    numeric = {field: np.array([p[field] for p in profiles])
+               for field in ("years_experience", "general_skill_progress", "firm_specific_skill_progress")}
+    v, h = cube.lookup_codes(**codes, **numeric)
+    expected = [cube.lookup(**{k: p[k] for k in list(VOCABULARIES) + list(numeric)}) for p in profiles]
+    assert v.tolist() == [e[0] for e in expected]
+    assert h.tolist() == [e[1] for e in expected]
+
+
+@pytest.mark.parametrize("years", [2.5, -1, float("nan")])
+def test_lookup_rejects_invalid_experience(cube, profiles, years):
+    profile = {k: profiles[0][k] for k in list(VOCABULARIES) +
+               ["general_skill_progress", "firm_specific_skill_progress"]}
+    with pytest.raises(ValueError):
+        cube.lookup(years_experience=years, **profile)
+
+
+def test_lookup_rejects_off_grid_skill(cube, profiles):
+    profile = dict(profiles[0], general_skill_progress=0.33)
+    with pytest.raises(ValueError):
+        cube.quote(**profile)
+
+
+def test_saved_cube_round_trips(tmp_path, cube):
+    path = str(tmp_path / "cube")
+    saved = get_premium_cube(path)
+    assert saved.fingerprint == cube.fingerprint
+    for name in ("fhc", "company_term", "h_systematic"):
+        assert np.array_equal(getattr(saved, name), getattr(cube, name))
+    assert load_premium_cube(path, dict(cube.params, LAMBDA=3.0)) is None
+
+
+def test_cube_stays_compact(cube):
+    assert cube.nbytes < 1_000_000
+
+
+def test_cube_prices_every_output_like_price_profile(cube, profiles):
+    for profile in profiles:
+        assert cube.price_profile(profile) == price_profile(profile)
+    assert cube.price_profile(dict(profiles[0], general_skill_progress=0.33)) is None
+    assert cube.price_profile(dict(profiles[0], occupation="Astronaut")) is None
+
+
+@pytest.fixture
+def published(tmp_path, monkeypatch):
+    monkeypatch.delenv(model_registry.REGISTRY_ENV, raising=False)
+    monkeypatch.delenv(model_registry.PARAMETER_SET_ENV, raising=False)
+    path = str(tmp_path / "cube")
+    assert premium_cube.main(["--output", path]) == 0
+    monkeypatch.setenv(PREMIUM_CUBE_ENV, path)
+    calls = []
+    lookup = PremiumCube.price_profile
+    monkeypatch.setattr(PremiumCube, "price_profile", lambda self, *args: calls.append(1) or lookup(self, *args))
+    return calls
+
+
+def test_quote_endpoint_uses_the_published_cube(published, profiles):
+    for profile in profiles[:50]:
+        body = quote_service.quote({"profile": profile})
+        assert body["result"] == price_profile(profile)
+    assert len(published) == 50
+
+
+def test_quotes_fall_back_to_the_scalar_chain(published, profiles):
+    off_grid = dict(profiles[0], years_experience=4.5)
+    assert quote_service.quote({"profile": off_grid})["result"] == price_profile(off_grid)
+    # A cube built for other parameters is not used for these
+    params = dict(default_parameters(), LAMBDA=2.0)
+    body = quote_service.quote({"profile": profiles[0], "params": {"LAMBDA": 2.0}})
+    assert body["result"] == price_profile(profiles[0], params)
+    assert len(published) == 1
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import pytest
+import quote_service
+
+PROFILE = {
+    "occupation": "Software Engineer", "education_level": "Bachelor's",
+    "education_field": "Business/Finance", "school_tier": "Tier 2 (Reputable University)",
+    "company_type": "Mid-size Firm (stable, moderate risk)",
+    "years_experience": 5, "general_skill_progress": 0.4, "firm_specific_skill_progress": 0.2,
+    "annual_salary": 80_000, "coverage_duration": 6, "coverage_percentage": 0.5,
+}
+
+
+def call(method: str, path: str, body=b"") -> tuple:
+    """Runs one request through the ASGI app; returns (status, decoded JSON body)."""
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(quote_service.app({"type": "http", "method": method, "path": path}, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+def test_quote_ok():
+    status, body = call("POST", "/quote", {"profile": PROFILE})
+    assert status == 200
+    assert 0 < body["result"]["p_claim"] <= 1
+
+
+def test_batch_ok():
+    status, body = call("POST", "/quote/batch", {"profiles": [PROFILE, PROFILE]})
+    assert status == 200
+    assert body["count"] == 2
+    assert body["results"]["p_claim"][0] == body["results"]["p_claim"][1]
+
+
+def test_body_too_large(monkeypatch):
+    monkeypatch.setattr(quote_service, "MAX_BODY_BYTES", 16)
+    status, body = call("POST", "/quote", {"profile": PROFILE})
+    assert status == 413
+
+
+@pytest.mark.parametrize("params", [
+    [1, 2], "LAMBDA", {"NOPE": 1.0}, {"LAMBDA": "abc"}, {"LAMBDA": True}, {"LAMBDA": None},
+    {"TTV": 0}, {"TTV": 1.5}, {"TTV": -3}, {"BETA_SYSTEMIC": -5}, {"BETA_INDIVIDUAL": 1.5},
+])
+@pytest.mark.parametrize("path", ["/quote", "/quote/batch"])
+def test_invalid_params(path, params):
+    payload = {"profile": PROFILE} if path == "/quote" else {"profiles": [PROFILE]}
+    status, body = call("POST", path, dict(payload, params=params))
+    assert status == 422, body
+    assert body["error"]
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]"])
+def test_malformed_body(body):
+    assert call("POST", "/quote", body)[0] == 400
+
+
+@pytest.mark.parametrize("params", [{"LAMBDA": 0.5}, {"W_CR": 0.9}, {"GAMMA_SPEC": 0.9}])
+def test_overrides_must_form_a_valid_model(params):
+    status, body = call("POST", "/quote", {"profile": PROFILE, "params": params})
+    assert status == 422
+    assert "Invalid model" in body["error"]
+
+
+def test_overrides_change_parameter_version():
+    base = call("POST", "/quote", {"profile": PROFILE})[1]
+    loaded = call("POST", "/quote", {"profile": PROFILE, "params": {"LAMBDA": 2.0}})[1]
+    batch = call("POST", "/quote/batch", {"profiles": [PROFILE], "params": {"LAMBDA": 2.0}})[1]
+    assert base["parameter_version"] == base["model_version"] == loaded["model_version"]
+    assert loaded["parameter_version"] != loaded["model_version"]
+    assert batch["parameter_version"] == loaded["parameter_version"]
+
+
+@pytest.mark.parametrize("field, value", [
+    ("years_experience", -50), ("coverage_duration", -3), ("general_skill_progress", 3.0),
+    ("firm_specific_skill_progress", -0.1), ("coverage_percentage", 7.0), ("annual_salary", -1),
+])
+@pytest.mark.parametrize("path", ["/quote", "/quote/batch"])
+def test_out_of_range_fields(path, field, value):
+    profile = dict(PROFILE, **{field: value})
+    payload = {"profile": profile} if path == "/quote" else {"profiles": [PROFILE, profile]}
+    status, body = call("POST", path, payload)
+    assert status == 422, body
+    assert field in body["error"]
+
+
+@pytest.mark.parametrize("literal", [b"NaN", b"Infinity", b"-Infinity"])
+def test_non_finite_fields(literal):
+    body = json.dumps({"profile": dict(PROFILE, annual_salary=0)}).encode()
+    body = body.replace(b'"annual_salary": 0', b'"annual_salary": ' + literal)
+    status, body = call("POST", "/quote", body)
+    assert status == 422, body
+    assert "annual_salary" in body["error"]
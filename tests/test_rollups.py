@@ -0,0 +1,104 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from batch_pricing import price_portfolio
+from benchmark import make_book, make_profiles
+from factor_tables import UNKNOWN_CODE, VOCABULARIES
+from incremental_pricing import IncrementalPricer
+from rollups import UNKNOWN_LABEL, BookRollup, build_rollup, load_rollup, save_rollup
+from storage import resolve_directory
+
+
+@pytest.fixture
+def columns():
+    book = make_book(make_profiles(50), 500)
+    book["occupation"] = book["occupation"].copy()
+    book["occupation"][:7] = UNKNOWN_CODE
+    return dict(book, **price_portfolio(book))
+
+
+def test_unknown_codes_go_to_the_trailing_slot(columns):
+    rollup = BookRollup()
+    rollup.add(columns)
+    counts = rollup.sums[..., 0]
+    assert counts.sum() == 500
+    assert counts[-1].sum() == 7
+    assert rollup.group_labels("occupation")[-1] == UNKNOWN_LABEL
+
+
+def test_out_of_range_codes_raise(columns):
+    columns["company_type"] = np.where(np.arange(500) == 3, 99, columns["company_type"])
+    rollup = BookRollup()
+    with pytest.raises(ValueError):
+        rollup.add(columns)
+    assert rollup.sums.sum() == 0
+
+
+def assert_same_cube(rollup, expected):
+    assert np.allclose(rollup.sums, expected.sums, rtol=1e-12, atol=1e-6)
+    for name, histogram in expected.histograms.items():
+        assert np.array_equal(rollup.histograms[name], histogram), name
+
+
+def test_reprice_keeps_the_cube_equal_to_a_rebuild():
+    book = make_book(make_profiles(50), 3_000)
+    pricer = IncrementalPricer(book)
+    rollup = build_rollup(book)
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        rows = rng.choice(3_000, 40, replace=False)
+        inputs = {"occupation": rng.integers(0, len(VOCABULARIES["occupation"]), 40),
+                  "annual_salary": rng.integers(10, 500, 40) * 1_000.0,
+                  "general_skill_progress": rng.integers(0, 21, 40) / 20}
+        rollup.reprice(pricer, rows, inputs)
+        for column, values in inputs.items():
+            book[column] = book[column].astype(np.asarray(values).dtype)
+            book[column][rows] = values
+        assert_same_cube(rollup, build_rollup(book))
+    rollup.reprice(pricer, params={"LAMBDA": 2.0})
+    assert_same_cube(rollup, build_rollup(book, dict(pricer.params)))
+
+
+def test_query_matches_a_groupby_of_the_book():
+    book = make_book(make_profiles(80), 5_000)
+    priced = price_portfolio(book)
+    frame = pd.DataFrame({dim: np.asarray(VOCABULARIES[dim].labels, dtype=object)[book[dim]]
+                          for dim in ("occupation", "school_tier", "company_type")})
+    frame["p_monthly"], frame["e_loss"] = priced["p_monthly"], priced["e_loss"]
+    company = frame["company_type"].iloc[0]
+    expected = (frame[frame["company_type"] == company].groupby(["school_tier", "occupation"])
+                .agg(count=("p_monthly", "size"), p_monthly=("p_monthly", "sum"), e_loss=("e_loss", "mean")))
+
+    result = build_rollup(book).query({"company_type": company}, by=("school_tier", "occupation"))
+    got = pd.DataFrame({"count": result["count"], "p_monthly": result["sum_p_monthly"], "e_loss": result["mean_e_loss"],
+                        "loss_ratio": result["loss_ratio"]},
+                       index=pd.MultiIndex.from_tuples(result["groups"], names=["school_tier", "occupation"]))
+    got = got.loc[expected.index]
+    assert len(result["groups"]) == len(expected)
+    assert np.array_equal(got["count"], expected["count"])
+    assert np.allclose(got["p_monthly"], expected["p_monthly"], rtol=1e-12)
+    assert np.allclose(got["e_loss"], expected["e_loss"], rtol=1e-12)
+    assert np.allclose(got["loss_ratio"], expected["e_loss"] * expected["count"] / 12 / expected["p_monthly"])
+
+
+def test_saved_rollup_loads_identically(columns, tmp_path):
+    rollup = BookRollup()
+    rollup.add(columns)
+    path = str(tmp_path / "rollup")
+    save_rollup(rollup, path)
+    loaded = load_rollup(path)
+    assert loaded.dimensions == rollup.dimensions and loaded.params == rollup.params
+    assert np.array_equal(loaded.sums, rollup.sums)
+    assert_same_cube(loaded, rollup)
+    assert loaded.query(by=("occupation",))["groups"] == rollup.query(by=("occupation",))["groups"]
+
+    meta_path = os.path.join(resolve_directory(path), "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["labels"]["occupation"] = meta["labels"]["occupation"][::-1]
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError, match="vocabularies"):
+        load_rollup(path)
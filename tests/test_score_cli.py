@@ -0,0 +1,31 @@
+import json
+import pandas as pd
+import pytest
+from benchmark import make_profiles
+from score_cli import main
+
+
+@pytest.fixture
+def extract(tmp_path):
+    path = tmp_path / "extract.csv"
+    pd.DataFrame(make_profiles(20)).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("option", [
+    "--param=LAMBDA=abc", "--param=FOO=1", "--param=LAMBDA", "--param=TTV=2.5",
+    "--default=years_experience=x", "--map=occupation", "--map=ocupation=x", "--default=nonsense=1",
+])
+def test_malformed_options_are_usage_errors(tmp_path, extract, capsys, option):
+    with pytest.raises(SystemExit) as exit_info:
+        main([extract, str(tmp_path / "scored.csv"), option])
+    assert exit_info.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+
+def test_scores_with_overrides(tmp_path, extract):
+    report_path = tmp_path / "report.json"
+    assert main([extract, str(tmp_path / "scored.csv"), "--param", "LAMBDA=2.0", "--report", str(report_path)]) == 0
+    report = json.loads(report_path.read_text())
+    assert report["rows_scored"] == 20 and report["params"]["LAMBDA"] == 2.0
+    assert len(pd.read_csv(tmp_path / "scored.csv")) == 20
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from actuarial_params import PARAMETER_NAMES, default_parameters
+from batch_pricing import portfolio_kwargs, price_portfolio
+from benchmark import make_book, make_profiles
+from sensitivity import premium_sensitivities
+
+
+@pytest.fixture(scope="module")
+def book():
+    return make_book(make_profiles(50), 2_000)
+
+
+def _regions(book, params):
+    """P_monthly and the piece of each kinked function every policy sits on."""
+    r = price_portfolio(book, **portfolio_kwargs(params))
+    y = r["v_raw"] * 50.0
+    z = r["e_loss"] * params["LAMBDA"] / 12.0
+    return r["p_monthly"], np.sign(y - 5.0) + np.sign(y - 100.0), np.sign(z - params["P_MIN"])
+
+
+# The default set puts policies on the V floor and the P_MIN floor; doubled weights on the V cap.
+@pytest.mark.parametrize("overrides, clipped", [
+    ({}, ("v_at_or_below_floor", "premium_at_or_below_p_min")),
+    ({"W_CR": 2.0, "W_US": 2.0}, ("v_at_or_above_cap",)),
+])
+def test_derivatives_match_central_differences(book, overrides, clipped):
+    params = dict(default_parameters(), **overrides)
+    result = premium_sensitivities(book, params)
+    assert all(result["kinks"][kink].any() for kink in clipped)
+
+    for name in PARAMETER_NAMES:
+        h = 1e-6 * max(1.0, abs(params[name]))
+        low, v_low, z_low = _regions(book, dict(params, **{name: params[name] - h}))
+        high, v_high, z_high = _regions(book, dict(params, **{name: params[name] + h}))
+        # Central differences straddle a kink for policies whose piece changes within +-h
+        smooth = (v_low == v_high) & (z_low == z_high)
+        assert smooth.mean() > 0.99, name
+        numeric = (high - low) / (2 * h)
+        np.testing.assert_allclose(result["d_p_monthly"][name][smooth], numeric[smooth], rtol=1e-6, atol=1e-5,
+                                   err_msg=name)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from benchmark import make_book, make_profiles
+from factor_tables import UNKNOWN_CODE
+from parallel_simulation import simulate_book_parallel
+from simulation import simulate_book
+
+
+@pytest.fixture
+def book():
+    return make_book(make_profiles(20), 200)
+
+
+@pytest.mark.parametrize("simulate", [simulate_book, simulate_book_parallel])
+def test_zero_trials_raise(book, simulate):
+    with pytest.raises(ValueError, match="n_trials"):
+        simulate(book, 0)
+
+
+def test_single_trial(book):
+    summary = simulate_book(book, 1, seed=3)
+    assert summary["n_trials"] == 1
+    assert summary["max_loss"] == summary["mean_loss"]
+
+
+def test_parallel_results_do_not_depend_on_workers(book):
+    runs = [simulate_book_parallel(book, 5_000, seed=1, workers=workers, chunk_trials=700) for workers in (1, 3)]
+    serial = simulate_book(book, 5_000, seed=1, chunk_trials=700)
+    for key in ("mean_loss", "std_loss", "max_loss", "var", "tvar", "loss_ratio_quantiles"):
+        assert runs[0][key] == runs[1][key], key
+    assert runs[0]["mean_loss"] == pytest.approx(serial["mean_loss"], rel=1e-12)
+    assert runs[0]["std_loss"] == pytest.approx(serial["std_loss"], rel=1e-12)
+    for key in ("var", "tvar", "loss_ratio_quantiles"):
+        assert runs[0][key] == pytest.approx(serial[key], rel=1e-12), key
+
+
+@pytest.mark.parametrize("simulate", [simulate_book, simulate_book_parallel])
+def test_unknown_occupations_are_rejected(book, simulate):
+    book = dict(book, occupation=np.where(np.arange(len(book["occupation"])) < 3, UNKNOWN_CODE, book["occupation"]))
+    with pytest.raises(ValueError, match="unknown occupations"):
+        simulate(book, 10)
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+from data.skill_data import LEARNING_RESOURCE_RECORDS
+from skill_catalog import CATALOG_COLUMNS, default_catalog, load_catalog, read_catalog_files, save_catalog
+
+
+@pytest.fixture
+def courses():
+    return pd.DataFrame(LEARNING_RESOURCE_RECORDS)
+
+
+@pytest.mark.parametrize("skill_type", [None, "general", "firm-specific"])
+def test_frame_matches_a_boolean_mask(tmp_path, courses, skill_type):
+    save_catalog(default_catalog(), str(tmp_path / "catalog"))
+    catalog = load_catalog(str(tmp_path / "catalog"))
+    expected = courses if skill_type is None else courses[courses["Type"] == skill_type]
+    frame = catalog.frame(catalog.courses(type=skill_type))
+    pd.testing.assert_frame_equal(frame, expected)
+
+
+def test_csv_numbers_keep_their_types(tmp_path, courses):
+    courses.to_csv(tmp_path / "courses.csv", index=False)
+    catalog = read_catalog_files(str(tmp_path / "courses.csv"))
+    assert catalog.arrays["effort_hours"].dtype.kind == "i"
+    assert catalog.arrays["progress_gain"].dtype.kind == "f"
+    record = catalog.records([0])[0]
+    assert list(record) == list(CATALOG_COLUMNS)
+    assert record["Effort Hours"] == LEARNING_RESOURCE_RECORDS[0]["Effort Hours"]
+    assert isinstance(record["Effort Hours"], int)
@@ -0,0 +1,42 @@
+import os
+from storage import replace_directory, resolve_directory, staging_directory
+
+
+def publish(path: str, text: str) -> None:
+    staging = staging_directory(path)
+    with open(os.path.join(staging, "data.txt"), "w") as f:
+        f.write(text)
+    replace_directory(staging, path)
+
+
+def read(path: str) -> str:
+    with open(os.path.join(resolve_directory(path), "data.txt")) as f:
+        return f.read()
+
+
+def test_replace_keeps_current_and_previous_version(tmp_path):
+    path = str(tmp_path / "store")
+    for i in range(4):
+        publish(path, str(i))
+    assert os.path.islink(path)
+    assert read(path) == "3"
+    assert len([e for e in os.listdir(tmp_path) if e != "store"]) == 2
+
+
+def test_resolved_directory_survives_a_replace(tmp_path):
+    path = str(tmp_path / "store")
+    publish(path, "old")
+    resolved = resolve_directory(path)
+    publish(path, "new")
+    with open(os.path.join(resolved, "data.txt")) as f:
+        assert f.read() == "old"
+    assert read(path) == "new"
+
+
+def test_plain_directory_is_migrated(tmp_path):
+    path = tmp_path / "store"
+    path.mkdir()
+    (path / "data.txt").write_text("legacy")
+    publish(str(path), "new")
+    assert os.path.islink(path)
+    assert read(str(path)) == "new"
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from batch_pricing import price_portfolio
+from benchmark import make_book, make_profiles
+from factor_tables import FACTOR_TABLES, FactorTable
+from stress_testing import stress_test
+
+
+@pytest.fixture(scope="module")
+def book():
+    return make_book(make_profiles(50), 2_000)
+
+
+def horizon_spread(result):
+    fan = result["cumulative_loss_ratio_fan"]
+    return fan[0.95][-1] - fan[0.05][-1]
+
+
+def test_premium_is_charged_once_for_every_regime(book):
+    result = stress_test(book, n_paths=200, n_months=24)
+    charged = price_portfolio(book)["p_monthly"].sum()
+    assert np.allclose(result["premium"], charged)
+
+
+def test_fan_widens_when_regimes_differ(book):
+    flat = dict(FACTOR_TABLES)
+    for name in ("economic_climate_modifier", "ai_innovation_index"):
+        table = FACTOR_TABLES[name]
+        flat[name] = FactorTable.from_values(table.vocabulary, np.ones_like(table.values))
+    same = stress_test(book, n_paths=500, n_months=36, tables=flat)
+    differ = stress_test(book, n_paths=500, n_months=36)
+    assert horizon_spread(same) == pytest.approx(0.0, abs=1e-12)
+    assert horizon_spread(differ) > 0.05
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from actuarial_params import default_parameters
+from benchmark import make_profiles
+from calculations import (
+    calculate_h_base_ttv, calculate_systematic_risk, calculate_p_systemic, calculate_p_claim,
+    calculate_expected_loss, calculate_monthly_premium
+)
+from factor_tables import FACTOR_TABLES
+from model_registry import ModelSnapshot
+from pricing import price_profile
+from transition_projection import project_transitions
+
+N_MONTHS = 40
+
+
+@pytest.fixture(scope="module")
+def profiles():
+    profiles = make_profiles(30)
+    for i, profile in enumerate(profiles):
+        profile["target_occupation"] = profiles[(i + 7) % len(profiles)]["occupation"]
+        profile["transition_start_month"] = i % 5 * 3
+    return profiles
+
+
+def book(profiles):
+    return {column: np.asarray([p[column] for p in profiles]) for column in profiles[0] if column not in ("user_id", "name")}
+
+
+def scalar_projection(profile, month, params, tables=None):
+    """The "Simulate Transition Impact" chain of app.py for one policy and projection month."""
+    quote = price_profile(profile, params, tables)
+    h_target = price_profile({**profile, "occupation": profile["target_occupation"]}, params, tables)["h_base"]
+    k = max(month - profile["transition_start_month"], 0)
+    h_base = calculate_h_base_ttv(quote["h_base"], h_target, k, params["TTV"])
+    h_systematic = calculate_systematic_risk(h_base, quote["m_econ"], quote["i_ai"], params["W_ECON"], params["W_INNO"])
+    p_claim = calculate_p_claim(calculate_p_systemic(h_systematic, params["BETA_SYSTEMIC"]),
+                                quote["p_individual_conditional"])
+    e_loss = calculate_expected_loss(p_claim, quote["l_payout"])
+    return h_base, h_systematic, calculate_monthly_premium(e_loss, params["LAMBDA"], params["P_MIN"])
+
+
+def test_projection_matches_the_scalar_chain(profiles):
+    params = default_parameters()
+    projection = project_transitions(book(profiles), N_MONTHS)
+    for i, profile in enumerate(profiles):
+        for month in range(N_MONTHS):
+            h_base, h_systematic, p_monthly = scalar_projection(profile, month, params)
+            assert projection["h_base"][i, month] == h_base
+            assert projection["h_systematic"][i, month] == h_systematic
+            assert projection["p_monthly"][i, month] == p_monthly
+
+
+def test_transition_starts_at_the_start_month(profiles):
+    projection = project_transitions(book(profiles), N_MONTHS)
+    ttv = default_parameters()["TTV"]
+    for i, profile in enumerate(profiles):
+        start = profile["transition_start_month"]
+        assert np.array_equal(projection["k"][i], np.maximum(np.arange(N_MONTHS) - start, 0))
+        assert np.all(projection["h_base"][i, :start + 1] == projection["h_base"][i, 0])
+        target = FACTOR_TABLES["occupation_hazard"].lookup(profile["target_occupation"])
+        assert np.all(projection["h_base"][i, start + ttv:] == target)
+
+
+def test_projection_uses_the_snapshot_hazards(profiles):
+    factors = {name: table.factors() for name, table in FACTOR_TABLES.items()}
+    factors["occupation_hazard"] = {label: 1.5 * factor for label, factor in factors["occupation_hazard"].items()}
+    snapshot = ModelSnapshot(default_parameters(), factors)
+    params = dict(snapshot.params)
+    projection = project_transitions(book(profiles), N_MONTHS, tables=snapshot.tables)
+    for i, profile in enumerate(profiles):
+        for month in (0, profile["transition_start_month"] + 5, profile["transition_start_month"] + params["TTV"]):
+            h_base, _, p_monthly = scalar_projection(profile, month, params, snapshot.tables)
+            assert projection["h_base"][i, month] == h_base
+            assert projection["p_monthly"][i, month] == p_monthly
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from actuarial_params import default_parameters
+from batch_pricing import portfolio_kwargs, price_portfolio
+from benchmark import make_book, make_profiles
+from factor_tables import FACTOR_TABLES
+from model_registry import ModelSnapshot
+from pricing import price_profile
+from skill_catalog import default_catalog
+from upskilling_planner import PREMIUM_TOLERANCE, CoursePlanSpace, _best_split, plan_book, plan_upskilling
+
+BUDGETS = (0, 10, 40, 120, 400)
+
+
+@pytest.fixture(scope="module")
+def book():
+    return make_book(make_profiles(40), 300)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return default_catalog()
+
+
+@pytest.fixture(scope="module")
+def plans(book, catalog):
+    return {budget: plan_book(book, budget, catalog=catalog) for budget in BUDGETS}
+
+
+def test_plans_stay_within_budget(plans, catalog):
+    efforts = np.ceil(np.asarray(catalog.arrays["effort_hours"]))
+    for budget, result in plans.items():
+        assert np.all(result["hours"] <= budget)
+        assert np.array_equal(result["hours"], result["general_hours"] + result["specific_hours"])
+        for plan_id in np.unique(result["plan_id"]):
+            hours = result["hours"][result["plan_id"] == plan_id]
+            assert efforts[result["plans"][plan_id]].sum() <= hours.min()
+
+
+def test_premium_falls_as_the_budget_grows(plans):
+    after = [plans[budget]["p_monthly_after"] for budget in BUDGETS]
+    assert np.array_equal(after[0], plans[0]["p_monthly_before"])
+    for smaller, larger in zip(after, after[1:]):
+        assert np.all(larger <= smaller)
+    assert np.any(after[-1] < after[0])
+
+
+def test_minimum_hours_reach_the_target(book, catalog, plans):
+    params = default_parameters()
+    budget = BUDGETS[-1]
+    result = plans[budget]
+    occupation = np.asarray(book["occupation"])
+    members = np.flatnonzero(occupation == occupation[0])
+    space = CoursePlanSpace(catalog, catalog.recommend(str(occupation[0])), budget)
+    priced = price_portfolio(book, **portfolio_kwargs(params))
+    base = {name: priced[name][members] for name in ("fhc", "fcr", "h_systematic", "l_payout")}
+    p_gen = np.asarray(book["general_skill_progress"], dtype=np.float64)[members]
+    p_spec = np.asarray(book["firm_specific_skill_progress"], dtype=np.float64)[members]
+    hours = result["hours"][members]
+    assert np.any(hours > 0)
+
+    target, _ = _best_split(base, p_gen, p_spec, space, np.full(len(members), budget), params)
+    reached, _ = _best_split(base, p_gen, p_spec, space, hours, params)
+    assert np.all(reached <= target + PREMIUM_TOLERANCE)
+    fewer, _ = _best_split(base, p_gen, p_spec, space, np.maximum(hours - 1, 0), params)
+    assert np.all(fewer[hours > 0] > target[hours > 0] + PREMIUM_TOLERANCE)
+
+
+def test_cell_cap_does_not_change_plans(book, catalog, plans):
+    capped = plan_book(book, BUDGETS[-1], catalog=catalog, max_cells=1_000)
+    for name in ("p_monthly_after", "hours", "general_hours", "specific_hours"):
+        assert np.array_equal(capped[name], plans[BUDGETS[-1]][name])
+
+
+def test_plan_prices_with_the_snapshot_tables(catalog):
+    factors = {name: table.factors() for name, table in FACTOR_TABLES.items()}
+    factors["occupation_hazard"] = {label: 2 * factor for label, factor in factors["occupation_hazard"].items()}
+    snapshot = ModelSnapshot(default_parameters(), factors)
+    params = dict(snapshot.params)
+    profile = next(p for p in make_profiles(40)
+                   if price_profile(p, params, snapshot.tables)["p_monthly"] > params["P_MIN"])
+    quoted = price_profile(profile, params, snapshot.tables)["p_monthly"]
+    plan = plan_upskilling(profile, 40, params, catalog, tables=snapshot.tables)
+    assert plan["p_monthly_before"] == pytest.approx(quoted, rel=1e-12)
+    assert plan["p_monthly_before"] != pytest.approx(price_profile(profile, params)["p_monthly"], rel=1e-6)
+    assert plan["p_monthly_before"] - plan["p_monthly_after"] == pytest.approx(plan["reduction"])
@@ -0,0 +1,68 @@
+import numpy as np
+from actuarial_params import BETA_SYSTEMIC, BETA_INDIVIDUAL, LAMBDA, P_MIN, TTV, W_ECON, W_INNO
+from batch_pricing import calculate_h_base_ttv_vec, calculate_monthly_premium_vec, price_portfolio
+from factor_tables import FACTOR_TABLES, encode_column
+
+PROJECTION_OUTPUTS = ("h_base", "h_systematic", "p_monthly")
+
+
+def project_transitions(df, n_months: int, ttv: int = TTV, w_econ: float = W_ECON, w_inno: float = W_INNO,
+                        beta_systemic: float = BETA_SYSTEMIC, beta_individual: float = BETA_INDIVIDUAL,
+                        lambd: float = LAMBDA, p_min: float = P_MIN, unknown_report: dict = None,
+                        dtype=np.float64, **pricing_kwargs) -> dict:
+    r"""
+    Projects H_base(k), H_i and P_monthly for every policy and month 0..n_months-1 in one pass.
+    `df` holds the batch_pricing columns plus `target_occupation` and, optionally,
+    `transition_start_month` (the projection month the transition begins; default 0).
+    Before the start month k is 0, so H_base is the current hazard; after TTV months it is the
+    target hazard, exactly as calculate_h_base_ttv:
+    $H_{base}(k) = \left(1 - \frac{k}{TTV}\right) \cdot H_{current} + \left(\frac{k}{TTV}\right) \cdot H_{target}$
+    As in the "Simulate Transition Impact" branch of app.py, V_i(t) and the environment stay at
+    their current values. Returns (policies x months) arrays keyed by PROJECTION_OUTPUTS plus
+    `months` and the per-policy `k` matrix; pass dtype=np.float32 to halve the footprint.
+    H_current and H_target both come from the `tables` pricing keyword when it is given.
+    """
+    priced = price_portfolio(df, ttv=ttv, w_econ=w_econ, w_inno=w_inno, beta_systemic=beta_systemic,
+                             beta_individual=beta_individual, lambd=lambd, p_min=p_min,
+                             unknown_report=unknown_report, **pricing_kwargs)
+    n = priced["h_base"].size
+    h_current = priced["h_base"][:, None]
+    tables = pricing_kwargs.get("tables") or FACTOR_TABLES
+    h_target = tables["occupation_hazard"].gather(
+        encode_column("occupation", df["target_occupation"], {} if unknown_report is None else unknown_report)
+    )[:, None]
+    start = (np.asarray(df["transition_start_month"], dtype=np.int64) if "transition_start_month" in df
+             else np.zeros(n, dtype=np.int64))
+
+    months = np.arange(n_months)
+    k = np.maximum(months[None, :] - start[:, None], 0)
+    h_base = calculate_h_base_ttv_vec(h_current, h_target, k, ttv)
+    h_systematic = h_base * (w_econ * priced["m_econ"] + w_inno * priced["i_ai"])[:, None]
+    p_systemic = (h_systematic / 100.0) * beta_systemic
+    p_claim = p_systemic * priced["p_individual_conditional"][:, None]
+    e_loss = p_claim * priced["l_payout"][:, None]
+    p_monthly = calculate_monthly_premium_vec(e_loss, lambd, p_min)
+
+    return {
+        "months": months, "k": k,
+        "h_base": h_base.astype(dtype, copy=False),
+        "h_systematic": h_systematic.astype(dtype, copy=False),
+        "p_monthly": p_monthly.astype(dtype, copy=False),
+    }
+
+
+def projection_to_long(projection: dict, policy_ids=None):
+    """
+    Reshapes a projection into a long-format pandas DataFrame with one row per (policy, month).
+    """
+    import pandas as pd
+    n, m = projection["k"].shape
+    policy_ids = np.arange(n) if policy_ids is None else np.asarray(policy_ids)
+    frame = {
+        "policy": np.repeat(policy_ids, m),
+        "month": np.tile(projection["months"], n),
+        "k": projection["k"].reshape(-1),
+    }
+    for name in PROJECTION_OUTPUTS:
+        frame[name] = projection[name].reshape(-1)
+    return pd.DataFrame(frame)
@@ -0,0 +1,191 @@
+import numpy as np
+from actuarial_params import default_parameters
+from batch_pricing import SCENARIO_COLUMNS, price_portfolio, portfolio_kwargs, calculate_v_idiosyncratic_normalized_vec, calculate_monthly_premium_vec
+from factor_tables import OCCUPATIONS
+from pricing import PROFILE_FIELDS
+from skill_catalog import get_catalog
+
+SKILL_TYPES = ("general", "firm-specific")
+DEFAULT_CHUNK_ROWS = 4_096
+# Upper bound on the (policies x (budget + 1)) premium grid _best_split evaluates at once; chunks
+# shrink for large budgets so memory stays bounded (each cell holds a few float64 temporaries).
+DEFAULT_MAX_CELLS = 4_000_000
+# Plans within this many dollars of the optimal premium count as optimal when looking for the
+# cheapest plan, so float rounding between equivalent plans cannot force extra courses.
+PREMIUM_TOLERANCE = 1e-9
+
+
+def _knapsack(efforts: np.ndarray, gains: np.ndarray, budget: int) -> tuple:
+    """
+    0/1 knapsack over integer effort: best[e] is the largest total gain within effort e, and
+    keep[i, e] records whether item i is taken at capacity e (for backtracking).
+    """
+    best = np.zeros(budget + 1)
+    keep = np.zeros((len(efforts), budget + 1), dtype=bool)
+    for i, (effort, gain) in enumerate(zip(efforts, gains)):
+        if effort > budget:
+            continue
+        candidate = np.full(budget + 1, -np.inf)
+        candidate[effort:] = best[:budget + 1 - effort] + gain
+        keep[i] = candidate > best
+        best = np.where(keep[i], candidate, best)
+    return best, keep
+
+
+class CoursePlanSpace:
+    """
+    Knapsack curves of one set of candidate courses, split by the progress they add:
+    best_gain[type][e] is the most P_gen (general) or P_spec (firm-specific) progress that
+    e whole hours of study can buy. Efforts are rounded up to whole hours.
+    """
+
+    def __init__(self, catalog, rows, budget: int):
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[np.sort(np.unique(rows, return_index=True)[1])]
+        type_codes = np.asarray(catalog.arrays["type_codes"])[rows]
+        self.catalog = catalog
+        self.budget = budget
+        self.rows, self.efforts, self.best_gain, self._keep = {}, {}, {}, {}
+        for skill_type in SKILL_TYPES:
+            code = catalog.codes["type"].get(skill_type, -1)
+            typed = rows[type_codes == code]
+            efforts = np.ceil(np.asarray(catalog.arrays["effort_hours"])[typed]).astype(np.int64)
+            gains = np.asarray(catalog.arrays["progress_gain"])[typed]
+            self.rows[skill_type], self.efforts[skill_type] = typed, efforts
+            self.best_gain[skill_type], self._keep[skill_type] = _knapsack(efforts, gains, budget)
+
+    def courses(self, skill_type: str, hours: int) -> np.ndarray:
+        """Catalog rows of the best `skill_type` courses within `hours`, in candidate order."""
+        keep, efforts, chosen = self._keep[skill_type], self.efforts[skill_type], []
+        for i in range(len(efforts) - 1, -1, -1):
+            if keep[i, hours]:
+                chosen.append(i)
+                hours -= efforts[i]
+        return self.rows[skill_type][chosen[::-1]]
+
+
+def _premium(base: dict, p_gen: np.ndarray, p_spec: np.ndarray, params: dict) -> np.ndarray:
+    """P_monthly at the given skill progress, all other inputs held at `base` (the price_portfolio output)."""
+    fus = 1 - (params["GAMMA_GEN"] * p_gen + params["GAMMA_SPEC"] * p_spec)
+    v_raw = base["fhc"] * (params["W_CR"] * base["fcr"] + params["W_US"] * fus)
+    v_idiosyncratic = calculate_v_idiosyncratic_normalized_vec(v_raw)
+    p_systemic = (base["h_systematic"] / 100.0) * params["BETA_SYSTEMIC"]
+    p_individual_conditional = (v_idiosyncratic / 100.0) * params["BETA_INDIVIDUAL"]
+    e_loss = (p_systemic * p_individual_conditional) * base["l_payout"]
+    return calculate_monthly_premium_vec(e_loss, params["LAMBDA"], params["P_MIN"])
+
+
+def _best_split(base: dict, p_gen: np.ndarray, p_spec: np.ndarray, space: CoursePlanSpace,
+                hours: np.ndarray, params: dict) -> tuple:
+    """
+    For each policy, the lowest premium reachable with at most `hours` of study and the
+    general-course hours of the split reaching it. Premiums are non-increasing in both
+    progress terms, so the best plan spends e hours on the best general courses and the rest on
+    the best firm-specific ones for some e.
+    """
+    e = np.arange(space.budget + 1)
+    spec_hours = hours[:, None] - e[None, :]
+    valid = spec_hours >= 0
+    gen = np.minimum(1.0, p_gen[:, None] + space.best_gain["general"][e][None, :])
+    spec = np.minimum(1.0, p_spec[:, None] + space.best_gain["firm-specific"][np.clip(spec_hours, 0, None)])
+    premium = np.where(valid, _premium({k: v[:, None] for k, v in base.items()}, gen, spec, params), np.inf)
+    split = np.argmin(premium, axis=1)
+    return premium[np.arange(len(hours)), split], split
+
+
+def _optimal_plans(base: dict, p_gen: np.ndarray, p_spec: np.ndarray, space: CoursePlanSpace,
+                   budget: np.ndarray, params: dict) -> dict:
+    """
+    Lowest reachable premium within `budget` hours per policy, and the fewest hours reaching it.
+    The binary search on hours is what stops a plan at the P_MIN floor or the V_i(t) floor:
+    past those points more study no longer lowers the premium, so it is not recommended.
+    """
+    target, _ = _best_split(base, p_gen, p_spec, space, budget, params)
+    low, high = np.zeros_like(budget), budget.copy()
+    while np.any(low < high):
+        mid = (low + high) // 2
+        premium, _ = _best_split(base, p_gen, p_spec, space, mid, params)
+        reached = premium <= target + PREMIUM_TOLERANCE
+        high = np.where(reached & (low < high), mid, high)
+        low = np.where(~reached & (low < high), mid + 1, low)
+    premium, split = _best_split(base, p_gen, p_spec, space, high, params)
+    return {"p_monthly_after": premium, "hours": high, "general_hours": split, "specific_hours": high - split}
+
+
+def plan_book(df, budget_hours, params: dict = None, catalog=None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+              unknown_report: dict = None, max_cells: int = DEFAULT_MAX_CELLS, tables: dict = None) -> dict:
+    r"""
+    Cheapest premium-minimising upskilling plan for every policy in `df` within `budget_hours`
+    (a scalar or one budget per policy). Candidates are the catalog courses for the skills
+    recommended for each policy's occupation; general courses add to P_gen and firm-specific
+    courses to P_spec, each capped at 1, and the premium follows
+    $F_{US} = 1 - (\gamma_{gen} P_{gen} + \gamma_{spec} P_{spec})$ through V_i(t) to P_monthly.
+    The plan is exact for whole-hour efforts (course hours are rounded up). Work grows with
+    the largest budget: policies are processed at most `chunk_rows` at a time and at most
+    `max_cells` // (budget + 1) at a time, and each occupation's knapsack keeps a
+    candidate courses x (budget + 1) boolean table.
+    Returns arrays p_monthly_before, p_monthly_after, reduction, hours, general_hours,
+    specific_hours, p_gen_after, p_spec_after, at_p_min and plan_id, plus "plans": a list of
+    catalog row arrays indexed by plan_id. `tables` replaces factor_tables.FACTOR_TABLES (e.g. with
+    a model_registry snapshot's tables), as in price_portfolio.
+    """
+    params = default_parameters() if params is None else params
+    catalog = get_catalog() if catalog is None else catalog
+    base = price_portfolio(df, unknown_report=unknown_report, tables=tables, **portfolio_kwargs(params))
+    n = len(base["p_monthly"])
+    budget = np.broadcast_to(np.floor(np.asarray(budget_hours, dtype=np.float64)), (n,)).astype(np.int64)
+    if np.any(budget < 0):
+        raise ValueError("Learning budgets must be non-negative.")
+    p_gen = np.asarray(df["general_skill_progress"], dtype=np.float64)
+    p_spec = np.asarray(df["firm_specific_skill_progress"], dtype=np.float64)
+    inputs = {"fhc": base["fhc"], "fcr": base["fcr"], "h_systematic": base["h_systematic"], "l_payout": base["l_payout"]}
+
+    occupation = np.asarray(df["occupation"])
+    if np.issubdtype(occupation.dtype, np.integer):
+        # UNKNOWN_CODE (-1) picks the trailing "", which gets the default rule-based skills
+        occupation = np.array(OCCUPATIONS.labels + ("",), dtype=object)[occupation]
+    labels, groups = np.unique(occupation.astype(str), return_inverse=True)
+
+    out = {name: np.zeros(n, dtype=np.int64) for name in ("hours", "general_hours", "specific_hours", "plan_id")}
+    out["p_monthly_after"] = np.zeros(n)
+    out["p_gen_after"], out["p_spec_after"] = p_gen.copy(), p_spec.copy()
+    plans = []
+    max_budget = int(budget.max()) if n else 0
+    chunk_rows = max(1, min(chunk_rows, max_cells // (max_budget + 1)))
+    for g, label in enumerate(labels):
+        space = CoursePlanSpace(catalog, catalog.recommend(label), max_budget)
+        members = np.flatnonzero(groups == g)
+        for start in range(0, len(members), chunk_rows):
+            idx = members[start:start + chunk_rows]
+            result = _optimal_plans({k: v[idx] for k, v in inputs.items()}, p_gen[idx], p_spec[idx],
+                                    space, budget[idx], params)
+            for name, values in result.items():
+                out[name][idx] = values
+        gen_hours, spec_hours = out["general_hours"][members], out["specific_hours"][members]
+        out["p_gen_after"][members] = np.minimum(1.0, p_gen[members] + space.best_gain["general"][gen_hours])
+        out["p_spec_after"][members] = np.minimum(1.0, p_spec[members] + space.best_gain["firm-specific"][spec_hours])
+        # One plan per distinct (occupation, general hours, firm-specific hours)
+        splits, inverse = np.unique(np.stack([gen_hours, spec_hours], axis=1), axis=0, return_inverse=True)
+        out["plan_id"][members] = len(plans) + inverse.ravel()
+        plans.extend(np.concatenate([space.courses("general", int(gh)), space.courses("firm-specific", int(sh))])
+                     for gh, sh in splits)
+
+    out["p_monthly_before"] = base["p_monthly"]
+    out["reduction"] = base["p_monthly"] - out["p_monthly_after"]
+    out["at_p_min"] = out["p_monthly_after"] <= params["P_MIN"]
+    out["plans"] = plans
+    return out
+
+
+def plan_upskilling(profile: dict, budget_hours: float, params: dict = None, catalog=None,
+                    tables: dict = None) -> dict:
+    """
+    Cheapest plan minimising one profile's premium within `budget_hours` (see plan_book).
+    Returns the courses as catalog records plus the before/after premium and progress.
+    """
+    catalog = get_catalog() if catalog is None else catalog
+    book = {field: [profile[field]] for field in PROFILE_FIELDS + tuple(SCENARIO_COLUMNS) if field in profile}
+    result = plan_book(book, budget_hours, params, catalog, tables=tables)
+    plan = {name: values[0].item() for name, values in result.items() if name != "plans"}
+    plan["courses"] = catalog.records(result["plans"][result["plan_id"][0]])
+    return plan
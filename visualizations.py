@@ -1,11 +1,53 @@
 
-import plotly.express as px
-import pandas as pd
+from typing import TYPE_CHECKING
+import numpy as np
+from instrumentation import instrumented
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# plotly and pandas are imported inside the figure builders so that importing this module
+# (e.g. from app.py or page_cache.py) does not pay their import cost before a figure is needed.
+
+# Points per series kept by the history charts' compact mode (max_points); longer series are
+# downsampled server-side and sent as typed arrays (int32 months, float32 values).
+DEFAULT_MAX_POINTS = 400
+# Histories spanning at most this many months get one x-axis tick per month.
+MONTHLY_TICK_LIMIT = 24
+
+
+def _month_ticks(fig, months) -> None:
+    months = np.asarray(months)
+    span = months.max() - months.min() if len(months) else 0
+    fig.update_xaxes(dtick=1 if span <= MONTHLY_TICK_LIMIT else None)
+
+
+def _compact_line_figure(df: "pd.DataFrame", columns: list, title: str, value_label: str, variable_label: str,
+                         value_format: str, max_points: int, method: str, range_y=None):
+    """Line chart of `columns` against 'Month', each series downsampled to at most `max_points`."""
+    import plotly.graph_objects as go
+    from downsampling import downsample_indices
+    months = df['Month'].to_numpy()
+    fig = go.Figure()
+    for column in columns:
+        values = df[column].to_numpy(dtype=np.float64)
+        keep = downsample_indices(months, values, max_points, method)
+        fig.add_trace(go.Scatter(x=months[keep].astype(np.int32), y=values[keep].astype(np.float32),
+                                 mode='lines', name=column, hovertemplate=f'%{{y:{value_format}}}'))
+    fig.update_layout(title=title, xaxis_title='Months from Start', yaxis_title=value_label,
+                      legend_title_text=variable_label, hovermode="x unified")
+    if range_y is not None:
+        fig.update_yaxes(range=range_y)
+    _month_ticks(fig, months)
+    return fig
+
+@instrumented()
 def plot_risk_factor_contributions(fhc: float, fcr: float, fus: float, h_base: float, m_econ: float, i_ai: float):
     """
     Generates bar charts showing contributions to Idiosyncratic and Systematic Risk.
     """
+    import plotly.express as px
+    import pandas as pd
     # Idiosyncratic Risk Contributions
     idiosyncratic_data = {
         'Factor': ['Human Capital (FHC)', 'Company Risk (FCR)', 'Upskilling (FUS)'],
@@ -45,13 +87,20 @@ def plot_risk_factor_contributions(fhc: float, fcr: float, fus: float, h_base: f
 
     return fig_idiosyncratic, fig_systematic
 
-def plot_historical_trends(history_df: pd.DataFrame):
+@instrumented()
+def plot_historical_trends(history_df: "pd.DataFrame", max_points: int = None, method: str = "lttb"):
     """
     Generates a line chart tracking AI-Q score, Systematic Risk, and Monthly Premium over time.
     history_df should have columns: 'Month', 'Idiosyncratic Risk', 'Systematic Risk', 'Monthly Premium'.
+    With max_points, each series is downsampled to at most that many points ("lttb" or "minmax").
     """
+    import plotly.express as px
     if history_df.empty:
         return px.line(title="No Historical Data Available")
+    if max_points is not None:
+        return _compact_line_figure(history_df, ['Idiosyncratic Risk', 'Systematic Risk', 'Monthly Premium'],
+                                    'AI Risk Score and Premium Trend Over Time', 'Score/Premium', 'Metric',
+                                    '.2f', max_points, method)
 
     fig = px.line(history_df, x='Month', y=['Idiosyncratic Risk', 'Systematic Risk', 'Monthly Premium'],
                   title='AI Risk Score and Premium Trend Over Time',
@@ -65,13 +114,20 @@ def plot_historical_trends(history_df: pd.DataFrame):
     fig.update_xaxes(dtick=1) # Ensure months are distinct on x-axis
     return fig
 
-def plot_skill_proficiency(skill_progress_df: pd.DataFrame):
+@instrumented()
+def plot_skill_proficiency(skill_progress_df: "pd.DataFrame", max_points: int = None, method: str = "lttb"):
     """
     Generates a line chart showing general vs. firm-specific skill progress over time.
     skill_progress_df should have columns: 'Month', 'General Skill Progress', 'Firm-Specific Skill Progress'.
+    With max_points, each series is downsampled to at most that many points ("lttb" or "minmax").
     """
+    import plotly.express as px
     if skill_progress_df.empty:
         return px.line(title="No Skill Progress Data Available")
+    if max_points is not None:
+        return _compact_line_figure(skill_progress_df, ['General Skill Progress', 'Firm-Specific Skill Progress'],
+                                    'Skill Proficiency Over Time', 'Progress (%)', 'Skill Type',
+                                    '.1f', max_points, method, range_y=[0, 100])
 
     fig = px.line(skill_progress_df, x='Month', y=['General Skill Progress', 'Firm-Specific Skill Progress'],
                   title='Skill Proficiency Over Time',
@@ -86,12 +142,37 @@ def plot_skill_proficiency(skill_progress_df: pd.DataFrame):
     fig.update_xaxes(dtick=1)
     return fig
 
+@instrumented()
+def extend_line_figure(fig, new_rows: "pd.DataFrame", max_points: int = None):
+    """
+    Copy of a history chart (plot_historical_trends / plot_skill_proficiency) with the months in
+    new_rows appended to each series, instead of rebuilding it from the whole history.
+    Returns None once a series would exceed 2 * max_points; rebuild from the full history then,
+    which downsamples it again.
+    """
+    import plotly.graph_objects as go
+    if not fig.data:
+        return None
+    fig = go.Figure(fig)
+    months = new_rows['Month'].to_numpy()
+    for trace in fig.data:
+        x, y = np.asarray(trace.x), np.asarray(trace.y)
+        if trace.name not in new_rows or (max_points is not None and len(x) + len(months) > 2 * max_points):
+            return None
+        trace.x = np.concatenate([x, months.astype(x.dtype)])
+        trace.y = np.concatenate([y, new_rows[trace.name].to_numpy().astype(y.dtype)])
+    _month_ticks(fig, np.asarray(fig.data[0].x))
+    return fig
+
+@instrumented()
 def plot_skill_gap_radar(user_skills: dict, recommended_skills: dict):
     """
     Generates a radar chart comparing user's current skill proficiency against recommended proficiency.
     This is a conceptual function; actual implementation would need more detailed skill proficiency data.
     For simplicity, let's assume skills are rated 0-100.
     """
+    import plotly.express as px
+    import pandas as pd
     # Example data structure
     # user_skills = {"Python": 70, "SQL": 60, "Communication": 80}
     # recommended_skills = {"Python": 90, "SQL": 80, "Communication": 75}
@@ -115,3 +196,56 @@ def plot_skill_gap_radar(user_skills: dict, recommended_skills: dict):
                         labels={'r': 'Proficiency (%)'})
     fig.update_traces(fill='toself')
     return fig
+
+@instrumented()
+def plot_loss_ratio_fan(fan: dict, title: str = 'Portfolio Loss Ratio Fan Chart'):
+    """
+    Generates a fan chart of the loss ratio across stress-test paths.
+    fan maps quantile levels (e.g. 0.05 ... 0.95) to per-month values; symmetric levels are
+    shaded as bands around the median. The stress_testing fans use expected losses per regime,
+    so the bands show macro regime risk only, not claim-count randomness.
+    """
+    import plotly.graph_objects as go
+    levels = sorted(fan)
+    fig = go.Figure()
+    if not levels:
+        return fig.update_layout(title="No Stress Test Data Available")
+    months = list(range(len(fan[levels[0]])))
+    for low, high in zip(levels, reversed(levels)):
+        if low >= high:
+            break
+        fig.add_trace(go.Scatter(x=months, y=fan[high], mode='lines', line=dict(width=0),
+                                 showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=months, y=fan[low], mode='lines', line=dict(width=0), fill='tonexty',
+                                 fillcolor='rgba(31, 119, 180, 0.2)', name=f'{low:.0%}-{high:.0%}'))
+    if len(levels) % 2:
+        median = levels[len(levels) // 2]
+        fig.add_trace(go.Scatter(x=months, y=fan[median], mode='lines', line=dict(color='rgb(31, 119, 180)'),
+                                 name=f'{median:.0%} (median)'))
+    fig.update_layout(title=title, xaxis_title='Months from Start', yaxis_title='Loss Ratio', hovermode="x unified")
+    return fig
+
+@instrumented()
+def plot_portfolio_breakdown(groups: list, values, dimension_label: str, measure_label: str):
+    """
+    Generates a bar chart of one portfolio rollup measure per group.
+    groups are label tuples as returned by rollups.BookRollup.query(by=...).
+    """
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Bar(x=[" / ".join(group) for group in groups], y=np.asarray(values),
+                           hovertemplate='%{x}: %{y:,.2f}<extra></extra>'))
+    fig.update_layout(title=f'{measure_label} by {dimension_label}', xaxis_title=dimension_label,
+                      yaxis_title=measure_label)
+    return fig
+
+@instrumented()
+def plot_rollup_histogram(edges, counts, title: str, value_label: str, value_format: str = ',.0f'):
+    """
+    Generates a bar chart of a pre-binned distribution (rollup histogram counts over `edges`).
+    Bins are labelled by their ranges, so uneven (e.g. geometric) bins display evenly.
+    """
+    import plotly.graph_objects as go
+    bins = [f'{low:{value_format}}-{high:{value_format}}' for low, high in zip(edges[:-1], edges[1:])]
+    fig = go.Figure(go.Bar(x=bins, y=np.asarray(counts), hovertemplate='%{x}: %{y:,} policies<extra></extra>'))
+    fig.update_layout(title=title, xaxis_title=value_label, yaxis_title='Policies', bargap=0.05)
+    return fig